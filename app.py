@@ -1,18 +1,20 @@
 from __future__ import annotations
 
+from utils import startup  # en premier : origine des mesures de démarrage
+
+import threading
 import tkinter as tk
 from tkinter import messagebox
+from typing import Optional
 
 from services.auth import AuthService
-from services.camera import CameraService
-from services.face_store import FaceStore
-from services.storage import StorageService
-from services.student_service import StudentService
-from ui.access_control_view import AccessControlView
-from ui.add_student_view import AddStudentView
 from ui.login_view import LoginView
 from ui.main_menu import MainMenu
-from utils.paths import ADMINS_FILE, IMAGES_DIR, STUDENTS_FILE
+from utils.paths import ADMINS_FILE
+from utils.settings import load_settings
+
+# OpenCV, NumPy, PIL et les services de reconnaissance sont importés par le
+# thread de préchauffage pendant la connexion, pas avant l'écran de connexion.
 
 
 class Application(tk.Tk):
@@ -21,16 +23,61 @@ class Application(tk.Tk):
         self.title("Contrôle d'accès - Restaurant scolaire")
         self.geometry("1200x800")
 
-        # Services partagés
-        storage = StorageService(STUDENTS_FILE)
-        self.face_store = FaceStore(IMAGES_DIR)
-
+        self.settings = load_settings()
         self.auth_service = AuthService(ADMINS_FILE)
-        self.camera_service = CameraService()
-        self.student_service = StudentService(storage, self.face_store)
+
+        # Services partagés : construits en arrière-plan (voir _warm_up)
+        self.services = None
+        self._services_ready = threading.Event()
+        self._startup_error: Optional[Exception] = None
+        threading.Thread(target=self._warm_up, name="warm-up", daemon=True).start()
 
         self.current_view: tk.Widget | None = None
         self.show_login()
+        self.after_idle(lambda: startup.mark("fenêtre de connexion"))
+
+    def _warm_up(self):
+        """Thread de préchauffage : imports lourds, galerie, cascades, caméras."""
+        try:
+            from services.bootstrap import build_services, warm_up
+
+            services = build_services(self.settings)
+            warm_up(services, open_cameras=self.settings["startup"]["open_cameras"])
+            # Précharger les vues (PIL/ImageTk) sans créer de widget hors du thread Tk
+            import ui.access_control_view  # noqa: F401
+            import ui.add_student_view  # noqa: F401
+
+            self.services = services
+            startup.mark("services prêts")
+        except Exception as exc:
+            self._startup_error = exc
+        finally:
+            self._services_ready.set()
+
+    def _require_services(self) -> bool:
+        """Attend la fin du préchauffage (en général terminé pendant la connexion)."""
+        if not self._services_ready.is_set():
+            self.config(cursor="watch")
+            self.update_idletasks()
+            self._services_ready.wait()
+            self.config(cursor="")
+        if self._startup_error is not None:
+            messagebox.showerror("Erreur", f"Initialisation impossible : {self._startup_error}")
+            return False
+        return True
+
+    @property
+    def student_service(self):
+        return self.services.student_service
+
+    @property
+    def lanes(self):
+        return self.services.lanes
+
+    @property
+    def camera_service(self):
+        # L'enrôlement utilise la caméra de la première voie
+        return self.services.lanes[0].camera_service
 
     def _set_view(self, widget: tk.Widget):
         if self.current_view is not None:
@@ -51,6 +98,8 @@ class Application(tk.Tk):
         )
 
     def show_dashboard(self):
+        if not self._require_services():
+            return
         self._set_view(
             MainMenu(
                 self,
@@ -61,23 +110,34 @@ class Application(tk.Tk):
         )
 
     def show_add_student(self):
+        from services.enrollment import BurstConfig
+        from ui.add_student_view import AddStudentView
+
         self._set_view(
             AddStudentView(
                 self,
                 student_service=self.student_service,
                 camera_service=self.camera_service,
                 on_back=self.show_dashboard,
+                burst_config=BurstConfig(**self.settings["enrollment"]),
             )
         )
 
     def show_access_control(self):
+        from services.scheduling import SchedulingConfig
+        from ui.access_control_view import AccessControlView
+
+        preview = self.settings["preview"]
         try:
             view = AccessControlView(
                 self,
                 student_service=self.student_service,
-                camera_service=self.camera_service,
-                face_store=self.face_store,
+                lanes=self.lanes,
                 on_back=self.show_dashboard,
+                preview_size=(preview["width"], preview["height"]),
+                display_fps=preview["fps"],
+                scheduling=SchedulingConfig(**self.settings["scheduling"]),
+                passage_log=self.services.passage_log,
             )
         except RuntimeError as exc:
             messagebox.showerror("Erreur", str(exc))
@@ -90,7 +150,11 @@ if __name__ == "__main__":
     try:
         app.mainloop()
     finally:
-        # Nettoyage : fermer la caméra proprement
-        app.camera_service.release()
-
-
+        # Nettoyage : fermer les caméras proprement
+        if app.services is not None:
+            for lane in app.lanes:
+                lane.camera_service.release()
+            # Écrire les débits encore en file avant de quitter
+            app.student_service.close()
+            if app.services.passage_log is not None:
+                app.services.passage_log.close()
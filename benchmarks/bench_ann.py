@@ -0,0 +1,69 @@
+"""
+Rappel et latence de l'index approché (IVF) comparé à la recherche exacte.
+
+    python -m benchmarks.bench_ann [--size 20000] [--dim 128] [--queries 200]
+
+Galerie synthétique regroupée en « familles » de visages proches (cas difficile
+pour un index approché) ; chaque requête est un étudiant de la galerie bruité.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from services.ann_index import IvfIndex
+from services.gallery_index import GalleryIndex
+
+
+def synthetic_gallery(size: int, dim: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    groups = max(1, size // 50)
+    centers = rng.normal(0.0, 1.0, (groups, dim)).astype(np.float32)
+    members = centers[rng.integers(0, groups, size)]
+    return members + rng.normal(0.0, 0.8, (size, dim)).astype(np.float32)
+
+
+def _time_per_query(search, queries: np.ndarray) -> tuple[np.ndarray, float]:
+    start = time.perf_counter()
+    best = np.concatenate([search(q[None, :])[0] for q in queries])
+    return best, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--lists", type=int, default=0, help="0 = racine carrée de la taille")
+    args = parser.parse_args(argv)
+
+    gallery = synthetic_gallery(args.size, args.dim)
+    sq_norms = np.einsum("ij,ij->i", gallery, gallery)
+    rng = np.random.default_rng(1)
+    truth = rng.choice(args.size, size=args.queries, replace=False)
+    queries = gallery[truth] + rng.normal(0.0, 0.4, (args.queries, args.dim)).astype(np.float32)
+
+    exact, exact_ms = _time_per_query(
+        lambda q: GalleryIndex._exact_search(q, gallery, sq_norms), queries
+    )
+    index = IvfIndex(n_lists=args.lists)
+    start = time.perf_counter()
+    index.attach([str(i) for i in range(args.size)], gallery, "bench")
+    build_s = time.perf_counter() - start
+
+    print(f"galerie {args.size} x {args.dim}, {len(index._lists)} listes, construction {build_s:.1f} s")
+    print(f"{'recherche':<14} {'ms/requête':>11} {'rappel@1':>9} {'accélération':>13}")
+    print(f"{'exacte':<14} {exact_ms:>11.3f} {np.mean(exact == truth):>9.3f} {1.0:>13.1f}")
+    for n_probe in (1, 2, 4, 8, 16, 32):
+        found, ms = _time_per_query(
+            lambda q: index.search(q, gallery, sq_norms, n_probe=n_probe), queries
+        )
+        recall = np.mean(found == exact)
+        print(f"{f'IVF probe={n_probe}':<14} {ms:>11.3f} {recall:>9.3f} {exact_ms / ms:>13.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,74 @@
+"""
+Temps de détection par frame selon la configuration de FaceStore.
+
+    python -m benchmarks.bench_detection [--image data/images/1.jpg] [--repeat 30]
+
+Les frames 640x480 et 1080p sont construites à partir d'une photo d'enrôlement
+(visage à bout de bras, comme à la caisse). Les modes réduits utilisent la
+section "detection" de data/settings.json, celle des voies (cascade Haar).
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from dataclasses import replace
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from services.face_store import DetectionConfig, FaceStore
+from utils.paths import IMAGES_DIR
+from utils.settings import load_settings
+
+RESOLUTIONS = {"640x480": (640, 480), "1080p": (1920, 1080)}
+
+
+def _default_image() -> Path:
+    images = sorted(IMAGES_DIR.glob("*.jpg"))
+    if not images:
+        raise SystemExit("Aucune image dans data/images pour construire les frames.")
+    return images[0]
+
+
+def _time_detection(store: FaceStore, gray, repeat: int, use_hints: bool) -> tuple[float, int]:
+    hints = store._detect_faces(gray) if use_hints else None
+    durations = []
+    faces = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        faces = store._detect_faces(gray, hints)
+        durations.append(time.perf_counter() - start)
+    return float(np.median(durations)) * 1000, len(faces)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--image", type=Path, default=None)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    image = cv2.imread(str(args.image or _default_image()))
+    if image is None:
+        raise SystemExit("Image illisible.")
+    lane = DetectionConfig(**load_settings()["detection"])
+    modes = {
+        "pleine résolution": (DetectionConfig(), False),
+        f"réduite x{lane.downscale}": (replace(lane, use_roi=False), False),
+        f"réduite x{lane.downscale} + zone": (replace(lane, use_roi=True), True),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'résolution':<10} {'mode':<28} {'ms/frame':>9} {'visages':>8}")
+        for label, size in RESOLUTIONS.items():
+            gray = cv2.cvtColor(cv2.resize(image, size), cv2.COLOR_BGR2GRAY)
+            for mode, (config, use_hints) in modes.items():
+                store = FaceStore(Path(tmp), config)
+                ms, count = _time_detection(store, gray, args.repeat, use_hints)
+                print(f"{label:<10} {mode:<28} {ms:>9.2f} {count:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,110 @@
+"""
+Détecteurs de visages comparés sur un jeu enregistré : ms/frame et rappel.
+
+    python -m benchmarks.bench_detectors [--set data/images] [--labels visages.json]
+                                         [--size 640x480] [--repeat 3]
+
+--set : dossier d'images ou vidéo (ex: passage enregistré en caisse).
+--labels : vérité terrain {"<n° de frame>": [[x, y, w, h], ...]} en coordonnées
+d'origine ; rappel = visages annotés retrouvés (IoU >= 0.3). Sans annotations,
+chaque frame est supposée contenir un visage : rappel = frames où au moins un
+visage est trouvé, "en trop" = détections au-delà d'une par frame.
+Réglages de la section "detection" de settings.json ; les détecteurs dont le
+modèle manque dans data/models sont signalés et ignorés.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from dataclasses import replace
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from services.face_detectors import create_detector
+from services.face_store import DetectionConfig, FaceStore
+from services.face_tracker import iou
+from services.frame_sources import open_frames
+from utils.paths import IMAGES_DIR, MODELS_DIR
+from utils.settings import load_settings
+
+DETECTORS = ("haar", "lbp", "dnn")
+MIN_IOU = 0.3
+
+
+def _load_set(source: Path, size, labels_file):
+    """Frames grises (redimensionnées si size) et annotations ramenées à la même échelle."""
+    labels = {}
+    if labels_file is not None:
+        labels = json.loads(labels_file.read_text(encoding="utf-8"))
+    frames, truths = [], []
+    for index, (_, frame) in enumerate(open_frames(source)):
+        boxes = np.asarray(labels.get(str(index), []), dtype=np.float64).reshape(-1, 4)
+        if size is not None:
+            fx, fy = size[0] / frame.shape[1], size[1] / frame.shape[0]
+            boxes *= (fx, fy, fx, fy)
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        truths.append([tuple(box) for box in boxes.round().astype(int)])
+    return frames, truths
+
+
+def _evaluate(store: FaceStore, frames, truths, labelled: bool, repeat: int):
+    durations, found, expected, extra = [], 0, 0, 0
+    for gray, truth in zip(frames, truths):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            faces = store._detect_faces(gray)
+            durations.append(time.perf_counter() - start)
+        if labelled:
+            matched = sum(any(iou(box, face) >= MIN_IOU for face in faces) for box in truth)
+            found += matched
+            expected += len(truth)
+            extra += max(0, len(faces) - matched)
+        else:
+            found += bool(faces)
+            expected += 1
+            extra += max(0, len(faces) - 1)
+    durations = np.array(durations) * 1000
+    recall = found / expected if expected else float("nan")
+    return np.median(durations), np.percentile(durations, 95), recall, extra
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--set", type=Path, default=IMAGES_DIR, help="Dossier d'images ou vidéo")
+    parser.add_argument("--labels", type=Path, default=None, help="Annotations JSON")
+    parser.add_argument("--size", default="640x480", help="Taille des frames ('' = d'origine)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    size = tuple(int(v) for v in args.size.split("x")) if args.size else None
+    frames, truths = _load_set(args.set, size, args.labels)
+    if not frames:
+        raise SystemExit(f"Aucune frame dans {args.set}.")
+    config = DetectionConfig(**load_settings()["detection"])
+
+    print(f"{len(frames)} frame(s), {args.set}")
+    print(f"{'détecteur':<10} {'ms/frame':>9} {'p95 ms':>8} {'rappel':>8} {'en trop':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in DETECTORS:
+            detector = create_detector(name, config, MODELS_DIR)
+            try:
+                detector.load()
+            except RuntimeError as exc:
+                print(f"{name:<10} indisponible : {exc}")
+                continue
+            store = FaceStore(Path(tmp), replace(config, detector=name), detector=detector)
+            store.warm_up()
+            median, p95, recall, extra = _evaluate(
+                store, frames, truths, args.labels is not None, args.repeat
+            )
+            print(f"{name:<10} {median:>9.2f} {p95:>8.2f} {recall:>8.0%} {extra:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,144 @@
+"""
+Voie inactive : CPU consommé sans personne devant la caméra et délai de première détection.
+
+    python -m benchmarks.bench_idle [--idle 10] [--runs 3] [--image data/images/1.jpg]
+
+Caméra simulée à 30 images/s : scène fixe (bruit de capteur) pendant --idle
+secondes, puis une photo d'étudiant apparaît. Deux réglages comparés :
+- fixe : détection sur chaque frame (ancien comportement) ;
+- adaptatif : détection sautée sans mouvement, cadence réduite en veille,
+  espacement calé sur le temps de traitement mesuré (settings "scheduling").
+CPU : temps processeur du processus (capture simulée comprise) / durée d'inactivité.
+"""
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+from dataclasses import replace
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from services.access_engine import AccessEngine
+from services.bootstrap import build_services, warm_up
+from services.pipeline import RecognitionPipeline
+from services.scheduling import AdaptiveScheduler, SchedulingConfig
+from utils.paths import IMAGES_DIR
+from utils.settings import load_settings
+
+SIZE = (640, 480)
+FPS = 30.0
+
+
+class SimulatedCamera:
+    """Scène fixe bruitée puis, après appear(), la photo d'un étudiant."""
+
+    def __init__(self, person: np.ndarray, rng: np.random.Generator):
+        background = np.full((SIZE[1], SIZE[0], 3), 120, dtype=np.int16)
+        background[:, :, 0] += np.linspace(-40, 40, SIZE[0], dtype=np.int16)[None, :]
+        self._scenes = [self._noisy(background, rng), self._noisy(person.astype(np.int16), rng)]
+        self._showing = 0
+        self._index = 0
+        self._next = time.perf_counter()
+        self.appeared_at = 0.0
+
+    @staticmethod
+    def _noisy(image: np.ndarray, rng: np.random.Generator):
+        return [
+            np.clip(image + rng.integers(-2, 3, image.shape), 0, 255).astype(np.uint8)
+            for _ in range(8)
+        ]
+
+    def appear(self) -> None:
+        self.appeared_at = time.perf_counter()
+        self._showing = 1
+
+    def read(self):
+        delay = self._next - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self._next = max(self._next + 1 / FPS, time.perf_counter())
+        self._index += 1
+        frames = self._scenes[self._showing]
+        return True, frames[self._index % len(frames)]
+
+
+def run_once(services, config: SchedulingConfig, adaptive: bool, person, idle: float, seed: int):
+    face_store = services.lanes[0].face_store
+    engine = AccessEngine(services.student_service, face_store, dry_run=True, scheduling=config)
+    camera = SimulatedCamera(person, np.random.default_rng(seed))
+    detected = threading.Event()
+    detected_at = [0.0]
+    analyses = [0]
+
+    def process(frame):
+        result = engine.process(frame)
+        analyses[0] += 1
+        if camera.appeared_at and result.tracks and not detected.is_set():
+            detected_at[0] = time.perf_counter()
+            detected.set()
+        return result
+
+    pipeline = RecognitionPipeline(
+        read=camera.read,
+        process=process,
+        scheduler=AdaptiveScheduler(config) if adaptive else None,
+        is_active=lambda result: result.active,
+    )
+    pipeline.start()
+    time.sleep(config.idle_after + 1.0)  # mise en route, puis entrée en veille
+    cpu0, wall0, count0 = time.process_time(), time.perf_counter(), analyses[0]
+    time.sleep(idle)
+    cpu = time.process_time() - cpu0
+    wall = time.perf_counter() - wall0
+    idle_rate = (analyses[0] - count0) / wall
+    time.sleep(np.random.default_rng(seed).uniform(0, 1))  # arrivée à un instant quelconque
+    camera.appear()
+    found = detected.wait(5.0)
+    pipeline.stop()
+    first = detected_at[0] - camera.appeared_at if found else float("nan")
+    return cpu / wall, idle_rate, first
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--idle", type=float, default=10.0, help="Durée d'inactivité (s)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--image", type=Path, default=None, help="Photo contenant un visage")
+    args = parser.parse_args(argv)
+
+    image = args.image or next(iter(sorted(IMAGES_DIR.glob("*.jpg"))), None)
+    if image is None:
+        raise SystemExit("Aucune image dans data/images.")
+    person = cv2.resize(cv2.imread(str(image)), SIZE)
+
+    settings = load_settings()
+    settings["lanes"] = settings["lanes"][:1]
+    services = build_services(settings)
+    warm_up(services, open_cameras=False)
+    config = SchedulingConfig(**settings["scheduling"])
+    modes = {
+        "fixe": (replace(config, motion_gate=False), False),
+        "adaptatif": (replace(config, motion_gate=True), True),
+    }
+
+    print(f"{'réglage':<10} {'CPU inactif':>12} {'analyses/s':>11} {'1re détection ms':>17}")
+    try:
+        for label, (mode_config, adaptive) in modes.items():
+            runs = np.array(
+                [
+                    run_once(services, mode_config, adaptive, person, args.idle, seed)
+                    for seed in range(args.runs)
+                ]
+            )
+            cpu, rate, first = np.median(runs, axis=0)
+            print(f"{label:<10} {cpu:>11.0%} {rate:>11.1f} {first * 1000:>17.0f}")
+    finally:
+        services.student_service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,98 @@
+"""
+Coût CPU par frame de l'aperçu : ancien rendu comparé au rendu avec tampons réutilisés.
+
+    python -m benchmarks.bench_preview [--repeat 200] [--size 800x600]
+
+Ancien rendu : copie pleine résolution, overlays, cvtColor pleine résolution,
+resize, nouvelle image PIL et nouvelle PhotoImage. Nouveau rendu : resize
+d'abord, overlays sur l'image réduite, tampons réutilisés, PhotoImage.paste().
+La partie Tk n'est mesurée que si un affichage est disponible.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from ui.preview import PreviewRenderer
+
+RESOLUTIONS = {"640x480": (640, 480), "720p": (1280, 720), "1080p": (1920, 1080)}
+
+
+def _tk_root():
+    try:
+        import tkinter as tk
+
+        root = tk.Tk()
+        root.withdraw()
+        return root
+    except Exception:  # pas d'affichage (serveur, CI)
+        return None
+
+
+def _old_render(frame, overlays, size, root):
+    display = frame.copy()
+    for (x, y, w, h), label, color in overlays:
+        cv2.rectangle(display, (x, y), (x + w, y + h), color, 2)
+        cv2.putText(display, label, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    rgb = cv2.cvtColor(display, cv2.COLOR_BGR2RGB)
+    image = Image.fromarray(cv2.resize(rgb, size))
+    if root is not None:
+        from PIL import ImageTk
+
+        return ImageTk.PhotoImage(image=image)
+    return image
+
+
+def _new_render(renderer: PreviewRenderer, state: dict, frame, overlays, root):
+    image = renderer.render(frame, overlays)
+    if root is None:
+        return image
+    from PIL import ImageTk
+
+    if "photo" not in state:
+        state["photo"] = ImageTk.PhotoImage(image=image)
+    else:
+        state["photo"].paste(image)
+    return state["photo"]
+
+
+def _cpu_ms(run, repeat: int) -> float:
+    run()
+    start = time.process_time()
+    for _ in range(repeat):
+        run()
+    return (time.process_time() - start) * 1000 / repeat
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--size", default="800x600", help="Taille de l'aperçu (LxH)")
+    args = parser.parse_args(argv)
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+
+    # Un seul thread OpenCV : mesure du coût CPU et non du parallélisme
+    cv2.setNumThreads(1)
+    root = _tk_root()
+    tk_note = "incluse" if root else "non mesurée (pas d'affichage)"
+    print(f"aperçu {size[0]}x{size[1]}, PhotoImage {tk_note}")
+    print(f"{'résolution':<10} {'ancien ms CPU':>14} {'nouveau ms CPU':>15} {'gain':>7}")
+    rng = np.random.default_rng(0)
+    for label, (width, height) in RESOLUTIONS.items():
+        frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        overlays = [((width // 3, height // 4, width // 4, height // 3), "Prénom Nom", (0, 255, 0))]
+        renderer, state = PreviewRenderer(size), {}
+        old = _cpu_ms(lambda: _old_render(frame, overlays, size, root), args.repeat)
+        new = _cpu_ms(lambda: _new_render(renderer, state, frame, overlays, root), args.repeat)
+        print(f"{label:<10} {old:>14.3f} {new:>15.3f} {1 - new / old:>7.0%}")
+    if root is not None:
+        root.destroy()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
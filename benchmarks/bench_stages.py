@@ -0,0 +1,245 @@
+"""
+Temps de chaque étape de la chaîne : détection, encodage, recherche, débit, aperçu.
+
+    python -m benchmarks.bench_stages [--sizes 100,1000,10000] [--save resultats.json]
+    python -m benchmarks.bench_stages --compare baseline.json [--threshold 0.2]
+
+- détection / encodage / aperçu : frames 640x480, 720p et 1080p construites à
+  partir d'une photo d'enrôlement, ou frames enregistrées (--frames dossier) ;
+- recherche / débit : galeries synthétiques de la taille demandée, stockage
+  JSON + binaire et SQLite dans un dossier temporaire.
+
+Chaque mesure donne p50, p99 et débit (opérations/s). --compare relance les
+mesures et signale les étapes dont le p50 dépasse la référence de plus de
+--threshold (code de sortie 1).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+
+from models.student import Student
+from services.encoding_store import EncodingStore
+from services.face_encoders import FACE_SHAPE, create_encoder
+from services.face_store import FaceStore
+from services.gallery_index import GalleryIndex
+from services.sqlite_storage import SqliteStorageService
+from services.storage import StorageService
+from services.student_service import StudentService
+from ui.preview import PreviewRenderer
+from utils.paths import IMAGES_DIR
+from utils.quantization import dequantize
+
+RESOLUTIONS = {"640x480": (640, 480), "720p": (1280, 720), "1080p": (1920, 1080)}
+TEMPLATE_DIM = FACE_SHAPE[0] * FACE_SHAPE[1]
+
+
+def _measure(run: Callable[[], object], repeat: int, warmup: int = 1) -> List[float]:
+    for _ in range(warmup):
+        run()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def summarize(durations: List[float]) -> Dict[str, float]:
+    ms = np.asarray(durations, dtype=np.float64) * 1000
+    return {
+        "samples": len(durations),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "per_second": float(1000 / ms.mean()) if ms.mean() > 0 else 0.0,
+    }
+
+
+def _load_frames(frames_dir: Path | None) -> Dict[str, List[np.ndarray]]:
+    """Frames enregistrées (une série) ou synthétiques (une par résolution)."""
+    if frames_dir is not None:
+        paths = sorted(p for p in frames_dir.iterdir() if p.suffix.lower() in (".jpg", ".png"))
+        frames = [f for f in (cv2.imread(str(p)) for p in paths) if f is not None]
+        if not frames:
+            raise SystemExit(f"Aucune frame lisible dans {frames_dir}.")
+        return {"enregistrées": frames}
+    images = sorted(IMAGES_DIR.glob("*.jpg"))
+    image = cv2.imread(str(images[0])) if images else None
+    if image is None:
+        raise SystemExit("Aucune image dans data/images pour construire les frames.")
+    return {label: [cv2.resize(image, size)] for label, size in RESOLUTIONS.items()}
+
+
+def bench_frames(store: FaceStore, frames: Dict[str, List[np.ndarray]], repeat: int) -> dict:
+    results = {}
+    for label, series in frames.items():
+        grays = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in series]
+        cursor = iter(range(10**9))
+
+        def pick(items):
+            return items[next(cursor) % len(items)]
+
+        results[f"detect/{label}"] = summarize(
+            _measure(lambda: store._detect_faces(pick(grays)), repeat)
+        )
+        faces = [(g, store._detect_faces(g)[:1]) for g in grays]
+        faces = [(g, boxes) for g, boxes in faces if boxes]
+        if faces:
+            results[f"encode/{label}"] = summarize(
+                _measure(lambda: store.encode_faces_batch(*pick(faces)), repeat)
+            )
+        # Aperçu comme dans la vue : un PreviewRenderer réutilisé, visages encadrés
+        renderer = PreviewRenderer()
+        shown = [
+            (frame, [(box, "Etudiant", (0, 255, 0)) for box in store._detect_faces(gray)[:1]])
+            for frame, gray in zip(series, grays)
+        ]
+        results[f"preview/{label}"] = summarize(
+            _measure(lambda: renderer.render(*pick(shown)), repeat)
+        )
+    return results
+
+
+def _synthetic_students(size: int) -> List[Student]:
+    return [
+        Student(f"{i:06d}", "Prénom", f"Nom{i}", 1_000_000.0, f"synthetic/{i}.jpg")
+        for i in range(size)
+    ]
+
+
+def _synthetic_templates(size: int, seed: int = 0) -> np.ndarray:
+    """Modèles uint8 (N, 10000) générés par blocs pour borner la mémoire."""
+    rng = np.random.default_rng(seed)
+    matrix = np.empty((size, TEMPLATE_DIM), dtype=np.uint8)
+    for start in range(0, size, 4096):
+        stop = min(size, start + 4096)
+        matrix[start:stop] = rng.integers(0, 256, (stop - start, TEMPLATE_DIM), dtype=np.uint8)
+    return matrix
+
+
+def bench_gallery(size: int, encoder_name: str, repeat: int, workdir: Path) -> dict:
+    results = {}
+    students = _synthetic_students(size)
+    ids = [s.student_id for s in students]
+    templates = _synthetic_templates(size)
+
+    # Stockage JSON + encodages binaires (écrits directement, sans passer par des listes)
+    EncodingStore(workdir / "face_encodings.npy").write(ids, templates)
+    storage = StorageService(workdir / "students.json", workdir / "face_encodings.npy")
+    storage.save_students(students)
+
+    encoder = create_encoder({"name": encoder_name}, workdir)
+    store = FaceStore(workdir / "images", encoder=encoder)
+    service = StudentService(storage, store, GalleryIndex(storage, encoder))
+
+    start = time.perf_counter()
+    service.gallery.refresh()
+    results["gallery_load"] = summarize([time.perf_counter() - start])
+
+    rng = np.random.default_rng(1)
+    queries = [
+        (dequantize(templates[row]) + rng.normal(0, 0.02, TEMPLATE_DIM)).astype(np.float32).tolist()
+        for row in rng.integers(0, size, 16)
+    ]
+    cursor = iter(range(10**9))
+    results["match_encoding"] = summarize(
+        _measure(lambda: service.match_encoding(queries[next(cursor) % len(queries)]), repeat)
+    )
+
+    # Le débit JSON réécrit tout le fichier : peu de répétitions suffisent
+    persist_repeat = max(3, min(repeat, 20))
+    results["decrement_balance/json"] = summarize(
+        _measure(lambda: service.decrement_balance(ids[next(cursor) % size], 1.0), persist_repeat)
+    )
+    sqlite = SqliteStorageService(workdir / "students.db")
+    sqlite.save_students(students)
+    results["decrement_balance/sqlite"] = summarize(
+        _measure(lambda: sqlite.decrement_balance(ids[next(cursor) % size], 1.0), repeat)
+    )
+    sqlite.close()
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Étapes dont le p50 dépasse celui de la référence de plus de threshold."""
+    regressions = []
+    print(f"\n{'étape':<42} {'p50 réf.':>10} {'p50':>10} {'écart':>8}")
+    for key, result in current["results"].items():
+        reference = baseline.get("results", {}).get(key)
+        if reference is None or reference["p50_ms"] <= 0:
+            continue
+        ratio = result["p50_ms"] / reference["p50_ms"] - 1
+        flag = "  RÉGRESSION" if ratio > threshold else ""
+        print(f"{key:<42} {reference['p50_ms']:>10.3f} {result['p50_ms']:>10.3f} {ratio:>+8.0%}{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="100,1000,10000", help="Tailles de galerie")
+    parser.add_argument("--encoder", default="raw", choices=("raw", "lbp", "pca"))
+    parser.add_argument("--frames", type=Path, default=None, help="Dossier de frames enregistrées")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument(
+        "--max-gallery-mb", type=int, default=2048,
+        help="Tailles dont la matrice float32 dépasse cette mémoire ignorées (100k ≈ 4 Go)",
+    )
+    parser.add_argument("--save", type=Path, default=None, help="Fichier JSON des résultats")
+    parser.add_argument("--compare", type=Path, default=None, help="Résultats de référence")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Régression tolérée (0.2 = +20 %%)")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FaceStore(Path(tmp))
+        results.update(bench_frames(store, _load_frames(args.frames), args.repeat))
+        for size in (int(s) for s in args.sizes.split(",")):
+            if size * TEMPLATE_DIM * 4 > args.max_gallery_mb * 1024 * 1024:
+                print(f"galerie {size} ignorée (> {args.max_gallery_mb} Mo, voir --max-gallery-mb)")
+                continue
+            workdir = Path(tmp) / f"gallery_{size}"
+            workdir.mkdir()
+            for key, value in bench_gallery(size, args.encoder, args.repeat, workdir).items():
+                results[f"{key}/{size}"] = value
+
+    print(f"{'étape':<42} {'p50 ms':>10} {'p99 ms':>10} {'ops/s':>10}")
+    for key, value in results.items():
+        print(f"{key:<42} {value['p50_ms']:>10.3f} {value['p99_ms']:>10.3f} {value['per_second']:>10.1f}")
+
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "machine": platform.machine(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "encoder": args.encoder,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.save is not None:
+        args.save.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Résultats enregistrés dans {args.save}")
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} régression(s) au-delà de {args.threshold:.0%}.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,86 @@
+"""
+Temps de démarrage, mesurés dans un interpréteur neuf à chaque essai.
+
+    python -m benchmarks.bench_startup [--runs 5] [--image data/images/1.jpg]
+
+- écran de connexion : imports nécessaires avant la fenêtre de connexion (app.py) ;
+- services prêts : construction + préchauffage (galerie, cascades), fait en
+  arrière-plan pendant la saisie du mot de passe ;
+- premier visage reconnu : première frame contenant un étudiant enrôlé
+  (sans débit), services déjà préchauffés.
+La fenêtre Tk elle-même n'est pas créée : le script tourne sans affichage.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from utils.paths import BASE_DIR, IMAGES_DIR
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t_login = time.perf_counter() - t0
+
+import cv2
+from services.access_engine import AccessEngine
+from services.bootstrap import build_services, warm_up
+from utils.settings import load_settings
+
+settings = load_settings()
+settings["lanes"] = settings["lanes"][:1]
+services = build_services(settings)
+warm_up(services)
+t_ready = time.perf_counter() - t0
+
+frame = cv2.resize(cv2.imread(sys.argv[1]), (640, 480))
+engine = AccessEngine(services.student_service, services.lanes[0].face_store, dry_run=True)
+for _ in range(10):
+    if any(t.student for t in engine.process(frame).tracks):
+        break
+t_first = time.perf_counter() - t0
+print(json.dumps({"login": t_login, "ready": t_ready, "first_face": t_first}))
+"""
+
+LABELS = {
+    "login": "écran de connexion",
+    "ready": "services prêts",
+    "first_face": "premier visage reconnu",
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--image", type=Path, default=None, help="Photo d'un étudiant enrôlé")
+    args = parser.parse_args(argv)
+
+    image = args.image or next(iter(sorted(IMAGES_DIR.glob("*.jpg"))), None)
+    if image is None:
+        raise SystemExit("Aucune image dans data/images.")
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE, str(image)],
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{'jalon':<24} {'médiane s':>10} {'max s':>8}")
+    for key, label in LABELS.items():
+        values = np.array([run[key] for run in runs])
+        print(f"{label:<24} {np.median(values):>10.3f} {values.max():>8.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,412 @@
+"""Commandes d'administration en ligne de commande (sans interface Tkinter)."""
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from utils.paths import DATA_DIR, ENCODINGS_FILE, MODELS_DIR, STUDENTS_FILE
+from utils.settings import load_settings
+
+
+def cmd_migrate_encodings(args: argparse.Namespace) -> int:
+    from services.storage import StorageService
+
+    legacy = StorageService(Path(args.students)).load_students()
+    count = sum(1 for student in legacy if student.has_encoding)
+    # La migration est faite à l'initialisation en mode binaire
+    StorageService(Path(args.students), Path(args.encodings))
+    print(f"{count} encodage(s) migré(s) vers {args.encodings} ({len(legacy)} étudiants).")
+    return 0
+
+
+def cmd_migrate_sqlite(args: argparse.Namespace) -> int:
+    from services.sqlite_storage import SqliteStorageService
+    from services.storage import StorageService
+
+    source = StorageService(Path(args.students), Path(args.encodings))
+    target = SqliteStorageService(Path(args.database))
+    count = target.import_from(source)
+    target.close()
+    print(f"{count} étudiant(s) copié(s) vers {args.database}.")
+    print('Activer avec "storage": {"backend": "sqlite"} dans data/settings.json.')
+    return 0
+
+
+def cmd_fit_encoder(args: argparse.Namespace) -> int:
+    from services.face_encoders import create_encoder
+    from services.storage import create_storage
+
+    settings = load_settings()
+    encoder = create_encoder(settings["encoder"], MODELS_DIR)
+    ids, templates = create_storage(settings).load_encodings()
+    if not ids:
+        print("Aucun encodage enregistré : rien à apprendre.")
+        return 1
+    encoder.fit(templates)
+    dim = encoder.transform(templates[:1]).shape[1]
+    print(f"Encodeur {encoder.identifier} : {len(ids)} modèles, {dim} dimensions.")
+    return 0
+
+
+def cmd_import_roster(args: argparse.Namespace) -> int:
+    from services.bulk_import import import_roster, read_roster
+    from services.crop_archive import CropArchive
+    from services.face_store import DetectionConfig, create_face_store
+    from services.storage import create_storage
+    from utils.paths import CROPS_FILE, IMAGES_DIR
+
+    settings = load_settings()
+    entries = read_roster(Path(args.csv), Path(args.photos))
+    if not entries:
+        print("Aucun étudiant dans le fichier CSV.")
+        return 1
+
+    def progress(done: int, total: int, rate: float) -> None:
+        print(f"\r{done}/{total} photos ({rate:.1f} photos/s)", end="", flush=True)
+
+    report = import_roster(
+        entries,
+        create_storage(settings),
+        create_face_store(IMAGES_DIR, DetectionConfig(**settings["detection"]), enrollment=True),
+        IMAGES_DIR,
+        workers=args.workers,
+        max_side=args.max_side,
+        on_progress=progress,
+        crop_archive=CropArchive(CROPS_FILE),
+    )
+    print()
+    for photo, error in report.failures:
+        print(f"ÉCHEC {photo} : {error}")
+    print(
+        f"{len(report.imported)} étudiant(s) importé(s), {len(report.failures)} échec(s) "
+        f"en {report.elapsed:.1f} s ({report.photos_per_second:.1f} photos/s)."
+    )
+    return 1 if report.failures else 0
+
+
+def cmd_reencode(args: argparse.Namespace) -> int:
+    from services.crop_archive import CropArchive
+    from services.face_store import DetectionConfig, create_face_store
+    from services.reencode import reencode_gallery
+    from services.storage import create_storage
+    from utils.paths import CROPS_FILE, IMAGES_DIR
+
+    settings = load_settings()
+    face_store = None
+    if args.from_photos:
+        face_store = create_face_store(
+            IMAGES_DIR, DetectionConfig(**settings["detection"]), enrollment=True
+        )
+
+    def progress(done: int, total: int) -> None:
+        print(f"\r{done}/{total} modèles", end="", flush=True)
+
+    report = reencode_gallery(
+        CropArchive(CROPS_FILE),
+        create_storage(settings),
+        face_store,
+        workers=args.workers,
+        force=args.force,
+        on_progress=progress,
+    )
+    print()
+    for student_id, error in report.failures:
+        print(f"ÉCHEC {student_id} : {error}")
+    if report.archived:
+        print(f"{report.archived} visage(s) archivé(s) depuis les photos.")
+    if report.missing:
+        print(
+            f"{len(report.missing)} étudiant(s) sans visage archivé "
+            "(--from-photos pour les archiver depuis leur photo)."
+        )
+    print(
+        f"{report.rebuilt} modèle(s) recalculé(s), {report.skipped} inchangé(s), "
+        f"{len(report.failures)} échec(s) en {report.elapsed:.1f} s."
+    )
+    if report.rebuilt and settings["encoder"]["name"] == "pca":
+        print("Modèles modifiés : relancer fit-encoder pour réapprendre l'encodeur PCA.")
+    return 1 if report.failures else 0
+
+
+def cmd_run_lane(args: argparse.Namespace) -> int:
+    import time
+    from collections import Counter
+
+    from services.access_engine import AccessEngine
+    from services.bootstrap import build_services, warm_up
+    from services.scheduling import SchedulingConfig
+
+    settings = load_settings()
+    scheduling = SchedulingConfig(**settings["scheduling"])
+    # Rejouer un fichier ne débite pas, sauf demande explicite
+    dry_run = args.dry_run or ((args.source or args.replay) is not None and not args.debit)
+    if args.replay is not None:
+        replay = str(Path(args.replay).resolve())
+        settings["lanes"] = [{"name": args.lane or Path(args.replay).stem, "replay": replay}]
+    elif args.source is not None or args.camera is not None:
+        camera = args.camera if args.camera is not None else 0
+        settings["lanes"] = [{"name": args.lane or f"Caméra {camera}", "camera_index": camera}]
+    services = build_services(settings)
+    warm_up(services)
+    service, lanes = services.student_service, services.lanes
+    counts: Counter = Counter()
+    engines = []
+    for lane in lanes:
+        engine = AccessEngine(
+            service, lane.face_store, lane=lane.name, dry_run=dry_run, scheduling=scheduling
+        )
+        engine.subscribe(lambda event: print(f"[{event.lane}] {event.describe()}"))
+        engine.subscribe(lambda event: counts.update([event.kind]))
+        if services.passage_log is not None and not dry_run:
+            engine.subscribe(services.passage_log.append)
+        engines.append(engine)
+    if dry_run:
+        print("Mode simulation : aucun solde ne sera débité ni journalisé.")
+
+    if args.source is None:
+        status = _run_live_lanes(lanes, engines, counts, scheduling)
+        _close_services(services)
+        return status
+
+    from services.frame_sources import open_frames
+
+    start = time.perf_counter()
+    origin = time.time()
+    frames = 0
+    for position, frame in open_frames(Path(args.source), args.fps):
+        engines[0].process(frame, timestamp=origin + position)
+        frames += 1
+    elapsed = time.perf_counter() - start
+    _close_services(services)
+    print(
+        f"{frames} frames en {elapsed:.1f} s ({frames / elapsed if elapsed else 0:.1f} frames/s) : "
+        f"{counts['granted']} accès, {counts['insufficient']} solde insuffisant, "
+        f"{counts['refused']} refus."
+    )
+    return 0
+
+
+def cmd_record_camera(args: argparse.Namespace) -> int:
+    import time
+
+    from services.camera import CameraService
+
+    output = Path(args.output)
+    camera = CameraService(camera_index=args.camera, record_to=output)
+    try:
+        camera.get_video_capture()
+    except RuntimeError:
+        print(f"Caméra {args.camera} non disponible.")
+        return 1
+    print(f"Enregistrement de la caméra {args.camera} dans {output} (Ctrl+C pour arrêter).")
+    start = time.perf_counter()
+    try:
+        while not args.seconds or time.perf_counter() - start < args.seconds:
+            ok, _ = camera.read()
+            if not ok:
+                print("Erreur de lecture caméra : enregistrement arrêté.")
+                break
+    except KeyboardInterrupt:
+        pass
+    elapsed = time.perf_counter() - start
+    frames = camera.stop_recording()
+    camera.release()
+    size = output.stat().st_size / 1e6 if output.exists() else 0.0
+    print(
+        f"{frames} frames en {elapsed:.1f} s ({frames / elapsed if elapsed else 0:.1f} frames/s), "
+        f"{size:.1f} Mo."
+    )
+    return 0 if frames else 1
+
+
+def _close_services(services) -> None:
+    """Écrit les débits en file et ferme le journal des passages."""
+    services.student_service.close()
+    if services.passage_log is not None:
+        services.passage_log.close()
+
+
+def cmd_passage_report(args: argparse.Namespace) -> int:
+    import datetime as dt
+
+    from services.passage_log import PassageLog
+    from utils.paths import PASSAGES_DIR
+
+    start = dt.date.fromisoformat(args.start) if args.start else None
+    end = dt.date.fromisoformat(args.end) if args.end else None
+    if args.month:
+        start = dt.date.fromisoformat(f"{args.month}-01")
+        end = (start + dt.timedelta(days=31)).replace(day=1) - dt.timedelta(days=1)
+    summary = PassageLog(PASSAGES_DIR).summarize(start, end, args.lane, args.student)
+    if not summary.days:
+        print("Aucun passage journalisé sur la période.")
+        return 1
+
+    if not args.hours_only:
+        print(f"{'jour':<12} {'accès':>7} {'refus':>7} {'% refus':>8} {'recette €':>10}")
+        for day, (meals, refused, revenue) in zip(summary.days, summary.per_day):
+            rate = refused / (meals + refused) if meals + refused else 0.0
+            print(
+                f"{day.isoformat():<12} {meals:>7.0f} {refused:>7.0f} {rate:>8.1%} "
+                f"{revenue:>10.2f}"
+            )
+        print()
+    peak = max(1, int(summary.per_hour.max()))
+    print("Accès par heure (toute la période) :")
+    for hour, count in enumerate(summary.per_hour):
+        if count:
+            print(f"{hour:02d}h {count:>7} {'#' * max(1, round(40 * count / peak))}")
+    print(
+        f"\n{len(summary.days)} jour(s) : {summary.meals} accès, {summary.refused} refus "
+        f"({summary.refused_rate:.1%}), recette {summary.revenue:.2f} €."
+    )
+    return 0
+
+
+def _run_live_lanes(lanes, engines, counts, scheduling) -> int:
+    """Une paire de threads (capture + reconnaissance) par voie, galerie partagée."""
+    import time
+
+    from services.pipeline import RecognitionPipeline
+    from services.scheduling import AdaptiveScheduler
+
+    pipelines = []
+    for lane, engine in zip(lanes, engines):
+        camera = lane.camera_service
+        try:
+            camera.get_video_capture()
+        except RuntimeError:
+            source = camera.replay or f"caméra {camera.camera_index}"
+            print(f"{lane.name} : {source} non disponible.")
+            continue
+        pipeline = RecognitionPipeline(
+            read=lane.camera_service.read,
+            process=engine.process,
+            on_error=lambda exc, name=lane.name: print(f"Erreur temporaire ({name}) : {exc}"),
+            scheduler=AdaptiveScheduler(scheduling),
+            is_active=lambda result: result.active,
+        )
+        pipeline.start()
+        pipelines.append((lane, pipeline))
+    if not pipelines:
+        return 1
+    print(f"{len(pipelines)} voie(s) active(s) (Ctrl+C pour arrêter).")
+    try:
+        # Sessions rejouées : arrêt à la fin de la dernière
+        while not all(lane.camera_service.finished for lane, _ in pipelines):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for lane, pipeline in pipelines:
+            pipeline.stop()
+            lane.camera_service.release()
+    dropped = sum(pipeline.dropped_frames for _, pipeline in pipelines)
+    skipped = sum(pipeline.skipped_frames for _, pipeline in pipelines)
+    print(
+        f"{sum(counts.values())} événement(s), {dropped} frame(s) ignorée(s), "
+        f"{skipped} non analysée(s) (cadence adaptée)."
+    )
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Administration du contrôle d'accès")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    migrate = sub.add_parser(
+        "migrate-encodings",
+        help="Déplace les encodages de students.json vers le fichier binaire",
+    )
+    migrate.add_argument("--students", default=str(STUDENTS_FILE))
+    migrate.add_argument("--encodings", default=str(ENCODINGS_FILE))
+    migrate.set_defaults(func=cmd_migrate_encodings)
+
+    sqlite = sub.add_parser(
+        "migrate-sqlite", help="Copie students.json (+ encodages) dans une base SQLite"
+    )
+    sqlite.add_argument("--students", default=str(STUDENTS_FILE))
+    sqlite.add_argument("--encodings", default=str(ENCODINGS_FILE))
+    sqlite.add_argument("--database", default=str(DATA_DIR / "students.db"))
+    sqlite.set_defaults(func=cmd_migrate_sqlite)
+
+    fit = sub.add_parser(
+        "fit-encoder", help="(Ré)apprend l'encodeur configuré (PCA) sur la base enrôlée"
+    )
+    fit.set_defaults(func=cmd_fit_encoder)
+
+    roster = sub.add_parser(
+        "import-roster", help="Enrôle en masse des étudiants depuis un CSV et un dossier de photos"
+    )
+    roster.add_argument("csv", help="student_id,first_name,last_name,balance,photo")
+    roster.add_argument("--photos", default=".", help="Dossier des photos (chemins relatifs)")
+    roster.add_argument("--workers", type=int, default=0, help="Processus (0 = tous les cœurs)")
+    roster.add_argument(
+        "--max-side", type=int, default=800, help="Décodage réduit des photos (0 = taille réelle)"
+    )
+    roster.set_defaults(func=cmd_import_roster)
+
+    reencode = sub.add_parser(
+        "re-encode", help="Recalcule les modèles stockés depuis l'archive de visages"
+    )
+    reencode.add_argument("--workers", type=int, default=0, help="Processus (0 = tous les cœurs)")
+    reencode.add_argument("--force", action="store_true", help="Recalcule aussi les inchangés")
+    reencode.add_argument(
+        "--from-photos",
+        action="store_true",
+        help="Archive d'abord le visage des étudiants qui n'en ont pas (depuis leur photo)",
+    )
+    reencode.set_defaults(func=cmd_reencode)
+
+    lane = sub.add_parser(
+        "run-lane", help="Voie(s) de contrôle sans interface (caméras, vidéo ou dossier d'images)"
+    )
+    lane.add_argument(
+        "--camera", type=int, default=None, help="Une seule caméra (défaut : voies de settings.json)"
+    )
+    lane.add_argument(
+        "--source",
+        default=None,
+        help="Vidéo, dossier d'images ou session .camrec traité au plus vite",
+    )
+    lane.add_argument(
+        "--replay", default=None, help="Session .camrec rejouée comme une caméra (temps réel)"
+    )
+    lane.add_argument("--fps", type=float, default=15.0, help="Cadence supposée des images")
+    lane.add_argument("--lane", default="", help="Nom de la voie dans les événements")
+    lane.add_argument("--dry-run", action="store_true", help="Ne débite pas les soldes")
+    lane.add_argument("--debit", action="store_true", help="Débite aussi en rejeu de fichier")
+    lane.set_defaults(func=cmd_run_lane)
+
+    record = sub.add_parser(
+        "record-camera", help="Enregistre une session caméra (.camrec) pour la rejouer"
+    )
+    record.add_argument("output", help="Fichier de sortie (.camrec)")
+    record.add_argument("--camera", type=int, default=0, help="Index de la caméra")
+    record.add_argument("--seconds", type=float, default=0.0, help="Durée (0 = jusqu'à Ctrl+C)")
+    record.set_defaults(func=cmd_record_camera)
+
+    report = sub.add_parser(
+        "passage-report", help="Statistiques des passages : accès par jour/heure, recette, refus"
+    )
+    report.add_argument("--from", dest="start", default=None, help="Premier jour (AAAA-MM-JJ)")
+    report.add_argument("--to", dest="end", default=None, help="Dernier jour (AAAA-MM-JJ)")
+    report.add_argument("--month", default=None, help="Un mois entier (AAAA-MM)")
+    report.add_argument("--lane", default=None, help="Une seule voie")
+    report.add_argument("--student", default=None, help="Un seul étudiant (rapprochement)")
+    report.add_argument(
+        "--hours-only", action="store_true", help="Seulement la répartition par heure"
+    )
+    report.set_defaults(func=cmd_passage_report)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,66 @@
+from __future__ import annotations
+
 from dataclasses import dataclass, field
-from typing import List
+from typing import Optional
+
+import numpy as np
+
+from utils.quantization import dequantize, quantize
 
+# Encodage vide partagé (étudiants chargés sans modèles) : aucune allocation par étudiant
+NO_ENCODING = np.empty(0, dtype=np.uint8)
+NO_ENCODING.setflags(write=False)
 
-@dataclass
+
+@dataclass(slots=True)
 class Student:
+    """
+    Étudiant compact (__slots__, pas de __dict__) : face_encoding est un tableau
+    uint8 (pixels du ou des modèles, format "raw/1" des fichiers), souvent une
+    vue sur une matrice partagée, au lieu d'une liste de 10 000 floats Python.
+    Une liste ou un tableau float [0, 1] passé au constructeur est quantifié.
+    """
+
     student_id: str
     first_name: str
     last_name: str
     balance: float
     image_path: str
-    face_encoding: List[float] = field(default_factory=list)
+    face_encoding: np.ndarray = field(
+        default_factory=lambda: NO_ENCODING, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        encoding = self.face_encoding
+        if not isinstance(encoding, np.ndarray) or encoding.dtype != np.uint8:
+            self.face_encoding = quantize(encoding).ravel() if len(encoding) else NO_ENCODING
 
     @property
     def display_name(self) -> str:
         return f"{self.first_name} {self.last_name}"
+
+    @property
+    def has_encoding(self) -> bool:
+        return self.face_encoding.size > 0
+
+    def to_dict(self, encoding: bool = True) -> dict:
+        """Entrée de students.json (encodage en floats [0, 1], comme avant)."""
+        payload = {
+            "student_id": self.student_id,
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+            "balance": self.balance,
+            "image_path": self.image_path,
+        }
+        if encoding:
+            payload["face_encoding"] = dequantize(self.face_encoding).tolist()
+        return payload
+
+    @classmethod
+    def from_dict(cls, data: dict, encoding: Optional[np.ndarray] = None) -> "Student":
+        """Inverse de to_dict() ; encoding : modèles uint8 déjà quantifiés (vue partagée)."""
+        data = dict(data)
+        face_encoding = data.pop("face_encoding", None)
+        if encoding is None:
+            encoding = face_encoding if face_encoding else NO_ENCODING
+        return cls(face_encoding=encoding, **data)
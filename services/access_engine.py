@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from services.access_events import GRANTED, INSUFFICIENT, REFUSED, AccessEvent
+from services.face_store import Box, FaceStore
+from services.face_tracker import FaceTracker, Track
+from services.scheduling import MotionDetector, SchedulingConfig
+from services.student_service import StudentService
+from services.telemetry import TELEMETRY
+from utils import startup
+
+Overlay = Tuple[Box, str, Tuple[int, int, int]]
+
+
+@dataclass
+class FrameResult:
+    """Sortie du moteur pour une frame : pistes visibles, événements, statut."""
+
+    tracks: List[Track] = field(default_factory=list)
+    events: List[AccessEvent] = field(default_factory=list)
+    status: Optional[str] = None
+    motion: bool = True  # l'image a changé (toujours True sans détecteur de mouvement)
+    skipped: bool = False  # détection sautée : personne de suivi, rien n'a bougé
+
+    @property
+    def active(self) -> bool:
+        """Quelqu'un est (peut-être) devant la caméra : cadence d'analyse rapide."""
+        return bool(self.tracks) or self.motion
+
+
+class AccessEngine:
+    """
+    Logique d'une voie de contrôle d'accès, sans interface : frames en entrée,
+    décisions en sortie.
+    - détection (autour des pistes connues, balayage complet périodique), suivi,
+      encodage + recherche en lot pour les pistes à (re)vérifier ;
+    - un débit par passage (piste) et par étudiant (TTL) ;
+    - détection sautée tant que personne n'est suivi et que l'image ne bouge
+      pas (scheduling.motion_gate), avec une vérification toutes les
+      recheck_seconds ;
+    - les abonnés (subscribe) reçoivent chaque AccessEvent dans le thread appelant.
+    dry_run : décisions calculées sans débiter le stockage (rejeu de vidéos).
+    """
+
+    def __init__(
+        self,
+        student_service: StudentService,
+        face_store: FaceStore,
+        debit_amount: float = 1.0,
+        debit_ttl_seconds: float = 30.0,
+        lane: str = "",
+        dry_run: bool = False,
+        scheduling: Optional[SchedulingConfig] = None,
+    ):
+        self.student_service = student_service
+        self.face_store = face_store
+        self.debit_amount = debit_amount
+        self.debit_ttl_seconds = debit_ttl_seconds
+        self.lane = lane
+        self.dry_run = dry_run
+        self._cooldown_seconds = 3  # Durée d'affichage du dernier débit
+        self._last_detection_time = 0.0
+        self._last_debit_by_student: Dict[str, float] = {}
+        # Marge jugée sûre : 10 % du seuil de l'encodeur actif
+        self._tracker = FaceTracker(min_margin=0.1 * student_service.default_tolerance)
+        self._frame_index = 0
+        self._scheduling = scheduling or SchedulingConfig(motion_gate=False)
+        self._motion: Optional[MotionDetector] = None
+        if self._scheduling.motion_gate:
+            self._motion = MotionDetector(self._scheduling.motion_threshold)
+        self._last_scan_time = float("-inf")
+        self._recognized_once = False
+        self._subscribers: List[Callable[[AccessEvent], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[AccessEvent], None]) -> None:
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[AccessEvent], None]) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def reset(self) -> None:
+        """Oublie les pistes en cours (changement de caméra, reprise)."""
+        with self._lock:
+            self._tracker.reset()
+            if self._motion is not None:
+                self._motion.reset()
+
+    def process(self, frame, timestamp: Optional[float] = None) -> FrameResult:
+        """Analyse une frame BGR ; timestamp (secondes) = horloge murale par défaut."""
+        with self._lock, TELEMETRY.span("frame"):
+            result = self._process(frame, time.time() if timestamp is None else timestamp)
+        TELEMETRY.frame_done()
+        for event in result.events:
+            for callback in list(self._subscribers):
+                callback(event)
+        return result
+
+    def _process(self, frame, current_time: float) -> FrameResult:
+        result = FrameResult()
+
+        if self._motion is not None:
+            with TELEMETRY.span("motion"):
+                result.motion = self._motion.changed(frame)
+            if (
+                not result.motion
+                and not self._tracker.boxes()
+                and current_time - self._last_scan_time < self._scheduling.recheck_seconds
+            ):
+                result.skipped = True
+                if current_time - self._last_detection_time > 2:
+                    result.status = "En attente - Positionnez-vous devant la caméra..."
+                return result
+        self._last_scan_time = current_time
+
+        self._frame_index += 1
+        full_scan_every = max(1, self.face_store.detection.full_scan_every)
+        hints = self._tracker.boxes() if self._frame_index % full_scan_every else None
+        gray, boxes = self.face_store.detect_faces_in_frame(frame, hints=hints)
+        result.tracks = self._tracker.update(boxes)
+
+        if not result.tracks:
+            if current_time - self._last_detection_time > 2:
+                result.status = "En attente - Positionnez-vous devant la caméra..."
+            return result
+
+        # Encodage + recherche en un seul passage matriciel pour les pistes à (re)vérifier
+        pending = [track for track in result.tracks if self._tracker.needs_match(track)]
+        if pending:
+            encodings = self.face_store.encode_faces_batch(gray, [t.box for t in pending])
+            matches = self.student_service.match_encodings(encodings)
+            for track, match in zip(pending, matches):
+                self._tracker.assign(track, match)
+
+        if not self._recognized_once and any(t.student for t in result.tracks):
+            self._recognized_once = True
+            startup.mark("premier visage reconnu")
+
+        for track in result.tracks:
+            student = track.student
+            if student is None:
+                if track.matched and not track.reported_unknown:
+                    track.reported_unknown = True
+                    result.events.append(
+                        AccessEvent(REFUSED, current_time, track.track_id, self.lane)
+                    )
+                if (
+                    result.status is None
+                    and current_time - self._last_detection_time > self._cooldown_seconds
+                ):
+                    result.status = "✗ Visage non reconnu - Accès refusé"
+                continue
+
+            # Débiter une fois par passage (piste) et par étudiant (TTL)
+            if self._should_debit(track, current_time):
+                event = self._debit(track, current_time)
+                result.events.append(event)
+                name = event.student.display_name
+                if event.kind == GRANTED:
+                    result.status = f"✓ Accès autorisé : {name} | Solde : {event.balance:.2f} €"
+                else:
+                    result.status = f"⚠ Solde insuffisant : {name} (0.00 €)"
+            elif result.status is None:
+                # Afficher l'état reconnu sans débiter
+                result.status = (
+                    f"Reconnu : {student.display_name} | Solde : {track.student.balance:.2f} €"
+                )
+        return result
+
+    def _should_debit(self, track: Track, current_time: float) -> bool:
+        """
+        Un seul débit par piste, une fois son identité sûre (une piste ambiguë
+        qui passe de A à B ne débite personne deux fois), et pas deux fois le
+        même étudiant avant le TTL.
+        """
+        if track.debited_student_id is not None or not self._tracker.is_confident(track):
+            return False
+        student_id = track.student.student_id
+        last_debit = self._last_debit_by_student.get(student_id)
+        if last_debit is not None and current_time - last_debit <= self.debit_ttl_seconds:
+            track.debited_student_id = student_id
+            return False
+        return True
+
+    def _debit(self, track: Track, current_time: float) -> AccessEvent:
+        student = track.student
+        self._last_detection_time = current_time
+        self._last_debit_by_student[student.student_id] = current_time
+        track.debited_student_id = student.student_id
+        if self.dry_run:
+            balance = max(0.0, student.balance - self.debit_amount)
+        else:
+            updated = self.student_service.decrement_balance(
+                student.student_id, self.debit_amount
+            )
+            if updated is not None:
+                track.student = updated
+            balance = (updated or student).balance
+        return AccessEvent(
+            GRANTED if balance > 0 else INSUFFICIENT,
+            current_time,
+            track.track_id,
+            self.lane,
+            track.student,
+            self.debit_amount,
+            balance,
+            track.distance,
+        )
+
+    @staticmethod
+    def overlays(result: FrameResult) -> List[Overlay]:
+        """Rectangles à dessiner (boîte, libellé, couleur BGR), figés pour l'affichage."""
+        overlays = []
+        for track in result.tracks:
+            if track.student is not None:
+                overlays.append((track.box, track.student.display_name, (0, 255, 0)))
+            else:
+                overlays.append((track.box, "INCONNU", (0, 0, 255)))
+        return overlays
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import datetime as dt
+from dataclasses import dataclass
+from typing import Optional
+
+from models.student import Student
+
+# Types d'événements émis par le moteur
+GRANTED = "granted"  # débit effectué, solde restant positif
+INSUFFICIENT = "insufficient"  # débit effectué, solde épuisé
+REFUSED = "refused"  # visage suivi non reconnu (une fois par passage)
+
+
+@dataclass(frozen=True)
+class AccessEvent:
+    """Décision prise pour un passage devant une voie."""
+
+    kind: str
+    timestamp: float
+    track_id: int
+    lane: str = ""
+    student: Optional[Student] = None
+    amount: float = 0.0
+    balance: float = 0.0
+    distance: float = float("inf")
+
+    @property
+    def accepted(self) -> bool:
+        return self.kind == GRANTED
+
+    def describe(self) -> str:
+        """Texte court pour un journal ou la console."""
+        when = dt.datetime.fromtimestamp(self.timestamp)
+        if self.student is None:
+            return f"{when:%H:%M:%S} visage non reconnu - accès refusé"
+        return (
+            f"{when:%H:%M:%S} {self.student.display_name} : -{self.amount:.2f} € "
+            f"(solde {self.balance:.2f} €)"
+        )
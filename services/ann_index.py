@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _nearest_centroids(data: np.ndarray, centroids: np.ndarray, chunk: int = 4096) -> np.ndarray:
+    """Indice du centroïde le plus proche de chaque ligne (par blocs pour borner la mémoire)."""
+    c_norms = np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), chunk):
+        block = data[start : start + chunk]
+        # ||x||² est constant par ligne : inutile pour l'argmin
+        scores = c_norms[None, :] - 2.0 * (block @ centroids.T)
+        labels[start : start + chunk] = np.argmin(scores, axis=1)
+    return labels
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 12, seed: int = 0) -> np.ndarray:
+    """K-means simple en NumPy ; retourne les centroïdes (k, D)."""
+    rng = np.random.default_rng(seed)
+    data = np.asarray(data, dtype=np.float32)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _nearest_centroids(data, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=k)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        filled = counts > 0
+        sums = np.add.reduceat(data[order], starts[filled], axis=0)
+        centroids[filled] = sums / counts[filled, None]
+        # Liste vide : réinitialisée sur un point pris au hasard
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), size=len(empty), replace=False)]
+    return centroids
+
+
+class IvfIndex:
+    """
+    Index approché de type IVF (listes inversées) pour les très grandes galeries :
+    - k-means en NumPy partitionne la galerie en n_lists listes ;
+    - une requête n'est comparée qu'aux membres des n_probe listes les plus proches ;
+    - affectations sauvegardées par student_id à côté du stockage, nouveaux
+      étudiants ajoutés sans réapprentissage (réappris si la base a trop grossi).
+    """
+
+    def __init__(
+        self,
+        index_file: Optional[Path] = None,
+        n_lists: int = 0,
+        n_probe: int = 8,
+        retrain_growth: float = 4.0,
+    ):
+        self.index_file = index_file
+        self.n_lists = n_lists  # 0 = automatique (≈ racine carrée de la taille)
+        self.n_probe = n_probe
+        self.retrain_growth = retrain_growth
+        self.signature = ""
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self._ids: List[str] = []
+        self._labels = np.empty(0, dtype=np.int32)
+        self._lists: List[np.ndarray] = []
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def attach(self, ids: Sequence[str], vectors: np.ndarray, signature: str) -> None:
+        """
+        Associe l'index à la galerie (lignes dans l'ordre de ids). Réutilise les
+        affectations sauvegardées, n'affecte que les nouveaux étudiants, et
+        réapprend si l'encodeur a changé (signature : encodeur et modèle appris,
+        voir FaceEncoder.fingerprint) ou si la base a trop grossi.
+        """
+        if self.is_trained and self.signature == signature:
+            saved = dict(zip(self._ids, self._labels.tolist()))
+        else:
+            saved = self._load(signature)
+        stale = (
+            not self.is_trained
+            or self.signature != signature
+            or self.centroids.shape[1] != vectors.shape[1]
+            or len(ids) > self.retrain_growth * max(1, self.trained_size)
+        )
+        if stale:
+            self.train(vectors, signature)
+            labels = _nearest_centroids(vectors, self.centroids)
+        else:
+            labels = np.array([saved.get(student_id, -1) for student_id in ids], dtype=np.int32)
+            missing = np.flatnonzero(labels < 0)
+            if len(missing):
+                labels[missing] = _nearest_centroids(vectors[missing], self.centroids)
+        self._ids = list(ids)
+        self._set_labels(labels)
+        self.save()
+
+    def train(self, vectors: np.ndarray, signature: str, max_samples: int = 50_000) -> None:
+        k = self.n_lists or int(np.sqrt(len(vectors)))
+        k = max(1, min(k, len(vectors)))
+        sample = vectors
+        if len(vectors) > max_samples:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(len(vectors), size=max_samples, replace=False)]
+        self.centroids = kmeans(sample, k)
+        self.trained_size = len(vectors)
+        self.signature = signature
+
+    def _set_labels(self, labels: np.ndarray) -> None:
+        self._labels = labels.astype(np.int32)
+        order = np.argsort(self._labels, kind="stable")
+        counts = np.bincount(self._labels, minlength=len(self.centroids))
+        self._lists = np.split(order, np.cumsum(counts)[:-1])
+
+    def add(self, row: int, student_id: str, vector: np.ndarray) -> None:
+        """Ajoute (ou déplace) la ligne row après un enregistrement, sans réapprendre."""
+        label = int(_nearest_centroids(vector[None, :], self.centroids)[0])
+        if row == len(self._ids):
+            self._ids.append(student_id)
+            self._labels = np.append(self._labels, np.int32(label))
+        else:
+            self._labels[row] = label
+        self._set_labels(self._labels)
+        self.save()
+
+    def candidates(self, query: np.ndarray, n_probe: Optional[int] = None) -> np.ndarray:
+        """Lignes de la galerie à comparer exactement pour cette requête."""
+        n_probe = min(n_probe or self.n_probe, len(self._lists))
+        c_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        scores = c_norms - 2.0 * (self.centroids @ query)
+        probes = np.argpartition(scores, n_probe - 1)[:n_probe]
+        return np.concatenate([self._lists[p] for p in probes])
+
+    def search(
+        self,
+        queries: np.ndarray,
+        matrix: np.ndarray,
+        sq_norms: np.ndarray,
+        n_probe: Optional[int] = None,
+        owners: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Pour chaque requête : (meilleure ligne, distance², 2e distance²) parmi
+        les candidats des listes sondées (inf si aucun candidat). owners : étudiant
+        de chaque ligne (plusieurs modèles par étudiant) ; le résultat est alors
+        le meilleur étudiant et la 2e distance celle d'un autre étudiant.
+        """
+        best = np.zeros(len(queries), dtype=np.intp)
+        first = np.full(len(queries), np.inf, dtype=np.float32)
+        second = np.full(len(queries), np.inf, dtype=np.float32)
+        for i, query in enumerate(queries):
+            rows = self.candidates(query, n_probe)
+            if len(rows) == 0:
+                continue
+            sq = sq_norms[rows] + float(query @ query) - 2.0 * (matrix[rows] @ query)
+            np.maximum(sq, 0.0, out=sq)
+            if owners is not None:
+                rows, inverse = np.unique(owners[rows], return_inverse=True)
+                per_owner = np.full(len(rows), np.inf, dtype=sq.dtype)
+                np.minimum.at(per_owner, inverse, sq)
+                sq = per_owner
+            if len(rows) == 1:
+                best[i], first[i] = rows[0], sq[0]
+                continue
+            top = np.argpartition(sq, 1)[:2]
+            if sq[top[1]] < sq[top[0]]:
+                top = top[::-1]
+            best[i], first[i], second[i] = rows[top[0]], sq[top[0]], sq[top[1]]
+        return best, first, second
+
+    def save(self) -> None:
+        if self.index_file is None or not self.is_trained:
+            return
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_file.with_name(self.index_file.name + ".tmp")
+        with tmp.open("wb") as handle:
+            np.savez(
+                handle,
+                signature=self.signature,
+                centroids=self.centroids,
+                trained_size=self.trained_size,
+                ids=np.asarray(self._ids, dtype=str),
+                labels=self._labels,
+            )
+        os.replace(tmp, self.index_file)
+
+    def _load(self, signature: str) -> Dict[str, int]:
+        if self.index_file is None or not self.index_file.exists():
+            return {}
+        with np.load(self.index_file) as saved:
+            if str(saved["signature"]) != signature:
+                return {}
+            self.signature = signature
+            self.centroids = saved["centroids"].astype(np.float32)
+            self.trained_size = int(saved["trained_size"])
+            return dict(zip(saved["ids"].tolist(), saved["labels"].tolist()))
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List, Optional
+
+from services import telemetry
+from services.crop_archive import CropArchive
+from services.debit_queue import DebitQueue
+from services.face_encoders import create_encoder
+from services.face_store import DetectionConfig, FaceStore, create_face_store
+from services.gallery_index import create_gallery_index
+from services.lanes import Lane, create_lanes
+from services.passage_log import PassageLog
+from services.student_repository import StudentRepository
+from services.storage import create_storage
+from services.student_service import StudentService
+from utils.paths import CROPS_FILE, DATA_DIR, IMAGES_DIR, MODELS_DIR, PASSAGES_DIR
+
+
+@dataclass
+class AppServices:
+    """Services partagés par l'interface et les commandes (une instance par processus)."""
+
+    storage: object
+    face_store: FaceStore
+    student_service: StudentService
+    lanes: List[Lane]
+    passage_log: Optional[PassageLog] = None  # abonné aux décisions des voies
+
+
+def build_services(settings: dict) -> AppServices:
+    """Construit stockage, encodeur, galerie et voies à partir de settings.json."""
+    telemetry.configure(settings["telemetry"], DATA_DIR)
+    storage = create_storage(settings)
+    # Enrôlement : détecteur le plus précis ; voies : le plus rapide (section "detection")
+    face_store = create_face_store(
+        IMAGES_DIR,
+        DetectionConfig(**settings["detection"]),
+        create_encoder(settings["encoder"], MODELS_DIR),
+        enrollment=True,
+    )
+    gallery = create_gallery_index(storage, face_store.encoder, settings)
+    repository = StudentRepository(storage)
+
+    @contextmanager
+    def local_write():
+        # Écriture de la file de débits : ni galerie ni dépôt ne rechargent pendant ce temps
+        with gallery.local_write(), repository.local_write():
+            yield
+
+    debit_queue = None
+    if settings["debits"]["write_behind"]:
+        debit_queue = DebitQueue(
+            storage,
+            DATA_DIR / settings["debits"]["journal"],
+            write_guard=local_write,
+            on_error=lambda exc: print(f"Erreur d'écriture des débits (réessai) : {exc}"),
+        )
+        # Débits journalisés avant un arrêt brutal : appliqués avant de charger la galerie
+        recovered = debit_queue.recover()
+        if recovered:
+            print(f"{recovered} débit(s) non écrit(s) rejoué(s) depuis le journal.")
+        debit_queue.start()
+    student_service = StudentService(
+        storage, face_store, gallery, debit_queue, CropArchive(CROPS_FILE), repository
+    )
+    lanes = create_lanes(settings, face_store.encoder)
+    passage_log = PassageLog(PASSAGES_DIR) if settings["passages"]["enabled"] else None
+    return AppServices(storage, face_store, student_service, lanes, passage_log)
+
+
+def warm_up(services: AppServices, open_cameras: bool = False) -> None:
+    """
+    Évite les démarrages à froid : charge les étudiants, la galerie (et l'index approché),
+    les cascades et, si demandé, ouvre les caméras des voies.
+    """
+    services.student_service.repository.refresh()
+    services.student_service.gallery.refresh()
+    services.face_store.warm_up()
+    for lane in services.lanes:
+        lane.face_store.warm_up()
+        if open_cameras:
+            try:
+                lane.camera_service.get_video_capture()
+            except RuntimeError:
+                pass  # signalé à l'ouverture de la vue de contrôle
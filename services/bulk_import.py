@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import csv
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.student import Student
+from services.crop_archive import CROP_SIZE, CropArchive
+from services.face_store import DetectionConfig, FaceStore, create_face_store
+from utils.paths import data_relative
+from utils.quantization import quantize
+
+# Les photos de téléphone (4000 px et plus) sont décodées à taille réduite :
+# un visage à bout de bras reste largement détectable sur 800 px.
+DECODE_MAX_SIDE = 800
+
+
+@dataclass
+class RosterEntry:
+    student_id: str
+    first_name: str
+    last_name: str
+    balance: float
+    photo: Path
+
+
+@dataclass
+class ImportReport:
+    imported: List[Student] = field(default_factory=list)
+    failures: List[Tuple[str, str]] = field(default_factory=list)  # (photo, erreur)
+    elapsed: float = 0.0
+
+    @property
+    def photos_per_second(self) -> float:
+        total = len(self.imported) + len(self.failures)
+        return total / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def read_roster(csv_file: Path, photos_dir: Path) -> List[RosterEntry]:
+    """
+    Lit le CSV (student_id, first_name, last_name, balance, photo), séparateur
+    "," ou ";" ; les chemins de photo relatifs le sont au dossier photos_dir.
+    """
+    text = csv_file.read_text(encoding="utf-8-sig")
+    dialect = csv.Sniffer().sniff(text.splitlines()[0] if text else ",", delimiters=",;")
+    entries = []
+    lines: Dict[str, int] = {}
+    for line, row in enumerate(csv.DictReader(text.splitlines(), dialect=dialect), start=2):
+        try:
+            photo = Path(row["photo"].strip())
+            entries.append(
+                RosterEntry(
+                    student_id=row["student_id"].strip(),
+                    first_name=row["first_name"].strip(),
+                    last_name=row["last_name"].strip(),
+                    balance=float(str(row.get("balance") or 0).replace(",", ".")),
+                    photo=photo if photo.is_absolute() else photos_dir / photo,
+                )
+            )
+        except (KeyError, ValueError, AttributeError) as exc:
+            raise RuntimeError(f"{csv_file.name}, ligne {line} invalide : {exc}") from exc
+        student_id = entries[-1].student_id
+        if student_id in lines:
+            raise RuntimeError(
+                f"{csv_file.name}, ligne {line} : étudiant {student_id} déjà présent "
+                f"ligne {lines[student_id]}."
+            )
+        lines[student_id] = line
+    return entries
+
+
+# Un FaceStore par processus du pool (le détecteur n'est pas sérialisable)
+_worker_store: Optional[FaceStore] = None
+
+
+_worker_max_side = DECODE_MAX_SIDE
+
+
+def _init_worker(images_dir: str, detection: dict, max_side: int) -> None:
+    global _worker_store, _worker_max_side
+    _worker_store = create_face_store(
+        Path(images_dir), DetectionConfig(**detection), enrollment=True
+    )
+    _worker_max_side = max_side
+
+
+def _encode_photo(photo: str) -> Tuple[str, Optional[bytes], Optional[bytes], Optional[str]]:
+    """
+    Décode + détecte + encode une photo ; encodage et visage recadré renvoyés
+    en uint8 (compact).
+    """
+    try:
+        encoding, crop = _worker_store.extract_face(Path(photo), max_side=_worker_max_side)
+    except Exception as exc:  # échec par fichier, remonté dans le rapport
+        return photo, None, None, str(exc)
+    return photo, quantize(encoding).tobytes(), crop.tobytes(), None
+
+
+def import_roster(
+    entries: List[RosterEntry],
+    storage,
+    face_store: FaceStore,
+    images_dir: Path,
+    workers: int = 0,
+    max_side: int = DECODE_MAX_SIDE,
+    on_progress: Optional[Callable[[int, int, float], None]] = None,
+    crop_archive: Optional[CropArchive] = None,
+) -> ImportReport:
+    """
+    Encode toutes les photos dans un pool de processus puis enregistre tous les
+    étudiants en une seule écriture du stockage (et les visages recadrés en un
+    seul ajout à l'archive). on_progress(fait, total, photos/s).
+    """
+    report = ImportReport()
+    start = time.perf_counter()
+    # Une photo partagée par plusieurs lignes n'est encodée qu'une fois
+    by_photo: Dict[str, List[RosterEntry]] = {}
+    for entry in entries:
+        by_photo.setdefault(str(entry.photo), []).append(entry)
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(by_photo) // (workers * 8))
+
+    crops = {}
+    images_dir.mkdir(parents=True, exist_ok=True)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(str(images_dir), asdict(face_store.detection), max_side),
+    ) as pool:
+        results = pool.map(_encode_photo, list(by_photo), chunksize=chunksize)
+        done = 0
+        for photo, blob, crop, error in results:
+            for entry in by_photo[photo]:
+                if error is not None:
+                    report.failures.append((photo, error))
+                    continue
+                destination = images_dir / f"{entry.student_id}{entry.photo.suffix.lower()}"
+                if entry.photo.resolve() != destination.resolve():
+                    shutil.copy(entry.photo, destination)
+                report.imported.append(
+                    Student(
+                        student_id=entry.student_id,
+                        first_name=entry.first_name,
+                        last_name=entry.last_name,
+                        balance=entry.balance,
+                        image_path=data_relative(destination),
+                        face_encoding=np.frombuffer(blob, dtype=np.uint8),
+                    )
+                )
+                crops[entry.student_id] = (
+                    np.frombuffer(crop, dtype=np.uint8).reshape(CROP_SIZE),
+                    data_relative(destination),
+                )
+            done += len(by_photo[photo])
+            if on_progress is not None:
+                elapsed = time.perf_counter() - start
+                on_progress(done, len(entries), done / elapsed if elapsed > 0 else 0.0)
+
+    if report.imported:
+        storage.upsert_students(report.imported)
+    if crop_archive is not None:
+        crop_archive.add_many(crops)
+    report.elapsed = time.perf_counter() - start
+    return report
@@ -11,26 +11,54 @@ except ImportError:  # pragma: no cover
 
 
 class CameraService:
-    def __init__(self, fallback_image: Optional[Path] = None, camera_index: int = 0):
+    """
+    Caméra d'une voie : périphérique cv2.VideoCapture, ou session enregistrée
+    rejouée (replay, voir services/camera_recording.py) ; record_to enregistre
+    les frames lues en flux continu.
+    """
+
+    def __init__(
+        self,
+        fallback_image: Optional[Path] = None,
+        camera_index: int = 0,
+        replay: Optional[Path] = None,
+        realtime: bool = True,
+        record_to: Optional[Path] = None,
+    ):
         self.fallback_image = fallback_image
         self.camera_index = camera_index
+        self.replay = replay
+        self.realtime = realtime
+        self.record_to = record_to
+        self._recorder = None
         self._cap: Optional[cv2.VideoCapture] = None
         self._is_opened = False
 
-    def _ensure_camera_opened(self):
-        """Ouvre la caméra si elle n'est pas déjà ouverte (optimisation performance)"""
+    @property
+    def finished(self) -> bool:
+        """Fin de la session rejouée (toujours False pour une vraie caméra)."""
+        return bool(getattr(self._cap, "finished", False))
+
+    def _ensure_camera_opened(self, discard_frames: int = 5):
+        """
+        Ouvre la caméra si elle n'est pas déjà ouverte (optimisation performance).
+        discard_frames : frames lues pour laisser l'exposition se stabiliser
+        (inutile en flux continu, le thread de capture ne garde que la dernière).
+        """
         if cv2 is None:
             raise RuntimeError("OpenCV n'est pas disponible sur cette machine.")
         
         if self._cap is None or not self._cap.isOpened():
-            self._cap = cv2.VideoCapture(self.camera_index)
+            self._cap = self._open_capture()
             if not self._cap.isOpened():
                 self._cap = None
                 self._is_opened = False
                 return False
             self._is_opened = True
+            if self.replay is not None:
+                return True  # frames enregistrées : rien à stabiliser
             # Laisser la caméra se stabiliser (lire quelques frames)
-            for _ in range(5):
+            for _ in range(discard_frames):
                 self._cap.read()
         return True
 
@@ -66,12 +94,41 @@ class CameraService:
         Retourne l'objet VideoCapture pour un accès direct (flux continu)
         Utile pour les vues qui veulent gérer le flux elles-mêmes
         """
-        if not self._ensure_camera_opened():
+        if not self._ensure_camera_opened(discard_frames=0):
             raise RuntimeError("Impossible d'ouvrir la caméra")
         return self._cap
 
+    def _open_capture(self):
+        if self.replay is not None:
+            from services.camera_recording import ReplayCamera
+
+            return ReplayCamera(self.replay, realtime=self.realtime)
+        return cv2.VideoCapture(self.camera_index)
+
+    def read(self):
+        """Lit la frame suivante du flux continu : retourne (succès, frame)."""
+        if self._cap is None:
+            return False, None
+        ok, frame = self._cap.read()
+        if ok and self.record_to is not None:
+            if self._recorder is None:
+                from services.camera_recording import SessionRecorder
+
+                self._recorder = SessionRecorder(self.record_to)
+            self._recorder.write(frame)
+        return ok, frame
+
+    def stop_recording(self) -> int:
+        """Termine l'enregistrement en cours ; retourne le nombre de frames écrites."""
+        if self._recorder is None:
+            return 0
+        recorder, self._recorder = self._recorder, None
+        recorder.close()
+        return recorder.frames
+
     def release(self):
         """Ferme explicitement la caméra"""
+        self.stop_recording()
         if self._cap is not None:
             self._cap.release()
             self._cap = None
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import queue
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Session caméra : en-tête (magic + heure de début), puis pour chaque frame sa
+# position (s depuis la première frame), la taille et les octets JPEG.
+RECORDING_MAGIC = b"CAMREC01"
+RECORDING_SUFFIX = ".camrec"
+_HEADER = struct.Struct("<8sd")
+_FRAME = struct.Struct("<dI")
+
+
+class SessionRecorder:
+    """
+    Enregistre une session caméra dans un fichier .camrec : les frames sont
+    compressées en JPEG et écrites par un thread, la capture n'attend que si
+    l'écriture a plus de max_pending frames de retard.
+    """
+
+    def __init__(self, path: Path, quality: int = 90, max_pending: int = 64):
+        self.path = path
+        self.quality = quality
+        self.frames = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._start: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self, frame: np.ndarray, timestamp: Optional[float] = None) -> None:
+        """Ajoute une frame ; timestamp : horloge perf_counter de la capture."""
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        if self._thread is None:
+            self._start = timestamp
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            handle = self.path.open("wb")
+            handle.write(_HEADER.pack(RECORDING_MAGIC, time.time()))
+            self._thread = threading.Thread(
+                target=self._run, args=(handle,), name="camera-recorder", daemon=True
+            )
+            self._thread.start()
+        self._queue.put((timestamp - self._start, frame))
+        self.frames += 1
+
+    def _run(self, handle) -> None:
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        with handle:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                position, frame = item
+                ok, data = cv2.imencode(".jpg", frame, params)
+                if ok:
+                    handle.write(_FRAME.pack(position, len(data)))
+                    handle.write(data.tobytes())
+
+    def close(self) -> None:
+        """Écrit les frames en attente et ferme le fichier."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+def read_recording(path: Path) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Frames d'une session (position en s, image BGR), lues au fur et à mesure ;
+    une frame incomplète en fin de fichier (enregistrement interrompu) est ignorée.
+    """
+    return _read_frames(_open_recording(path))
+
+
+def _open_recording(path: Path):
+    """Ouvre une session et vérifie son en-tête (fichier positionné sur la 1re frame)."""
+    handle = path.open("rb")
+    header = handle.read(_HEADER.size)
+    if len(header) < _HEADER.size or _HEADER.unpack(header)[0] != RECORDING_MAGIC:
+        handle.close()
+        raise RuntimeError(f"Enregistrement caméra incompatible : {path.name}.")
+    return handle
+
+
+def _read_frames(handle) -> Iterator[Tuple[float, np.ndarray]]:
+    with handle:
+        while True:
+            meta = handle.read(_FRAME.size)
+            if len(meta) < _FRAME.size:
+                return
+            position, size = _FRAME.unpack(meta)
+            data = handle.read(size)
+            if len(data) < size:
+                return
+            frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None:
+                yield position, frame
+
+
+class ReplayCamera:
+    """
+    Caméra virtuelle rejouant une session enregistrée, avec l'interface de
+    cv2.VideoCapture utilisée par CameraService (isOpened, read, get, release) :
+    - realtime : frames rendues au rythme de l'enregistrement, sinon au plus vite ;
+    - loop : recommence au début, sinon read() échoue à la fin (finished).
+    """
+
+    def __init__(self, path: Path, realtime: bool = True, loop: bool = False):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.finished = False
+        self._position = 0.0
+        self._clock: Optional[float] = None
+        # Le fichier est gardé à part : fermer un générateur jamais démarré ne
+        # ferme pas le fichier qu'il a reçu
+        self._handle = None
+        self._frames: Optional[Iterator[Tuple[float, np.ndarray]]] = None
+        if path.exists():
+            self._open()
+
+    def _open(self) -> None:
+        self._handle = _open_recording(self.path)
+        self._frames = _read_frames(self._handle)
+
+    def isOpened(self) -> bool:
+        return self._frames is not None
+
+    def read(self):
+        if self._frames is None or self.finished:
+            return False, None
+        item = next(self._frames, None)
+        if item is None and self.loop:
+            self.release()
+            self._open()
+            self._clock = None
+            item = next(self._frames, None)
+        if item is None:
+            self.finished = True
+            return False, None
+        self._position, frame = item
+        if self.realtime:
+            now = time.perf_counter()
+            if self._clock is None:
+                self._clock = now - self._position
+            delay = self._clock + self._position - now
+            if delay > 0:
+                time.sleep(delay)
+        return True, frame
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return self._position * 1000.0
+        return 0.0
+
+    def release(self) -> None:
+        if self._frames is not None:
+            self._frames.close()
+            self._handle.close()
+            self._frames = self._handle = None
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from services.encoding_store import TEMPLATE_ENCODER
+from services.face_encoders import FACE_SHAPE
+from utils.quantization import PIXEL_SCALE
+
+# Visage recadré avec une marge autour du rectangle détecté : le rectangle occupe
+# exactement FACE_SHAPE pixels au centre, la marge permet de recadrer autrement.
+CROP_MARGIN = 0.3
+CROP_SIZE = (
+    round(FACE_SHAPE[0] * (1 + 2 * CROP_MARGIN)),
+    round(FACE_SHAPE[1] * (1 + 2 * CROP_MARGIN)),
+)
+CROP_FORMAT = "crop/1"
+
+
+def crop_face(image_gray: np.ndarray, box) -> np.ndarray:
+    """Recadre un visage (rectangle + marge) en CROP_SIZE ; bords répliqués si besoin."""
+    x, y, w, h = box
+    mx, my = int(round(w * CROP_MARGIN)), int(round(h * CROP_MARGIN))
+    height, width = image_gray.shape[:2]
+    x0, y0, x1, y1 = x - mx, y - my, x + w + mx, y + h + my
+    region = image_gray[max(0, y0) : min(height, y1), max(0, x0) : min(width, x1)]
+    if (x0, y0, x1, y1) != (max(0, x0), max(0, y0), min(width, x1), min(height, y1)):
+        region = cv2.copyMakeBorder(
+            region,
+            max(0, -y0),
+            max(0, y1 - height),
+            max(0, -x0),
+            max(0, x1 - width),
+            cv2.BORDER_REPLICATE,
+        )
+    return cv2.resize(region, (CROP_SIZE[1], CROP_SIZE[0]))
+
+
+def crop_center(crop: np.ndarray) -> np.ndarray:
+    """Pixels uint8 du rectangle détecté (FACE_SHAPE, au centre du visage recadré)."""
+    top = (crop.shape[0] - FACE_SHAPE[0]) // 2
+    left = (crop.shape[1] - FACE_SHAPE[1]) // 2
+    return crop[top : top + FACE_SHAPE[0], left : left + FACE_SHAPE[1]]
+
+
+def template_from_crop(crop: np.ndarray) -> np.ndarray:
+    """Modèle stocké (raw/1, float32 aplati) calculé à partir d'un visage archivé."""
+    return crop_center(crop).astype(np.float32).ravel() / PIXEL_SCALE
+
+
+def templates_from_crops(crops: np.ndarray) -> np.ndarray:
+    """Modèles (K, D) des K visages archivés d'un étudiant."""
+    return np.stack([template_from_crop(crop) for crop in crops.reshape(-1, *CROP_SIZE)])
+
+
+def crop_hash(crop: np.ndarray) -> str:
+    return hashlib.sha1(np.ascontiguousarray(crop).tobytes()).hexdigest()
+
+
+def template_key(content_hash: str) -> str:
+    """Ce dont dépend un modèle : contenu du visage archivé et format du modèle."""
+    return f"{content_hash}:{TEMPLATE_ENCODER}:{FACE_SHAPE[0]}x{FACE_SHAPE[1]}"
+
+
+@dataclass
+class CropEntry:
+    slot: int
+    hash: str
+    image: str  # photo d'origine, relative à data/
+    template: str = ""  # template_key() du modèle stocké, "" si à recalculer
+    count: int = 1  # visages consécutifs à partir de slot (un par modèle)
+
+
+class CropArchive:
+    """
+    Archive des visages d'enrôlement normalisés :
+    - <nom>.bin : visages uint8 CROP_SIZE concaténés, lus en memory-map ;
+    - <nom>.json : index (emplacement, hash du contenu, photo, modèle calculé).
+    Un ajout est écrit en fin de fichier ; un visage remplacé laisse un
+    emplacement inutilisé, récupéré par compact().
+    """
+
+    def __init__(self, archive_file: Path):
+        self.archive_file = archive_file
+        self.index_file = archive_file.with_suffix(".json")
+        self._entries: Optional[Dict[str, CropEntry]] = None
+        self._slots = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def entries(self) -> Dict[str, CropEntry]:
+        if self._entries is None:
+            self._load_index()
+        return self._entries
+
+    @property
+    def slots(self) -> int:
+        self.entries
+        return self._slots
+
+    def _load_index(self) -> None:
+        self._entries, self._slots = {}, 0
+        if not self.index_file.exists():
+            return
+        meta = json.loads(self.index_file.read_text(encoding="utf-8"))
+        if meta.get("format") != CROP_FORMAT or tuple(meta.get("size", ())) != CROP_SIZE:
+            raise RuntimeError(
+                f"Archive de visages incompatible : {self.index_file.name} "
+                f"({meta.get('format')}, {meta.get('size')})."
+            )
+        self._slots = int(meta["slots"])
+        self._entries = {
+            student_id: CropEntry(**entry) for student_id, entry in meta["entries"].items()
+        }
+
+    def _write_index(self) -> None:
+        tmp = self.index_file.with_name(self.index_file.name + ".tmp")
+        tmp.write_text(
+            json.dumps(
+                {
+                    "format": CROP_FORMAT,
+                    "size": list(CROP_SIZE),
+                    "margin": CROP_MARGIN,
+                    "slots": self._slots,
+                    "entries": {sid: entry.__dict__ for sid, entry in self.entries.items()},
+                }
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.index_file)
+
+    def open_crops(self) -> np.ndarray:
+        """Tous les emplacements (slots, H, W), memory-mappés (pas de copie)."""
+        if not self.slots:
+            return np.empty((0, *CROP_SIZE), dtype=np.uint8)
+        return np.memmap(
+            self.archive_file, dtype=np.uint8, mode="r", shape=(self.slots, *CROP_SIZE)
+        )
+
+    def get(self, student_id: str) -> Optional[np.ndarray]:
+        """Visages (K, H, W) d'un étudiant, None s'il n'est pas archivé."""
+        entry = self.entries.get(student_id)
+        if entry is None:
+            return None
+        return np.array(self.open_crops()[entry.slot : entry.slot + entry.count])
+
+    def add_many(
+        self, crops: Dict[str, Tuple[np.ndarray, str]], template_built: bool = True
+    ) -> None:
+        """
+        Ajoute/remplace des visages {student_id: (visage(s), photo relative)} :
+        une écriture en fin d'archive et une réécriture de l'index. Un étudiant
+        multi-modèles a K visages (K, H, W). template_built : les modèles stockés
+        ont été calculés à partir de ces visages (enrôlement).
+        """
+        if not crops:
+            return
+        entries = self.entries
+        self.archive_file.parent.mkdir(parents=True, exist_ok=True)
+        with self.archive_file.open("ab") as handle:
+            for student_id, (crop, image) in crops.items():
+                if crop.shape[-2:] != CROP_SIZE or crop.dtype != np.uint8:
+                    raise RuntimeError(f"Visage archivé invalide pour {student_id} : {crop.shape}.")
+                stack = np.ascontiguousarray(crop.reshape(-1, *CROP_SIZE))
+                content = crop_hash(stack)
+                handle.write(stack.tobytes())
+                key = template_key(content) if template_built else ""
+                entries[student_id] = CropEntry(self._slots, content, image, key, len(stack))
+                self._slots += len(stack)
+        self._write_index()
+
+    def add(self, student_id: str, crop: np.ndarray, image: str) -> None:
+        """Un étudiant : un visage (H, W) ou K visages (K, H, W)."""
+        self.add_many({student_id: (crop, image)})
+
+    def mark_templates(self, keys: Dict[str, str]) -> None:
+        """Enregistre la clé des modèles recalculés (re-encode)."""
+        for student_id, key in keys.items():
+            self.entries[student_id].template = key
+        self._write_index()
+
+    def remove_missing(self, keep_ids) -> int:
+        """Oublie les visages d'étudiants supprimés (l'emplacement est récupéré par compact)."""
+        keep = set(keep_ids)
+        removed = [sid for sid in self.entries if sid not in keep]
+        for student_id in removed:
+            del self.entries[student_id]
+        if removed:
+            self._write_index()
+        return len(removed)
+
+    @property
+    def unused_slots(self) -> int:
+        return self.slots - sum(entry.count for entry in self.entries.values())
+
+    def compact(self) -> None:
+        """Réécrit l'archive sans les emplacements inutilisés (temporaire puis remplacement)."""
+        if not self.unused_slots:
+            return
+        crops = self.open_crops()
+        tmp = self.archive_file.with_name(self.archive_file.name + ".tmp")
+        with tmp.open("wb") as handle:
+            slot = 0
+            for entry in sorted(self.entries.values(), key=lambda e: e.slot):
+                stack = crops[entry.slot : entry.slot + entry.count]
+                handle.write(np.ascontiguousarray(stack).tobytes())
+                entry.slot = slot
+                slot += entry.count
+        del crops
+        os.replace(tmp, self.archive_file)
+        self._slots = slot
+        self._write_index()
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, List, Optional
+
+from services.telemetry import TELEMETRY
+
+
+@dataclass(frozen=True)
+class PendingDebit:
+    seq: int
+    student_id: str
+    amount: float
+    timestamp: float
+
+
+class DebitQueue:
+    """
+    Écriture différée des débits (write-behind) :
+    - submit() ajoute le débit au journal (une ligne + fsync) avant de rendre
+      la main : un débit soumis survit à un arrêt brutal ;
+    - le thread d'écriture applique les débits au stockage par lots (une
+      réécriture / transaction par lot, avec le numéro du dernier débit
+      appliqué), puis marque le lot comme validé au journal ;
+    - au démarrage, recover() rejoue les débits journalisés dont le numéro
+      dépasse celui retenu par le stockage : un lot appliqué mais pas encore
+      validé au journal n'est pas débité deux fois ;
+    - flush() attend que tout soit écrit (fermeture de vue, sortie) ;
+    - on_error(exc) est appelé à la première erreur d'écriture (le lot est
+      réessayé, last_error reste renseigné jusqu'au succès) ; un débit que le
+      journal refuse reste en file, il ne sera durable qu'une fois appliqué.
+    """
+
+    def __init__(
+        self,
+        storage,
+        journal_file: Path,
+        batch_max: int = 256,
+        write_guard: Callable[[], ContextManager] = contextlib.nullcontext,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ):
+        self.storage = storage
+        self.journal_file = journal_file
+        self.batch_max = batch_max
+        self._write_guard = write_guard
+        self._on_error = on_error
+        self._cond = threading.Condition()
+        # Journal : numéro attribué, ligne écrite et mise en file sous le même
+        # verrou, la file reste donc dans l'ordre du journal
+        self._journal_lock = threading.Lock()
+        self._queue: List[PendingDebit] = []  # journalisés, pas encore pris par le thread
+        self._in_flight = 0  # pris par le thread, pas encore appliqués
+        # Numéros croissants d'une exécution à l'autre (comparés à celui du stockage)
+        self._next_seq = storage.applied_debit_seq() + 1
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._queue) + self._in_flight
+
+    def recover(self) -> int:
+        """
+        Applique les débits journalisés mais pas encore appliqués au stockage
+        (arrêt brutal). Synchrone, à appeler avant start().
+        """
+        applied = self.storage.applied_debit_seq()
+        entries = self._read_journal()
+        last = max([applied] + [e.seq for e in entries])
+        entries = [e for e in entries if e.seq > applied]
+        if entries:
+            self.storage.decrement_balances(
+                [(e.student_id, e.amount) for e in entries], debit_seq=entries[-1].seq
+            )
+        self._truncate_journal()
+        with self._cond:
+            self._next_seq = max(self._next_seq, last + 1)
+        return len(entries)
+
+    def start(self) -> None:
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="debit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, student_id: str, amount: float) -> None:
+        """Journalise le débit (fsync) puis le met en file ; l'écriture des soldes est différée."""
+        with self._journal_lock:
+            with self._cond:
+                debit = PendingDebit(self._next_seq, student_id, amount, time.time())
+                self._next_seq += 1
+            try:
+                with TELEMETRY.span("journal"):
+                    self._append_journal([debit])
+            except OSError as exc:
+                self._report(exc)
+            with self._cond:
+                self._queue.append(debit)
+                self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """Attend que tous les débits soumis soient écrits ; False si délai dépassé."""
+        with self._cond:
+            if self._thread is None:
+                return not self._queue
+            return self._cond.wait_for(lambda: not self._queue and not self._in_flight, timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Écrit ce qui reste puis arrête le thread d'écriture."""
+        self.flush(timeout)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or not self._running)
+                if not self._queue:
+                    return
+                # Tout ce qui s'est accumulé pendant l'écriture précédente forme un lot
+                batch = self._queue[: self.batch_max]
+                del self._queue[: len(batch)]
+                self._in_flight = len(batch)
+            try:
+                self._commit(batch)
+            except Exception as exc:  # stockage indisponible : on réessaie
+                self._report(exc)
+                with self._cond:
+                    self._queue[:0] = batch
+                    self._in_flight = 0
+                time.sleep(1.0)
+                continue
+            self.last_error = None
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def _report(self, exc: Exception) -> None:
+        if self.last_error is None and self._on_error is not None:
+            self._on_error(exc)
+        self.last_error = str(exc)
+
+    def _commit(self, batch: List[PendingDebit]) -> None:
+        with TELEMETRY.span("commit"):
+            with self._write_guard():
+                self.storage.decrement_balances(
+                    [(d.student_id, d.amount) for d in batch], debit_seq=batch[-1].seq
+                )
+            # Sous le verrou du journal : aucun débit journalisé entre le test et la troncature
+            with self._journal_lock:
+                with self._cond:
+                    drained = not self._queue
+                if drained:
+                    self._truncate_journal()
+                else:
+                    self._append_journal_commit(batch[-1].seq)
+
+    def _append_journal(self, batch: List[PendingDebit]) -> None:
+        self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+        with self.journal_file.open("a", encoding="utf-8") as handle:
+            for debit in batch:
+                handle.write(
+                    json.dumps(
+                        {
+                            "seq": debit.seq,
+                            "student_id": debit.student_id,
+                            "amount": debit.amount,
+                            "time": debit.timestamp,
+                        }
+                    )
+                    + "\n"
+                )
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def _append_journal_commit(self, seq: int) -> None:
+        with self.journal_file.open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps({"committed": seq}) + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def _truncate_journal(self) -> None:
+        if self.journal_file.exists() and self.journal_file.stat().st_size:
+            with self.journal_file.open("r+", encoding="utf-8") as handle:
+                handle.truncate(0)
+                handle.flush()
+                os.fsync(handle.fileno())
+
+    def _read_journal(self) -> List[PendingDebit]:
+        if not self.journal_file.exists():
+            return []
+        entries: Dict[int, PendingDebit] = {}
+        committed = 0
+        for line in self.journal_file.read_text(encoding="utf-8").splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # dernière ligne incomplète (arrêt pendant l'écriture)
+            if "committed" in record:
+                committed = max(committed, int(record["committed"]))
+            else:
+                seq = int(record["seq"])
+                entries[seq] = PendingDebit(
+                    seq,
+                    str(record["student_id"]),
+                    float(record["amount"]),
+                    float(record.get("time", 0.0)),
+                )
+        return [entries[seq] for seq in sorted(entries) if seq > committed]
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.face_encoders import FACE_SHAPE
+from utils.quantization import PIXEL_SCALE, quantize
+
+# Format des modèles stockés (encodeur "raw", version 1) : tout autre encodeur
+# (LBP, PCA) est calculé à partir d'eux au chargement de la galerie.
+TEMPLATE_ENCODER = "raw/1"
+# Un étudiant peut avoir plusieurs modèles (enrôlement en rafale) : face_encoding
+# est alors la concaténation de K modèles de TEMPLATE_SIZE valeurs.
+TEMPLATE_SIZE = FACE_SHAPE[0] * FACE_SHAPE[1]
+
+
+def split_templates(encoding: Sequence[float]) -> np.ndarray:
+    """
+    Modèles (K, TEMPLATE_SIZE) d'un face_encoding (un ou plusieurs modèles
+    concaténés) ; un encodage uint8 reste en uint8, sinon float32.
+    """
+    values = np.asarray(encoding)
+    if values.dtype != np.uint8:
+        values = values.astype(np.float32, copy=False)
+    if values.size % TEMPLATE_SIZE:
+        return values.reshape(1, -1)  # ancien format de taille différente : un seul modèle
+    return values.reshape(-1, TEMPLATE_SIZE)
+
+
+class EncodingStore:
+    """
+    Fichier binaire annexe des encodages faciaux :
+    - <nom>.npy : matrice uint8 (N, D), lue en memory-map ;
+    - <nom>.json : identifiants étudiants, un par ligne de la matrice (un même
+      identifiant sur plusieurs lignes consécutives pour un étudiant multi-modèles).
+    """
+
+    def __init__(self, matrix_file: Path):
+        self.matrix_file = matrix_file
+        self.ids_file = matrix_file.with_suffix(".json")
+
+    def exists(self) -> bool:
+        return self.matrix_file.exists() and self.ids_file.exists()
+
+    def version(self) -> Tuple[int, int]:
+        if not self.exists():
+            return 0, 0
+        return self.matrix_file.stat().st_mtime_ns, self.ids_file.stat().st_mtime_ns
+
+    def load_ids(self) -> List[str]:
+        """Identifiants des lignes, lus dans le .json seul (sans ouvrir la matrice)."""
+        if not self.exists():
+            return []
+        meta = json.loads(self.ids_file.read_text(encoding="utf-8"))
+        encoder = meta.get("encoder", TEMPLATE_ENCODER)
+        if encoder != TEMPLATE_ENCODER:
+            raise RuntimeError(f"Format d'encodage non pris en charge : {encoder}.")
+        return [str(i) for i in meta.get("ids", [])]
+
+    def load(self, mmap: bool = True) -> Tuple[List[str], np.ndarray]:
+        """Retourne (ids, matrice uint8). La matrice est memory-mappée par défaut."""
+        if not self.exists():
+            return [], np.empty((0, 0), dtype=np.uint8)
+        ids = self.load_ids()
+        matrix = np.load(self.matrix_file, mmap_mode="r" if mmap else None)
+        if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+            raise RuntimeError(
+                f"Fichier d'encodages incohérent : {self.matrix_file.name} "
+                f"({matrix.shape[0]} lignes pour {len(ids)} identifiants)."
+            )
+        return ids, matrix
+
+    def write(self, ids: Sequence[str], matrix: np.ndarray) -> None:
+        """Réécrit entièrement le fichier (écriture dans un temporaire puis remplacement)."""
+        matrix = np.ascontiguousarray(matrix, dtype=np.uint8)
+        self.matrix_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_matrix = self.matrix_file.with_name(self.matrix_file.name + ".tmp")
+        tmp_ids = self.ids_file.with_name(self.ids_file.name + ".tmp")
+        with tmp_matrix.open("wb") as handle:
+            np.save(handle, matrix)
+        tmp_ids.write_text(
+            json.dumps(
+                {
+                    "encoder": TEMPLATE_ENCODER,
+                    "dtype": "uint8",
+                    "scale": PIXEL_SCALE,
+                    "ids": list(ids),
+                }
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp_matrix, self.matrix_file)
+        os.replace(tmp_ids, self.ids_file)
+
+    def replace_rows(self, ids: Sequence[str], matrix: np.ndarray) -> None:
+        """
+        Remplace toutes les lignes (uint8) des étudiants présents dans ids par
+        les lignes données (plusieurs par étudiant possibles) ; une écriture.
+        """
+        current_ids, current = self.load()
+        if len(current_ids) and current.shape[1] != matrix.shape[1]:
+            raise RuntimeError("Dimension des encodages différente de celle du fichier.")
+        replaced = set(ids)
+        keep = [i for i, student_id in enumerate(current_ids) if student_id not in replaced]
+        kept_ids = [current_ids[i] for i in keep]
+        # Seules les lignes gardées sont copiées depuis le memory-map, fermé avant
+        # le remplacement du fichier (impossible sous Windows tant qu'il est ouvert)
+        rows = matrix if not keep else np.concatenate((current[keep], matrix))
+        del current
+        self.write(kept_ids + list(ids), rows)
+
+    def update(
+        self,
+        encodings: Dict[str, Sequence[float]],
+        keep_ids: Optional[Iterable[str]] = None,
+    ) -> None:
+        """
+        Remplace/ajoute les encodages donnés et, si keep_ids est fourni,
+        supprime les lignes des étudiants qui n'en font plus partie.
+        """
+        keep = set(keep_ids) if keep_ids is not None else None
+        if not encodings and (keep is None or keep.issuperset(self.load_ids())):
+            return  # cas courant (débit, solde) : ni modèle modifié ni étudiant supprimé
+        ids, matrix = self.load()
+        kept = [
+            i
+            for i, student_id in enumerate(ids)
+            if student_id not in encodings and (keep is None or student_id in keep)
+        ]
+        parts = [matrix[kept]] if kept else []  # copie, memory-map fermé avant l'écriture
+        del matrix
+        new_ids = [ids[i] for i in kept]
+        for student_id, enc in encodings.items():
+            templates = quantize(split_templates(enc))
+            new_ids.extend([student_id] * len(templates))
+            parts.append(templates)
+        if not parts:
+            self.write([], np.empty((0, 0), dtype=np.uint8))
+            return
+        self.write(new_ids, np.concatenate(parts))
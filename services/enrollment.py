@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+import cv2
+import numpy as np
+
+from services.crop_archive import crop_face, template_from_crop
+from services.face_encoders import FACE_SHAPE
+from services.face_store import Box, FaceStore
+
+
+@dataclass
+class BurstConfig:
+    """Enrôlement en rafale (section "enrollment" de settings.json)."""
+
+    frames: int = 15  # images capturées par rafale
+    interval_ms: int = 80  # pause entre deux images (variations de pose)
+    templates: int = 3  # modèles conservés par étudiant (K)
+    min_face_ratio: float = 0.2  # largeur du visage / petit côté de l'image
+    min_sharpness: float = 50.0  # variance du laplacien sur le visage 100x100
+    min_brightness: float = 50.0
+    max_brightness: float = 205.0
+    max_clipped: float = 0.1  # part de pixels saturés (noirs ou blancs)
+    min_spread: float = 2.0  # distance brute minimale entre deux modèles retenus
+
+
+@dataclass(frozen=True)
+class FaceQuality:
+    face_ratio: float
+    sharpness: float
+    brightness: float
+    clipped: float
+    score: float  # 0..1, taille + netteté + exposition
+    rejection: str = ""  # raison du refus, vide si l'image est acceptée
+
+    @property
+    def accepted(self) -> bool:
+        return not self.rejection
+
+
+def assess_face(image_gray: np.ndarray, box: Box, config: BurstConfig) -> FaceQuality:
+    """Note un visage détecté : taille, netteté (variance du laplacien), exposition."""
+    x, y, w, h = box
+    face = cv2.resize(image_gray[y : y + h, x : x + w], (FACE_SHAPE[1], FACE_SHAPE[0]))
+    face_ratio = w / min(image_gray.shape[:2])
+    sharpness = float(cv2.Laplacian(face, cv2.CV_64F).var())
+    brightness = float(face.mean())
+    clipped = float(np.count_nonzero((face <= 5) | (face >= 250)) / face.size)
+
+    rejection = ""
+    if face_ratio < config.min_face_ratio:
+        rejection = "visage trop petit"
+    elif sharpness < config.min_sharpness:
+        rejection = "image floue"
+    elif brightness < config.min_brightness:
+        rejection = "visage trop sombre"
+    elif brightness > config.max_brightness:
+        rejection = "visage trop clair"
+    elif clipped > config.max_clipped:
+        rejection = "visage surexposé ou sous-exposé"
+    size_score = min(1.0, face_ratio / (2 * config.min_face_ratio))
+    sharp_score = min(1.0, sharpness / (4 * config.min_sharpness))
+    exposure_score = max(0.0, 1.0 - abs(brightness - 128.0) / 128.0) * (1.0 - clipped)
+    score = (size_score + sharp_score + exposure_score) / 3.0
+    return FaceQuality(face_ratio, sharpness, brightness, clipped, score, rejection)
+
+
+@dataclass
+class BurstFrame:
+    frame: np.ndarray  # image BGR d'origine
+    crop: np.ndarray  # visage recadré pour l'archive (CROP_SIZE)
+    template: np.ndarray  # modèle brut float32 calculé depuis crop
+    quality: FaceQuality
+
+
+@dataclass
+class BurstResult:
+    kept: List[BurstFrame]  # meilleure image en premier
+    seen: int = 0
+    rejections: Counter = field(default_factory=Counter)
+
+    @property
+    def template(self) -> np.ndarray:
+        """face_encoding de l'étudiant : les K modèles concaténés."""
+        return np.concatenate([item.template for item in self.kept])
+
+    @property
+    def crops(self) -> np.ndarray:
+        return np.stack([item.crop for item in self.kept])
+
+    @property
+    def best_frame(self) -> np.ndarray:
+        return self.kept[0].frame
+
+    def describe(self) -> str:
+        best = self.kept[0].quality
+        return (
+            f"{len(self.kept)} image(s) retenue(s) sur {self.seen} "
+            f"(netteté {best.sharpness:.0f}, visage {best.face_ratio:.0%})"
+        )
+
+
+class BurstEnrollment:
+    """
+    Rafale d'enrôlement : chaque image est notée (un seul visage, taille,
+    netteté, exposition), les K meilleures images acceptées et suffisamment
+    différentes entre elles deviennent les modèles de l'étudiant.
+    """
+
+    def __init__(self, face_store: FaceStore, config: Optional[BurstConfig] = None):
+        self.face_store = face_store
+        self.config = config or BurstConfig()
+        self._candidates: List[BurstFrame] = []
+        self._seen = 0
+        self._rejections: Counter = Counter()
+
+    def add_frame(self, frame_bgr: np.ndarray) -> Optional[FaceQuality]:
+        """Note une image ; None si aucun visage (ou plusieurs) n'y est trouvé."""
+        self._seen += 1
+        gray, faces = self.face_store.detect_faces_in_frame(frame_bgr)
+        if len(faces) != 1:
+            self._rejections["aucun visage" if not faces else "plusieurs visages"] += 1
+            return None
+        quality = assess_face(gray, faces[0], self.config)
+        if not quality.accepted:
+            self._rejections[quality.rejection] += 1
+            return quality
+        crop = crop_face(gray, faces[0])
+        self._candidates.append(BurstFrame(frame_bgr, crop, template_from_crop(crop), quality))
+        return quality
+
+    def result(self) -> BurstResult:
+        """Sélectionne les K meilleures images ; RuntimeError si aucune n'est utilisable."""
+        kept: List[BurstFrame] = []
+        for candidate in sorted(self._candidates, key=lambda c: c.quality.score, reverse=True):
+            # Images quasi identiques : un seul modèle suffit
+            if any(
+                np.linalg.norm(candidate.template - item.template) < self.config.min_spread
+                for item in kept
+            ):
+                continue
+            kept.append(candidate)
+            if len(kept) == self.config.templates:
+                break
+        if not kept:
+            reason = self._rejections.most_common(1)[0][0] if self._rejections else "aucune image"
+            raise RuntimeError(f"Aucune image exploitable dans la rafale ({reason}).")
+        return BurstResult(kept, self._seen, Counter(self._rejections))
+
+    def capture(
+        self,
+        read_frame: Callable[[], np.ndarray],
+        on_frame: Optional[Callable[[int, Optional[FaceQuality]], None]] = None,
+    ) -> BurstResult:
+        """Capture config.frames images (ex: CameraService.capture_frame) et sélectionne."""
+        for index in range(self.config.frames):
+            quality = self.add_frame(read_frame())
+            if on_frame is not None:
+                on_frame(index + 1, quality)
+            if index + 1 < self.config.frames:
+                time.sleep(self.config.interval_ms / 1000)
+        return self.result()
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+# Les modèles stockés restent des visages bruts 100x100 (voir EncodingStore) :
+# un encodeur ne fait que les projeter dans son propre espace, ce qui permet de
+# changer d'encodeur sans ré-enrôler les étudiants.
+FACE_SHAPE = (100, 100)
+
+
+class FaceEncoder:
+    """Interface commune : transforme des visages bruts (N, 10000) en vecteurs (N, d)."""
+
+    name = "raw"
+    version = 1
+    default_tolerance = 15.0
+
+    @property
+    def identifier(self) -> str:
+        return f"{self.name}/{self.version}"
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifie l'espace de projection exact (paramètres, modèle appris) : index approché."""
+        return self.identifier
+
+    @property
+    def is_fitted(self) -> bool:
+        return True
+
+    def needs_fit(self, n_templates: int) -> bool:
+        """Indique si l'encodeur doit être (ré)appris sur une base de cette taille."""
+        return False
+
+    def fit(self, templates: np.ndarray) -> None:
+        """Apprentissage éventuel sur la base enrôlée (rien à faire par défaut)."""
+
+    def transform(self, templates: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class RawEncoder(FaceEncoder):
+    """Encodage historique : pixels gris normalisés (10 000 dimensions)."""
+
+    def transform(self, templates: np.ndarray) -> np.ndarray:
+        return np.asarray(templates, dtype=np.float32)
+
+
+def _uniform_lbp_table() -> np.ndarray:
+    """Motifs LBP uniformes (≤ 2 transitions) -> 58 classes, le reste -> classe 58."""
+    table = np.full(256, 58, dtype=np.intp)
+    label = 0
+    for code in range(256):
+        bits = [(code >> i) & 1 for i in range(8)]
+        transitions = sum(bits[i] != bits[(i + 1) % 8] for i in range(8))
+        if transitions <= 2:
+            table[code] = label
+            label += 1
+    return table
+
+
+class LbpHistogramEncoder(FaceEncoder):
+    """
+    Histogrammes LBP uniformes (59 classes) sur une grille de cellules, calculés
+    en NumPy. Peu sensible à l'éclairage ; racine carrée des histogrammes pour
+    que la distance euclidienne corresponde à la distance de Hellinger.
+    """
+
+    name = "lbp"
+    version = 1
+    default_tolerance = 1.2
+    _BINS = 59
+    _NEIGHBOURS = ((-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1))
+
+    def __init__(self, grid: int = 4):
+        self.grid = grid
+        self._table = _uniform_lbp_table()
+        height, width = FACE_SHAPE[0] - 2, FACE_SHAPE[1] - 2
+        rows = np.minimum(np.arange(height) * grid // height, grid - 1)
+        cols = np.minimum(np.arange(width) * grid // width, grid - 1)
+        self._cells = (rows[:, None] * grid + cols[None, :]).ravel()
+        self._cell_sizes = np.bincount(self._cells, minlength=grid * grid).astype(np.float32)
+
+    @property
+    def fingerprint(self) -> str:
+        return f"{self.identifier}:{self.grid}x{self.grid}"
+
+    def transform(self, templates: np.ndarray) -> np.ndarray:
+        faces = np.asarray(templates, dtype=np.float32).reshape(-1, *FACE_SHAPE)
+        count = faces.shape[0]
+        center = faces[:, 1:-1, 1:-1]
+        codes = np.zeros(center.shape, dtype=np.uint8)
+        for bit, (dy, dx) in enumerate(self._NEIGHBOURS):
+            neighbour = faces[:, 1 + dy : FACE_SHAPE[0] - 1 + dy, 1 + dx : FACE_SHAPE[1] - 1 + dx]
+            codes |= (neighbour >= center).astype(np.uint8) << bit
+        cells = self.grid * self.grid
+        labels = self._table[codes.reshape(count, -1)]
+        flat = (
+            np.arange(count)[:, None] * (cells * self._BINS)
+            + self._cells[None, :] * self._BINS
+            + labels
+        )
+        hist = np.bincount(flat.ravel(), minlength=count * cells * self._BINS)
+        hist = hist.reshape(count, cells, self._BINS).astype(np.float32)
+        hist /= self._cell_sizes[None, :, None]
+        return np.sqrt(hist).reshape(count, -1)
+
+
+class PcaEncoder(FaceEncoder):
+    """
+    Projection PCA (eigenfaces) apprise sur la base enrôlée, ~128 dimensions.
+    Le modèle est sauvegardé dans model_file et réutilisé ; il est réappris
+    automatiquement tant qu'il a moins de composantes que voulu et que la base a
+    doublé depuis (manage.py fit-encoder pour forcer).
+    """
+
+    name = "pca"
+    version = 1
+    default_tolerance = 15.0
+
+    def __init__(self, model_file: Optional[Path] = None, n_components: int = 128):
+        self.model_file = model_file
+        self.n_components = n_components
+        self.mean: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None
+        self.fitted_samples = 0
+        self._fingerprint = self.identifier
+        if model_file is not None and model_file.exists():
+            self._load(model_file)
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.components is not None
+
+    @property
+    def fingerprint(self) -> str:
+        return self._fingerprint
+
+    def _set_model(self, mean: np.ndarray, components: np.ndarray) -> None:
+        self.mean, self.components = mean, components
+        # Un réapprentissage change la projection même à dimension égale
+        digest = hashlib.sha1(mean.tobytes())
+        digest.update(components.tobytes())
+        self._fingerprint = f"{self.identifier}:{digest.hexdigest()[:16]}"
+
+    def needs_fit(self, n_templates: int) -> bool:
+        if self.components is None:
+            return n_templates >= 2
+        incomplete = self.components.shape[0] < self.n_components
+        return incomplete and n_templates >= 2 * self.fitted_samples
+
+    def _load(self, model_file: Path) -> None:
+        with np.load(model_file) as model:
+            if str(model["encoder"]) != self.identifier:
+                return  # modèle d'une autre version : sera réappris
+            self._set_model(
+                model["mean"].astype(np.float32), model["components"].astype(np.float32)
+            )
+            self.fitted_samples = int(model["samples"])
+
+    def fit(self, templates: np.ndarray) -> None:
+        data = np.asarray(templates, dtype=np.float32)
+        if data.shape[0] < 2:
+            return
+        mean = data.mean(axis=0)
+        centered = data - mean
+        k = min(self.n_components, data.shape[0] - 1)
+        # Moins d'échantillons que de pixels : diagonaliser la matrice de Gram (N, N)
+        eigvals, eigvecs = np.linalg.eigh(centered @ centered.T)
+        order = np.argsort(eigvals)[::-1][:k]
+        eigvals = np.maximum(eigvals[order], 1e-6)
+        components = (centered.T @ eigvecs[:, order]) / np.sqrt(eigvals)
+        self._set_model(
+            mean.astype(np.float32), np.ascontiguousarray(components.T, dtype=np.float32)
+        )
+        self.fitted_samples = data.shape[0]
+        if self.model_file is not None:
+            self.model_file.parent.mkdir(parents=True, exist_ok=True)
+            np.savez(
+                self.model_file,
+                encoder=self.identifier,
+                mean=self.mean,
+                components=self.components,
+                samples=self.fitted_samples,
+            )
+
+    def transform(self, templates: np.ndarray) -> np.ndarray:
+        data = np.asarray(templates, dtype=np.float32)
+        if self.components is None:
+            raise RuntimeError("Encodeur PCA non entraîné : aucune base enrôlée.")
+        return (data - self.mean) @ self.components.T
+
+
+def create_encoder(config: dict, model_dir: Path) -> FaceEncoder:
+    """Instancie l'encodeur choisi dans settings.json ("raw", "lbp" ou "pca")."""
+    name = config.get("name", "raw")
+    if name == "raw":
+        return RawEncoder()
+    if name == "lbp":
+        return LbpHistogramEncoder(grid=int(config.get("lbp_grid", 4)))
+    if name == "pca":
+        return PcaEncoder(
+            model_dir / "pca.npz", n_components=int(config.get("pca_components", 128))
+        )
+    raise RuntimeError(f"Encodeur inconnu dans settings.json : {name!r}")
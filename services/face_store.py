@@ -1,81 +1,224 @@
 from __future__ import annotations
 
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Optional, Sequence
 
 import numpy as np
 import cv2
 
+from services.crop_archive import crop_center, crop_face, template_from_crop
+from services.face_detectors import HAAR_CASCADE, CascadeDetector, FaceDetector, create_detector
+from services.face_encoders import FACE_SHAPE, FaceEncoder, RawEncoder
+from services.telemetry import TELEMETRY
+from utils.paths import MODELS_DIR
+from utils.quantization import PIXEL_SCALE
+
+Box = tuple[int, int, int, int]
+
+
+@dataclass
+class DetectionConfig:
+    """
+    Paramètres de détection. Les tailles de visage sont des fractions du petit côté
+    de l'image (0 = pas de limite), donc indépendantes de la résolution.
+    """
+
+    downscale: float = 1.0  # facteur appliqué avant detectMultiScale (0.5 = moitié)
+    scale_factor: float = 1.1
+    min_neighbors: int = 5
+    min_face_ratio: float = 0.0
+    max_face_ratio: float = 0.0
+    use_roi: bool = False  # chercher d'abord autour des derniers visages connus
+    roi_margin: float = 0.5  # élargissement de la zone autour d'un visage connu
+    full_scan_every: int = 5  # balayage complet périodique pour les nouveaux arrivants
+    detector: str = "haar"  # voies : "haar", "lbp" (rapide) ou "dnn" (modèles dans data/models)
+    enrollment_detector: str = ""  # enrôlement et import ("" = même détecteur que les voies)
+    lbp_cascade: str = "lbpcascade_frontalface_improved.xml"
+    dnn_model: str = "res10_300x300_ssd_iter_140000.caffemodel"
+    dnn_config: str = "deploy.prototxt"
+    dnn_confidence: float = 0.6
+
 
 class FaceStore:
     """
     Encodage léger basé uniquement sur OpenCV :
-    - Détection via Haar cascade.
-    - Encodage = visage gris redimensionné (100x100) aplati/normalisé.
+    - Détection via le détecteur choisi (cascade Haar par défaut, LBP ou DNN),
+      sur image réduite si configuré.
+    - Encodage = visage gris redimensionné (100x100) aplati/normalisé : c'est le
+      modèle stocké ; l'encodeur (brut, LBP, PCA) le projette pour la comparaison.
     """
 
-    def __init__(self, images_dir: Path):
+    def __init__(
+        self,
+        images_dir: Path,
+        detection: Optional[DetectionConfig] = None,
+        encoder: Optional[FaceEncoder] = None,
+        detector: Optional[FaceDetector] = None,
+    ):
         self.images_dir = images_dir
         self.images_dir.mkdir(parents=True, exist_ok=True)
-        cascade_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-        self.detector = cv2.CascadeClassifier(cascade_path)
+        self.detection = detection or DetectionConfig()
+        self.encoder = encoder or RawEncoder()
+        self._detector = detector or CascadeDetector(
+            "haar", Path(cv2.data.haarcascades) / HAAR_CASCADE
+        )
+        self._detector_lock = threading.Lock()
+
+    @property
+    def detector(self) -> FaceDetector:
+        """Détecteur chargé au premier usage (ou par warm_up() en arrière-plan)."""
+        if not self._detector.loaded:
+            with self._detector_lock:
+                if not self._detector.loaded:
+                    self._detector.load()
+        return self._detector
+
+    def warm_up(self) -> None:
+        """Charge le détecteur et fait une détection à vide (initialisation d'OpenCV)."""
+        self._detect_faces(np.zeros((240, 320), dtype=np.uint8))
 
     def save_image(self, student_id: str, image_bytes: bytes, extension: str = "jpg") -> Path:
         path = self.images_dir / f"{student_id}.{extension}"
         path.write_bytes(image_bytes)
         return path
 
-    def _detect_faces(self, image_gray) -> list[tuple[int, int, int, int]]:
-        faces = self.detector.detectMultiScale(image_gray, scaleFactor=1.1, minNeighbors=5)
-        return faces.tolist() if hasattr(faces, "tolist") else list(faces)
+    def _detect_faces(self, image_gray, hints: Optional[Sequence[Box]] = None) -> list[Box]:
+        """
+        Détecte les visages ; avec use_roi et des visages connus (hints), ne cherche
+        que dans les zones autour d'eux et se replie sur l'image entière sinon.
+        """
+        config = self.detection
+        if config.use_roi and hints:
+            faces = self._detect_in_regions(image_gray, hints)
+            if faces:
+                return faces
+        return self._detect_scaled(image_gray, 0, 0, min(image_gray.shape[:2]))
 
-    def _encode_face_region(self, image_gray, x: int, y: int, w: int, h: int) -> List[float]:
-        roi = image_gray[y : y + h, x : x + w]
-        resized = cv2.resize(roi, (100, 100))
-        norm = resized.astype("float32") / 255.0
-        return norm.flatten().tolist()
+    def _detect_scaled(self, image_gray, offset_x: int, offset_y: int, reference: int) -> list[Box]:
+        """Détection sur l'image réduite, rectangles ramenés en pleine résolution."""
+        config = self.detection
+        scale = config.downscale if 0 < config.downscale < 1 else 1.0
+        small = image_gray
+        if scale != 1.0:
+            small = cv2.resize(image_gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        min_size = max_size = None
+        if config.min_face_ratio > 0:
+            side = max(1, int(reference * config.min_face_ratio * scale))
+            min_size = (side, side)
+        if config.max_face_ratio > 0:
+            side = max(1, int(reference * config.max_face_ratio * scale))
+            max_size = (side, side)
+        faces = self.detector.detect(
+            small, config.scale_factor, config.min_neighbors, min_size, max_size
+        )
+        if len(faces) == 0:
+            return []
+        return [
+            (
+                int(x / scale) + offset_x,
+                int(y / scale) + offset_y,
+                int(w / scale),
+                int(h / scale),
+            )
+            for (x, y, w, h) in faces
+        ]
+
+    def _detect_in_regions(self, image_gray, hints: Sequence[Box]) -> list[Box]:
+        height, width = image_gray.shape[:2]
+        reference = min(height, width)
+        margin = self.detection.roi_margin
+        faces: list[Box] = []
+        for (x, y, w, h) in hints:
+            x0 = max(0, int(x - w * margin))
+            y0 = max(0, int(y - h * margin))
+            x1 = min(width, int(x + w * (1 + margin)))
+            y1 = min(height, int(y + h * (1 + margin)))
+            if x1 <= x0 or y1 <= y0:
+                continue
+            for box in self._detect_scaled(image_gray[y0:y1, x0:x1], x0, y0, reference):
+                # Zones qui se chevauchent : ne pas compter deux fois le même visage
+                if not any(_same_face(box, other) for other in faces):
+                    faces.append(box)
+        return faces
 
-    def encode_image(self, image_path: Path) -> List[float]:
-        image_bgr = cv2.imread(str(image_path))
-        if image_bgr is None:
+    def encode_faces_batch(self, image_gray, boxes: Sequence[Box]) -> np.ndarray:
+        """
+        Encode plusieurs visages d'une même image en une matrice float32 (N, D),
+        sans passer par des listes Python ; chaque ligne est égale au modèle
+        d'enrôlement, template_from_crop(crop_face(image_gray, box)).
+        """
+        with TELEMETRY.span("encode"):
+            faces = np.empty((len(boxes), *FACE_SHAPE), dtype=np.uint8)
+            for i, box in enumerate(boxes):
+                faces[i] = crop_center(crop_face(image_gray, box))
+            return faces.reshape(len(boxes), -1).astype(np.float32) / PIXEL_SCALE
+
+    def extract_face(self, image_path: Path, max_side: int = 0):
+        """
+        Enrôlement : retourne (modèle, visage recadré pour l'archive). Le modèle
+        est calculé à partir du visage recadré, comme par manage.py re-encode.
+        """
+        gray = read_gray_image(image_path, max_side)
+        if gray is None:
             raise RuntimeError(f"Impossible de lire l'image {image_path}.")
-        gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
         faces = self._detect_faces(gray)
         if not faces:
             raise RuntimeError("Aucun visage détecté sur la photo fournie.")
-        x, y, w, h = faces[0]
-        return self._encode_face_region(gray, x, y, w, h)
+        crop = crop_face(gray, faces[0])
+        return template_from_crop(crop), crop
 
-    def encode_faces_from_frame(self, frame_bgr, with_boxes: bool = False):
-        """Détecte et encode tous les visages présents dans un frame BGR."""
-        gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
-        faces = self._detect_faces(gray)
-        items = []
-        for (x, y, w, h) in faces:
-            encoding = self._encode_face_region(gray, x, y, w, h)
-            if with_boxes:
-                items.append((encoding, (x, y, w, h)))
-            else:
-                items.append(encoding)
-        return items
-
-    @staticmethod
-    def compute_distance(encoding1: List[float], encoding2: List[float]) -> float:
-        """Calcule la distance euclidienne entre deux encodages"""
-        vec1 = np.array(encoding1, dtype=np.float32)
-        vec2 = np.array(encoding2, dtype=np.float32)
-        return float(np.linalg.norm(vec1 - vec2))
-
-    @staticmethod
-    def compare(
-        known_encodings: List[List[float]], face_to_check: List[float], tolerance: float = 0.6
-    ) -> List[bool]:
+    def detect_faces_in_frame(self, frame_bgr, hints: Optional[Sequence[Box]] = None):
         """
-        Compare par distance euclidienne sur encodage flatten. Plus simple que face_recognition.
+        Détecte les visages d'un frame BGR : retourne (image grise, rectangles).
+        hints : derniers visages connus, utilisés si la recherche par zone est active.
         """
-        if not known_encodings:
-            return []
-        known = np.array(known_encodings, dtype=np.float32)
-        target = np.array(face_to_check, dtype=np.float32)
-        dists = np.linalg.norm(known - target, axis=1)
-        return (dists < tolerance).tolist()
+        with TELEMETRY.span("detect"):
+            gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
+            return gray, self._detect_faces(gray, hints)
+
+
+def create_face_store(
+    images_dir: Path,
+    detection: DetectionConfig,
+    encoder: Optional[FaceEncoder] = None,
+    enrollment: bool = False,
+) -> FaceStore:
+    """FaceStore avec le détecteur des voies, ou celui de l'enrôlement (section "detection")."""
+    name = detection.detector
+    if enrollment:
+        name = detection.enrollment_detector or name
+    detector = create_detector(name, detection, MODELS_DIR, fallback=True)
+    return FaceStore(images_dir, detection, encoder, detector)
+
+
+def _same_face(a: Box, b: Box) -> bool:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    cx, cy = ax + aw / 2, ay + ah / 2
+    return bx <= cx <= bx + bw and by <= cy <= by + bh
+
+
+def read_gray_image(image_path: Path, max_side: int = 0):
+    """Lit une image en niveaux de gris, décodée à résolution réduite si possible."""
+    if max_side > 0:
+        # En-tête seulement : PIL ne décode pas les pixels pour lire la taille
+        from PIL import Image
+
+        try:
+            with Image.open(image_path) as probe:
+                long_side = max(probe.size)
+        except OSError:
+            return None
+        for factor, reduced in (
+            (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+            (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+            (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+        ):
+            if long_side // factor >= max_side:
+                return cv2.imread(str(image_path), reduced)
+    image_bgr = cv2.imread(str(image_path))
+    if image_bgr is None:
+        return None
+    return cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from models.student import Student
+from services.gallery_index import GalleryMatch
+
+Box = Tuple[int, int, int, int]
+
+
+def iou(a: Box, b: Box) -> float:
+    """Intersection sur union de deux rectangles (x, y, w, h)."""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _centroid_distance(a: Box, b: Box) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    dx = (ax + aw / 2) - (bx + bw / 2)
+    dy = (ay + ah / 2) - (by + bh / 2)
+    return (dx * dx + dy * dy) ** 0.5
+
+
+@dataclass
+class Track:
+    """Un visage suivi d'une frame à l'autre, avec l'identité qui lui est associée."""
+
+    track_id: int
+    box: Box
+    student: Optional[Student] = None
+    distance: float = float("inf")
+    margin: float = 0.0
+    confirmations: int = 0  # recherches consécutives donnant le même étudiant
+    matched: bool = False
+    frames_since_match: int = 0
+    missed: int = 0
+    debited_student_id: Optional[str] = None
+    reported_unknown: bool = False
+
+
+class FaceTracker:
+    """
+    Suivi léger par association IoU (repli sur la distance des centres) :
+    l'encodage + la recherche ne sont relancés que pour une piste nouvelle,
+    peu sûre (marge faible), inconnue depuis quelques frames, ou à revérifier.
+    Une identité est sûre avec une marge suffisante, ou confirmée par
+    confirm_matches recherches consécutives (une piste peu sûre est recherchée
+    à chaque frame).
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_missed: int = 5,
+        min_margin: float = 1.0,
+        retry_unknown_every: int = 3,
+        reverify_every: int = 30,
+        confirm_matches: int = 3,
+    ):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.min_margin = min_margin
+        self.retry_unknown_every = retry_unknown_every
+        self.reverify_every = reverify_every
+        self.confirm_matches = confirm_matches
+        self._tracks: List[Track] = []
+        self._next_id = 1
+
+    def reset(self) -> None:
+        self._tracks = []
+
+    def boxes(self) -> List[Box]:
+        """Derniers rectangles connus des pistes actives (zones de recherche)."""
+        return [track.box for track in self._tracks]
+
+    def update(self, boxes: List[Box]) -> List[Track]:
+        """Associe les détections de la frame aux pistes ; retourne les pistes visibles."""
+        pairs = []
+        for ti, track in enumerate(self._tracks):
+            for bi, box in enumerate(boxes):
+                overlap = iou(track.box, box)
+                if overlap >= self.iou_threshold:
+                    pairs.append((overlap, ti, bi))
+                else:
+                    # Visage rapide : repli sur la proximité des centres
+                    size = max(track.box[2], track.box[3])
+                    if _centroid_distance(track.box, box) < 0.5 * size:
+                        pairs.append((overlap * 0.5, ti, bi))
+        pairs.sort(reverse=True)
+
+        used_tracks, used_boxes = set(), set()
+        visible: List[Track] = []
+        for _, ti, bi in pairs:
+            if ti in used_tracks or bi in used_boxes:
+                continue
+            used_tracks.add(ti)
+            used_boxes.add(bi)
+            track = self._tracks[ti]
+            track.box = tuple(boxes[bi])
+            track.missed = 0
+            track.frames_since_match += 1
+            visible.append(track)
+
+        for ti, track in enumerate(self._tracks):
+            if ti not in used_tracks:
+                track.missed += 1
+        self._tracks = [t for t in self._tracks if t.missed <= self.max_missed]
+
+        for bi, box in enumerate(boxes):
+            if bi in used_boxes:
+                continue
+            track = Track(track_id=self._next_id, box=tuple(box))
+            self._next_id += 1
+            self._tracks.append(track)
+            visible.append(track)
+        return visible
+
+    def needs_match(self, track: Track) -> bool:
+        if not track.matched:
+            return True
+        if track.student is None:
+            return track.frames_since_match >= self.retry_unknown_every
+        if track.margin < self.min_margin:
+            return True
+        return track.frames_since_match >= self.reverify_every
+
+    def is_confident(self, track: Track) -> bool:
+        """L'identité de la piste est assez sûre pour débiter."""
+        if track.student is None:
+            return False
+        return track.margin >= self.min_margin or track.confirmations >= self.confirm_matches
+
+    def assign(self, track: Track, match: Optional[GalleryMatch]) -> None:
+        """Enregistre le résultat de la recherche pour la piste."""
+        track.matched = True
+        track.frames_since_match = 0
+        if match is None:
+            track.student = None
+            track.distance = float("inf")
+            track.margin = 0.0
+            track.confirmations = 0
+        else:
+            same = (
+                track.student is not None
+                and track.student.student_id == match.student.student_id
+            )
+            track.confirmations = track.confirmations + 1 if same else 1
+            track.student = match.student
+            track.distance = match.distance
+            track.margin = match.margin
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterator, Tuple
+
+import cv2
+
+from services.camera_recording import RECORDING_SUFFIX, read_recording
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def video_frames(video_file: Path) -> Iterator[Tuple[float, object]]:
+    """Frames d'une vidéo avec leur position (secondes) dans la vidéo."""
+    cap = cv2.VideoCapture(str(video_file))
+    if not cap.isOpened():
+        raise RuntimeError(f"Impossible d'ouvrir la vidéo {video_file}.")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    index = 0
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                return
+            position = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            yield (position if position > 0 else index / fps), frame
+            index += 1
+    finally:
+        cap.release()
+
+
+def image_frames(images_dir: Path, fps: float = 15.0) -> Iterator[Tuple[float, object]]:
+    """Images d'un dossier (ordre alphabétique), espacées de 1/fps secondes."""
+    paths = sorted(p for p in images_dir.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    if not paths:
+        raise RuntimeError(f"Aucune image dans {images_dir}.")
+    for index, path in enumerate(paths):
+        frame = cv2.imread(str(path))
+        if frame is not None:
+            yield index / fps, frame
+
+
+def open_frames(source: Path, fps: float = 15.0) -> Iterator[Tuple[float, object]]:
+    """Dossier d'images, session caméra enregistrée (.camrec) ou fichier vidéo."""
+    if source.is_dir():
+        return image_frames(source, fps)
+    if source.suffix.lower() == RECORDING_SUFFIX:
+        return read_recording(source)
+    return video_frames(source)
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from models.student import Student
+from services.ann_index import IvfIndex
+from services.face_encoders import FaceEncoder, RawEncoder
+from services.storage import StorageService
+from utils.paths import ANN_INDEX_FILE
+
+
+@dataclass(frozen=True)
+class GalleryMatch:
+    """Résultat d'une recherche : meilleur étudiant, distance et marge avec le 2e."""
+
+    student: Student
+    distance: float
+    margin: float
+
+
+class GalleryIndex:
+    """
+    Index mémoire des encodages de la base étudiants :
+    - modèles bruts projetés par l'encodeur actif (brut, LBP, PCA...) ;
+    - une seule matrice float32 contiguë (N, D) + normes au carré précalculées,
+      une ligne par modèle : les modèles d'un même étudiant sont consécutifs ;
+    - meilleure correspondance calculée en une opération vectorisée (distance
+      d'un étudiant = celle de son modèle le plus proche), ou via un index
+      approché (IVF) au-delà de ann_min_size étudiants ;
+    - rechargement uniquement si le stockage a changé (version) ou sur invalidate().
+    """
+
+    def __init__(
+        self,
+        storage: StorageService,
+        encoder: Optional[FaceEncoder] = None,
+        ann: Optional[IvfIndex] = None,
+        ann_min_size: int = 5000,
+    ):
+        self.storage = storage
+        self.encoder = encoder or RawEncoder()
+        self.ann = ann
+        self.ann_min_size = ann_min_size
+        self._use_ann = False
+        self._active_encoder: FaceEncoder = self.encoder
+        self._template_dim = 0
+        self._lock = threading.Lock()
+        self._local_writes = 0
+        self._version = None
+        self._students: List[Student] = []
+        self._positions: Dict[str, int] = {}
+        # Première ligne de chaque étudiant ; None si un seul modèle par étudiant
+        self._starts: Optional[np.ndarray] = None
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._sq_norms = np.empty(0, dtype=np.float32)
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._students)
+
+    def invalidate(self) -> None:
+        """Force le rechargement au prochain accès (ex: après un enregistrement)."""
+        with self._lock:
+            self._version = None
+
+    def refresh(self) -> None:
+        """Recharge l'index si le fichier de stockage a été modifié."""
+        if self._local_writes:
+            return  # écriture de ce processus en cours : rien à recharger
+        version = self.storage.data_version()
+        if version == self._version:
+            return
+        with self._lock:
+            # Relu sous verrou : une écriture locale a pu commencer entre-temps
+            if self._local_writes:
+                return
+            version = self.storage.data_version()
+            if version == self._version:
+                return
+            self._rebuild(self.storage.load_students(), *self.storage.load_encodings())
+            self._version = version
+
+    def _rebuild(self, students: List[Student], ids: List[str], matrix: np.ndarray) -> None:
+        by_id = {s.student_id: s for s in students}
+        rows_by_student: Dict[str, List[int]] = {}
+        for i, student_id in enumerate(ids):
+            if student_id in by_id:
+                rows_by_student.setdefault(student_id, []).append(i)
+        rows = [i for student_rows in rows_by_student.values() for i in student_rows]
+        if rows != list(range(len(ids))):
+            matrix = matrix[rows]
+        self._students = [by_id[student_id] for student_id in rows_by_student]
+        self._positions = {s.student_id: i for i, s in enumerate(self._students)}
+        self._starts = None
+        if len(rows) != len(self._students):
+            counts = [len(student_rows) for student_rows in rows_by_student.values()]
+            self._starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.intp)
+        self._template_dim = matrix.shape[1] if len(rows) else 0
+        if self.encoder.needs_fit(len(rows)):
+            self.encoder.fit(matrix)
+        # Base trop petite pour apprendre l'encodeur : comparaison brute en attendant
+        self._active_encoder = self.encoder if self.encoder.is_fitted else RawEncoder()
+        if len(rows):
+            matrix = self._active_encoder.transform(matrix)
+        self._matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self._sq_norms = np.einsum("ij,ij->i", self._matrix, self._matrix)
+        self._use_ann = self.ann is not None and len(rows) >= self.ann_min_size
+        if self._use_ann:
+            self.ann.attach(self._row_keys(), self._matrix, self._active_encoder.fingerprint)
+
+    def _row_keys(self) -> List[str]:
+        """Clé de chaque ligne pour l'index approché : "id", puis "id#1", "id#2"..."""
+        counts = self._row_counts()
+        return [
+            student.student_id if k == 0 else f"{student.student_id}#{k}"
+            for student, count in zip(self._students, counts)
+            for k in range(count)
+        ]
+
+    def _row_counts(self) -> np.ndarray:
+        if self._starts is None:
+            return np.ones(len(self._students), dtype=np.intp)
+        return np.diff(np.append(self._starts, len(self._matrix)))
+
+    def add_student(self, student: Student, template: List[float]) -> None:
+        """
+        Ajoute (ou remplace) un étudiant qui vient d'être enregistré, sans recharger
+        toute la base ; l'index approché est mis à jour de façon incrémentale.
+        template : un modèle, ou plusieurs concaténés (enrôlement en rafale).
+        """
+        with self._lock:
+            flat = np.asarray(template, dtype=np.float32).ravel()
+            count = len(self._students) + 1
+            if (
+                self._version is None
+                or not self._students
+                or flat.size % self._template_dim
+                or self.encoder.needs_fit(count)
+            ):
+                self._version = None
+                return
+            template_vec = flat.reshape(-1, self._template_dim)
+            vectors = self._active_encoder.transform(template_vec).astype(np.float32)
+            norms = np.einsum("ij,ij->i", vectors, vectors)
+            counts = self._row_counts()
+            position = self._positions.get(student.student_id)
+            if position is None:
+                position = len(self._students)
+                first_row = len(self._matrix)
+                if self._starts is not None or len(vectors) > 1:
+                    self._starts = np.append(np.cumsum(counts) - counts, first_row)
+                self._students = self._students + [student]
+                self._positions = dict(self._positions, **{student.student_id: position})
+                self._matrix = np.vstack((self._matrix, vectors))
+                self._sq_norms = np.append(self._sq_norms, norms)
+            elif counts[position] == len(vectors):
+                first_row = int(np.sum(counts[:position]))
+                students = list(self._students)
+                students[position] = student
+                self._students = students
+                self._matrix = self._matrix.copy()
+                self._matrix[first_row : first_row + len(vectors)] = vectors
+                self._sq_norms = self._sq_norms.copy()
+                self._sq_norms[first_row : first_row + len(vectors)] = norms
+            else:
+                self._version = None  # nombre de modèles différent : rechargement
+                return
+            if self._use_ann:
+                for k, vector in enumerate(vectors):
+                    key = student.student_id if k == 0 else f"{student.student_id}#{k}"
+                    self.ann.add(first_row + k, key, vector)
+            elif self.ann is not None and len(self._students) >= self.ann_min_size:
+                self._version = None  # seuil atteint : l'index approché sera construit
+                return
+            self._version = self.storage.data_version()
+
+    def update_student(self, student: Student, acknowledge: bool = True) -> None:
+        """
+        Met à jour un étudiant déjà indexé (ex: nouveau solde) sans recharger,
+        et prend acte de l'écriture faite par ce processus (acknowledge=False :
+        solde en mémoire seulement, écriture différée).
+        """
+        with self._lock:
+            position = self._positions.get(student.student_id)
+            if position is None:
+                self._version = None
+                return
+            self._students[position] = student
+            if acknowledge and self._version is not None:
+                self._version = self.storage.data_version()
+
+    def get_student(self, student_id: str) -> Optional[Student]:
+        """Étudiant indexé (avec le solde tenu en mémoire), None s'il est inconnu."""
+        self.refresh()
+        with self._lock:
+            position = self._positions.get(student_id)
+            return self._students[position] if position is not None else None
+
+    @contextmanager
+    def local_write(self):
+        """
+        Écriture du stockage par ce processus (file de débits) : pas de
+        rechargement pendant l'écriture, puis prise en compte de la nouvelle version.
+        """
+        with self._lock:
+            self._local_writes += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._local_writes -= 1
+                if self._version is not None:
+                    self._version = self.storage.data_version()
+
+    def best_match(self, encoding: List[float]) -> Optional[GalleryMatch]:
+        """Retourne l'étudiant le plus proche (sans seuil), ou None si la base est vide."""
+        return self.best_matches(np.asarray(encoding, dtype=np.float32)[None, :])[0]
+
+    def best_matches(self, queries: np.ndarray) -> List[Optional[GalleryMatch]]:
+        """
+        Meilleure correspondance de chaque ligne de queries (N, D), en un seul calcul.
+        Les requêtes sont des modèles bruts, projetés ici par l'encodeur.
+        """
+        self.refresh()
+        with self._lock:
+            students, matrix, sq_norms = self._students, self._matrix, self._sq_norms
+            template_dim, encoder = self._template_dim, self._active_encoder
+            use_ann, starts = self._use_ann, self._starts
+        queries = np.asarray(queries, dtype=np.float32)
+        if not students or queries.ndim != 2 or queries.shape[1] != template_dim:
+            return [None] * len(queries)
+        queries = encoder.transform(queries)
+        if use_ann:
+            # Les listes de l'index évoluent avec add_student : recherche sous verrou
+            owners = None
+            if starts is not None:
+                counts = np.diff(np.append(starts, len(matrix)))
+                owners = np.repeat(np.arange(len(students)), counts)
+            with self._lock:
+                best, first, second = self.ann.search(queries, matrix, sq_norms, owners=owners)
+        else:
+            best, first, second = self._exact_search(queries, matrix, sq_norms, starts)
+        margins = np.sqrt(second) - np.sqrt(first)
+        return [
+            GalleryMatch(students[b], float(np.sqrt(d)), float(m)) if np.isfinite(d) else None
+            for b, d, m in zip(best, first, margins)
+        ]
+
+    @staticmethod
+    def _exact_search(
+        queries: np.ndarray,
+        matrix: np.ndarray,
+        sq_norms: np.ndarray,
+        starts: Optional[np.ndarray] = None,
+    ):
+        """
+        Recherche exacte : (meilleur étudiant, distance², 2e distance²) par requête.
+        starts : première ligne de chaque étudiant si plusieurs modèles par étudiant.
+        """
+        # ||g - q||² = ||g||² + ||q||² - 2 g.q, pour toutes les paires (N, M)
+        sq_dists = (
+            sq_norms[None, :]
+            + np.einsum("ij,ij->i", queries, queries)[:, None]
+            - 2.0 * (queries @ matrix.T)
+        )
+        np.maximum(sq_dists, 0.0, out=sq_dists)
+        if starts is not None:
+            # Distance à chaque étudiant = son modèle le plus proche (lignes consécutives)
+            sq_dists = np.minimum.reduceat(sq_dists, starts, axis=1)
+        rows = np.arange(len(queries))
+        if sq_dists.shape[1] == 1:
+            best = np.zeros(len(queries), dtype=np.intp)
+            return best, sq_dists[:, 0], np.full(len(queries), np.inf, dtype=np.float32)
+        pair = np.argpartition(sq_dists, 1, axis=1)[:, :2]
+        first, second = sq_dists[rows, pair[:, 0]], sq_dists[rows, pair[:, 1]]
+        swap = second < first
+        best = np.where(swap, pair[:, 1], pair[:, 0])
+        return best, np.minimum(first, second), np.maximum(first, second)
+
+
+def create_gallery_index(storage, encoder: FaceEncoder, settings: dict) -> GalleryIndex:
+    """Galerie avec index approché si activé dans settings.json (section "ann")."""
+    config = settings.get("ann", {})
+    ann = None
+    if config.get("enabled", False):
+        ann = IvfIndex(
+            ANN_INDEX_FILE,
+            n_lists=int(config.get("n_lists", 0)),
+            n_probe=int(config.get("n_probe", 8)),
+        )
+    return GalleryIndex(storage, encoder, ann, int(config.get("min_gallery", 5000)))
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List
+
+from services.camera import CameraService
+from services.face_encoders import FaceEncoder
+from services.face_store import DetectionConfig, FaceStore, create_face_store
+from utils.paths import DATA_DIR, IMAGES_DIR
+
+
+@dataclass
+class Lane:
+    """
+    Une voie de passage : sa caméra et son détecteur (le détecteur OpenCV n'est
+    pas partagé entre threads). La galerie, l'encodeur et le stockage sont communs
+    à toutes les voies.
+    """
+
+    name: str
+    camera_service: CameraService
+    face_store: FaceStore
+
+
+def create_lanes(settings: dict, encoder: FaceEncoder) -> List[Lane]:
+    """
+    Voies décrites dans la section "lanes" de settings.json (une par caméra).
+    "replay" : session enregistrée (.camrec, relative à data/) rejouée à la place
+    de la caméra, au rythme enregistré sauf "realtime": false ; "record" :
+    enregistre la session de la caméra dans ce fichier.
+    """
+    detection = settings["detection"]
+    lanes = []
+    for index, config in enumerate(settings["lanes"] or [{}]):
+        camera_index = int(config.get("camera_index", index))
+        replay, record = config.get("replay"), config.get("record")
+        camera = CameraService(
+            camera_index=camera_index,
+            replay=DATA_DIR / replay if replay else None,
+            realtime=bool(config.get("realtime", True)),
+            record_to=DATA_DIR / record if record else None,
+        )
+        lanes.append(
+            Lane(
+                name=config.get("name") or f"Caisse {index + 1}",
+                camera_service=camera,
+                face_store=create_face_store(IMAGES_DIR, DetectionConfig(**detection), encoder),
+            )
+        )
+    return lanes
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import datetime as dt
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from services.access_events import GRANTED, INSUFFICIENT, REFUSED, AccessEvent
+
+# Un enregistrement de taille fixe par passage : un fichier journalier se lit
+# en memory-map comme un tableau structuré, sans objet Python par passage.
+PASSAGE_DTYPE = np.dtype(
+    [
+        ("time", "<f8"),  # horodatage Unix (s)
+        ("student_id", "S32"),  # vide si visage non reconnu
+        ("lane", "S24"),
+        ("kind", "u1"),  # KIND_CODES
+        ("amount", "<f4"),
+        ("balance", "<f4"),
+        ("distance", "<f4"),  # inf si non reconnu
+    ]
+)
+PASSAGE_MAGIC = b"PASSAGE1"
+HEADER_SIZE = 16  # magic + taille d'un enregistrement (contrôle du format)
+KIND_CODES = {GRANTED: 1, INSUFFICIENT: 2, REFUSED: 3}
+
+
+def _header() -> bytes:
+    return PASSAGE_MAGIC + PASSAGE_DTYPE.itemsize.to_bytes(8, "little")
+
+
+class PassageLog:
+    """
+    Journal des passages en ajout seul, un fichier par jour (<dossier>/AAAA-MM-JJ.pass) :
+    - append() reçoit chaque AccessEvent (abonné du moteur) et écrit un
+      enregistrement en une seule écriture O_APPEND (plusieurs voies, plusieurs
+      processus) ;
+    - read() renvoie les passages d'une période (tableau structuré PASSAGE_DTYPE).
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._day: Optional[dt.date] = None
+        self._fd: Optional[int] = None
+
+    def path_for(self, day: dt.date) -> Path:
+        return self.directory / f"{day.isoformat()}.pass"
+
+    def append(self, event: AccessEvent) -> None:
+        record = np.zeros(1, dtype=PASSAGE_DTYPE)
+        record["time"] = event.timestamp
+        if event.student is not None:
+            record["student_id"] = event.student.student_id.encode("utf-8")[:32]
+        record["lane"] = event.lane.encode("utf-8")[:24]
+        record["kind"] = KIND_CODES[event.kind]
+        record["amount"] = event.amount
+        record["balance"] = event.balance
+        record["distance"] = event.distance
+        day = dt.date.fromtimestamp(event.timestamp)
+        with self._lock:
+            if day != self._day:
+                self._open(day)
+            os.write(self._fd, record.tobytes())
+
+    def _open(self, day: dt.date) -> None:
+        """Rotation : fichier du jour, créé avec son en-tête si besoin."""
+        self.close_file()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # O_BINARY : sous Windows, un fichier ouvert sans ce drapeau est en mode texte
+        # et chaque octet 0x0A des enregistrements deviendrait CRLF
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        fd = os.open(self.path_for(day), flags, 0o644)
+        if os.fstat(fd).st_size == 0:
+            os.write(fd, _header())
+        self._fd, self._day = fd, day
+
+    def close_file(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd, self._day = None, None
+
+    def close(self) -> None:
+        with self._lock:
+            self.close_file()
+
+    def days(
+        self, start: Optional[dt.date] = None, end: Optional[dt.date] = None
+    ) -> List[dt.date]:
+        """Jours journalisés dans [start, end], dans l'ordre."""
+        days = []
+        for path in self.directory.glob("*.pass"):
+            try:
+                day = dt.date.fromisoformat(path.stem)
+            except ValueError:
+                continue
+            if (start is None or day >= start) and (end is None or day <= end):
+                days.append(day)
+        return sorted(days)
+
+    def open_day(self, day: dt.date) -> np.ndarray:
+        """Passages d'un jour, memory-mappés (un enregistrement incomplet en fin est ignoré)."""
+        path = self.path_for(day)
+        size = path.stat().st_size if path.exists() else 0
+        count = max(0, size - HEADER_SIZE) // PASSAGE_DTYPE.itemsize
+        if count == 0:
+            return np.empty(0, dtype=PASSAGE_DTYPE)
+        with path.open("rb") as handle:
+            if handle.read(HEADER_SIZE) != _header():
+                raise RuntimeError(f"Journal de passages incompatible : {path.name}.")
+        return np.memmap(
+            path, dtype=PASSAGE_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,)
+        )
+
+    def read(self, start: Optional[dt.date] = None, end: Optional[dt.date] = None) -> np.ndarray:
+        """Passages d'une période en un seul tableau (copie en mémoire)."""
+        days = [self.open_day(day) for day in self.days(start, end)]
+        if not days:
+            return np.empty(0, dtype=PASSAGE_DTYPE)
+        return np.concatenate(days)
+
+    def summarize(
+        self,
+        start: Optional[dt.date] = None,
+        end: Optional[dt.date] = None,
+        lane: Optional[str] = None,
+        student_id: Optional[str] = None,
+    ) -> "PassageSummary":
+        """Agrège une période jour par jour : la mémoire ne dépend pas de la durée."""
+        return PassageSummary.merge(
+            [summarize(self.open_day(day), lane, student_id) for day in self.days(start, end)]
+        )
+
+
+@dataclass
+class PassageSummary:
+    """Agrégats d'une période : totaux, passages par jour et par heure de la journée."""
+
+    days: List[dt.date]
+    per_day: np.ndarray  # (jours, 3) : accès, refus, recette
+    per_hour: np.ndarray  # (24,) : accès par heure locale, toute la période
+
+    @classmethod
+    def merge(cls, parts: List["PassageSummary"]) -> "PassageSummary":
+        days = sorted({day for part in parts for day in part.days})
+        position = {day: i for i, day in enumerate(days)}
+        per_day = np.zeros((len(days), 3), dtype=np.float64)
+        per_hour = np.zeros(24, dtype=np.int64)
+        for part in parts:
+            rows = [position[day] for day in part.days]
+            np.add.at(per_day, rows, part.per_day)
+            per_hour += part.per_hour
+        return cls(days, per_day, per_hour)
+
+    @property
+    def meals(self) -> int:
+        return int(self.per_day[:, 0].sum())
+
+    @property
+    def refused(self) -> int:
+        return int(self.per_day[:, 1].sum())
+
+    @property
+    def revenue(self) -> float:
+        return float(self.per_day[:, 2].sum())
+
+    @property
+    def refused_rate(self) -> float:
+        total = self.meals + self.refused
+        return self.refused / total if total else 0.0
+
+
+def summarize(
+    records: np.ndarray, lane: Optional[str] = None, student_id: Optional[str] = None
+) -> PassageSummary:
+    """
+    Agrège des passages (tableau PASSAGE_DTYPE) par opérations vectorisées :
+    seules les colonnes utiles sont lues, jamais un objet par passage.
+    Accès = débit effectué (solde positif ou épuisé) ; recette = montants débités.
+    """
+    mask = np.ones(len(records), dtype=bool)
+    if lane is not None:
+        mask &= records["lane"] == lane.encode("utf-8")
+    if student_id is not None:
+        mask &= records["student_id"] == student_id.encode("utf-8")
+    times = np.asarray(records["time"][mask])
+    kinds = np.asarray(records["kind"][mask])
+    amounts = np.asarray(records["amount"][mask], dtype=np.float64)
+    debited = (kinds == KIND_CODES[GRANTED]) | (kinds == KIND_CODES[INSUFFICIENT])
+    refused = kinds == KIND_CODES[REFUSED]
+
+    # Heure locale : décalage UTC du jour (changement d'heure au plus une fois par jour)
+    utc_day = np.floor(times / 86400.0).astype(np.int64)
+    unique_days, inverse = np.unique(utc_day, return_inverse=True)
+    offsets = np.array(
+        [_utc_offset(day * 86400.0 + 43200.0) for day in unique_days], dtype=np.float64
+    )
+    local = times + (offsets[inverse] if len(times) else 0.0)
+    local_day = np.floor(local / 86400.0).astype(np.int64)
+    hours = ((local - local_day * 86400.0) // 3600).astype(np.intp)
+
+    days, day_index = np.unique(local_day, return_inverse=True)
+    per_day = np.zeros((len(days), 3), dtype=np.float64)
+    per_day[:, 0] = np.bincount(day_index, weights=debited, minlength=len(days))
+    per_day[:, 1] = np.bincount(day_index, weights=refused, minlength=len(days))
+    per_day[:, 2] = np.bincount(day_index, weights=amounts * debited, minlength=len(days))
+    per_hour = np.bincount(hours[debited], minlength=24)[:24]
+    epoch = dt.date(1970, 1, 1)
+    return PassageSummary(
+        [epoch + dt.timedelta(days=int(day)) for day in days], per_day, per_hour
+    )
+
+
+def _utc_offset(timestamp: float) -> float:
+    return dt.datetime.fromtimestamp(timestamp).astimezone().utcoffset().total_seconds()
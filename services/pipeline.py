@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Generic, Optional, Tuple, TypeVar
+
+from services.scheduling import AdaptiveScheduler
+from services.telemetry import TELEMETRY
+
+Result = TypeVar("Result")
+
+
+class FrameGrabber:
+    """
+    Thread de capture : lit la caméra en continu et ne garde que la dernière frame.
+    Les frames non consommées sont écrasées (jamais mises en file).
+    """
+
+    def __init__(self, read: Callable[[], Tuple[bool, Any]]):
+        self._read = read
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self.error: Optional[str] = None
+
+    def start(self) -> None:
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="frame-grabber", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self) -> None:
+        while self._running:
+            with TELEMETRY.span("capture"):
+                ok, frame = self._read()
+            if not ok:
+                self.error = "Erreur de lecture caméra"
+                time.sleep(0.05)
+                continue
+            self.error = None
+            with self._cond:
+                self._frame = frame
+                self._seq += 1
+                self._cond.notify_all()
+
+    def latest(self) -> Tuple[int, Any]:
+        """Dernière frame capturée (non bloquant) : (seq, frame), frame None au départ."""
+        with self._cond:
+            return self._seq, self._frame
+
+    def wait_newer(self, seq: int, timeout: float = 0.5) -> Tuple[int, Any]:
+        """Attend une frame plus récente que seq ; retourne (seq, frame) ou (seq, None)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > seq or not self._running, timeout)
+            if self._seq > seq:
+                return self._seq, self._frame
+            return seq, None
+
+
+class RecognitionPipeline(Generic[Result]):
+    """
+    Capture (thread 1) -> reconnaissance (thread 2) -> file bornée lue par Tk.
+
+    process(frame) tourne dans le worker et retourne un résultat prêt à afficher ;
+    si le worker prend du retard, les frames intermédiaires sont ignorées et seul
+    le résultat le plus récent est conservé, ce qui borne la latence.
+    Avec un scheduler, le worker espace les analyses selon le temps de
+    traitement mesuré et ralentit quand la voie est inactive (is_active).
+    """
+
+    def __init__(
+        self,
+        read: Callable[[], Tuple[bool, Any]],
+        process: Callable[[Any], Result],
+        on_error: Optional[Callable[[Exception], None]] = None,
+        scheduler: Optional[AdaptiveScheduler] = None,
+        is_active: Callable[[Result], bool] = lambda result: True,
+    ):
+        self.grabber = FrameGrabber(read)
+        self._process = process
+        self._on_error = on_error
+        self._scheduler = scheduler
+        self._is_active = is_active
+        self._results: "queue.Queue[Result]" = queue.Queue(maxsize=1)
+        self._running = False
+        self._stopped = threading.Event()  # interrompt l'attente entre deux analyses
+        self._thread: Optional[threading.Thread] = None
+        self.dropped_frames = 0  # frames manquées parce que l'analyse a pris du retard
+        self.skipped_frames = 0  # frames volontairement non analysées (cadence réduite)
+
+    def start(self) -> None:
+        self._running = True
+        self._stopped.clear()
+        self.grabber.start()
+        self._thread = threading.Thread(target=self._run, name="recognition", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        self._stopped.set()
+        self.grabber.stop()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _run(self) -> None:
+        seq = 0
+        while self._running:
+            new_seq, frame = self.grabber.wait_newer(seq)
+            if frame is None:
+                continue
+            self.dropped_frames += max(0, new_seq - seq - 1)
+            seq = new_seq
+            started = time.perf_counter()
+            try:
+                result = self._process(frame)
+            except Exception as exc:  # ne pas arrêter le flux pour une erreur temporaire
+                if self._on_error is not None:
+                    self._on_error(exc)
+                continue
+            self._publish(result)
+            if self._scheduler is not None:
+                seq = self._pause(seq, time.perf_counter() - started, self._is_active(result))
+
+    def _pause(self, seq: int, elapsed: float, active: bool) -> int:
+        """Attend la prochaine analyse prévue ; les frames intermédiaires sont ignorées."""
+        period = self._scheduler.period(elapsed, active)
+        if period > elapsed:
+            with TELEMETRY.span("idle"):
+                self._stopped.wait(period - elapsed)
+        latest, _ = self.grabber.latest()
+        if latest <= seq:
+            return seq
+        # La frame la plus récente reste à analyser, sans attendre la suivante
+        self.skipped_frames += latest - seq - 1
+        return latest - 1
+
+    def _publish(self, result: Result) -> None:
+        try:
+            self._results.put_nowait(result)
+        except queue.Full:
+            try:
+                self._results.get_nowait()
+            except queue.Empty:
+                pass
+            self._results.put_nowait(result)
+
+    def latest(self) -> Optional[Result]:
+        """Dernier résultat disponible (non bloquant), None si rien de nouveau."""
+        try:
+            return self._results.get_nowait()
+        except queue.Empty:
+            return None
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from services import bulk_import
+from services.crop_archive import (
+    CROP_SIZE,
+    CropArchive,
+    crop_hash,
+    template_key,
+    templates_from_crops,
+)
+from services.encoding_store import TEMPLATE_SIZE
+from services.face_store import FaceStore
+from utils.paths import resolve_data_path
+from utils.quantization import quantize
+
+CHUNK_SIZE = 256
+
+
+@dataclass
+class ReencodeReport:
+    rebuilt: int = 0
+    skipped: int = 0  # visage et format de modèle inchangés
+    archived: int = 0  # visages ajoutés à l'archive depuis les photos
+    missing: List[str] = field(default_factory=list)  # étudiants sans visage archivé
+    failures: List[Tuple[str, str]] = field(default_factory=list)  # (étudiant, erreur)
+    elapsed: float = 0.0
+
+
+# Archive ouverte en memory-map par chaque processus du pool (rien n'est copié)
+_worker_crops: Optional[np.ndarray] = None
+
+
+def _init_worker(archive_file: str, slots: int) -> None:
+    global _worker_crops
+    _worker_crops = np.memmap(archive_file, dtype=np.uint8, mode="r", shape=(slots, *CROP_SIZE))
+
+
+def _rebuild_chunk(
+    items: List[Tuple[str, int, int, str]]
+) -> List[Tuple[str, Optional[bytes], Optional[str]]]:
+    """Recalcule les modèles d'un lot (student_id, emplacement, visages, hash attendu)."""
+    results = []
+    for student_id, slot, count, expected in items:
+        crops = _worker_crops[slot : slot + count]
+        if crop_hash(crops) != expected:
+            results.append((student_id, None, "visage archivé altéré (hash différent)"))
+            continue
+        results.append((student_id, quantize(templates_from_crops(crops)).tobytes(), None))
+    return results
+
+
+def archive_photos(
+    archive: CropArchive,
+    storage,
+    face_store: FaceStore,
+    workers: int,
+    report: ReencodeReport,
+) -> None:
+    """
+    Ajoute à l'archive le visage des étudiants qui n'en ont pas (enrôlés avant
+    l'archive) en redétectant leur photo ; leur modèle sera recalculé ensuite.
+    """
+    pending = {
+        str(resolve_data_path(s.image_path)): s
+        for s in storage.load_students()
+        if s.student_id not in archive.entries and s.image_path
+    }
+    if not pending:
+        return
+    crops = {}
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=bulk_import._init_worker,
+        initargs=(str(face_store.images_dir), asdict(face_store.detection), 0),
+    ) as pool:
+        chunksize = max(1, len(pending) // (workers * 8))
+        for photo, _, crop, error in pool.map(
+            bulk_import._encode_photo, list(pending), chunksize=chunksize
+        ):
+            student = pending[photo]
+            if error is not None:
+                report.failures.append((student.student_id, f"{photo} : {error}"))
+                continue
+            crops[student.student_id] = (
+                np.frombuffer(crop, dtype=np.uint8).reshape(CROP_SIZE),
+                student.image_path,
+            )
+    archive.add_many(crops, template_built=False)
+    report.archived = len(crops)
+
+
+def reencode_gallery(
+    archive: CropArchive,
+    storage,
+    face_store: Optional[FaceStore] = None,
+    workers: int = 0,
+    force: bool = False,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> ReencodeReport:
+    """
+    Recalcule les modèles stockés à partir de l'archive de visages, par lots
+    répartis sur les cœurs. Un étudiant est ignoré si son visage (hash) et le
+    format de modèle n'ont pas changé depuis le dernier calcul, sauf force=True.
+    face_store : archive d'abord les visages manquants à partir des photos.
+    """
+    report = ReencodeReport()
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    if face_store is not None:
+        archive_photos(archive, storage, face_store, workers, report)
+
+    student_ids = {s.student_id for s in storage.load_students()}
+    stored = set(storage.load_encodings()[0])
+    archive.remove_missing(student_ids)
+    if archive.unused_slots > len(archive):
+        archive.compact()
+    report.missing = sorted(student_ids - set(archive.entries))
+
+    todo = []
+    for student_id, entry in archive.entries.items():
+        if not force and entry.template == template_key(entry.hash) and student_id in stored:
+            report.skipped += 1
+        else:
+            todo.append((student_id, entry.slot, entry.count, entry.hash))
+    if todo:
+        chunks = [todo[i : i + CHUNK_SIZE] for i in range(0, len(todo), CHUNK_SIZE)]
+        ids: List[str] = []  # une entrée par modèle
+        rows: List[np.ndarray] = []
+        rebuilt: List[str] = []
+        failed = 0
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(chunks)),
+            initializer=_init_worker,
+            initargs=(str(archive.archive_file), archive.slots),
+        ) as pool:
+            for results in pool.map(_rebuild_chunk, chunks):
+                for student_id, blob, error in results:
+                    if error is not None:
+                        report.failures.append((student_id, error))
+                        failed += 1
+                        continue
+                    templates = np.frombuffer(blob, dtype=np.uint8).reshape(-1, TEMPLATE_SIZE)
+                    ids.extend([student_id] * len(templates))
+                    rows.append(templates)
+                    rebuilt.append(student_id)
+                if on_progress is not None:
+                    on_progress(len(rebuilt) + failed, len(todo))
+        if ids:
+            # Une seule écriture du stockage pour tous les modèles recalculés
+            storage.update_encodings(ids, np.concatenate(rows))
+            archive.mark_templates(
+                {sid: template_key(archive.entries[sid].hash) for sid in rebuilt}
+            )
+        report.rebuilt = len(rebuilt)
+    report.elapsed = time.perf_counter() - start
+    return report
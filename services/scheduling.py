@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+@dataclass
+class SchedulingConfig:
+    """Cadence de reconnaissance d'une voie (section "scheduling" de settings.json)."""
+
+    motion_gate: bool = True  # pas de détection si personne n'est suivi et rien n'a bougé
+    motion_threshold: float = 4.0  # écart moyen (niveaux de gris) sur l'image réduite
+    recheck_seconds: float = 2.0  # détection forcée périodique malgré l'absence de mouvement
+    idle_after: float = 3.0  # secondes sans mouvement ni visage avant le mode veille
+    idle_interval: float = 0.5  # période d'analyse en veille (2 images/s)
+    min_interval: float = 0.0  # période minimale en activité (0 = cadence de la caméra)
+    headroom: float = 0.25  # marge laissée au-delà du temps de traitement mesuré
+
+
+class MotionDetector:
+    """
+    Détecteur de changement très bon marché : l'image est réduite à quelques
+    centaines de pixels gris et comparée à la précédente (écart absolu moyen).
+    """
+
+    def __init__(self, threshold: float = 4.0, size: tuple = (32, 24)):
+        self.threshold = threshold
+        self.size = size
+        self._reference: Optional[np.ndarray] = None
+        self._tiny = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self.last_score = 0.0
+
+    def reset(self) -> None:
+        self._reference = None
+
+    def changed(self, frame_bgr: np.ndarray) -> bool:
+        """True si l'image a changé depuis la précédente (ou s'il n'y en a pas encore)."""
+        # Réduire d'abord : la conversion en gris ne porte que sur 32x24 pixels
+        cv2.resize(frame_bgr, self.size, dst=self._tiny, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(self._tiny, cv2.COLOR_BGR2GRAY)
+        reference, self._reference = self._reference, gray
+        if reference is None:
+            self.last_score = float("inf")
+            return True
+        self.last_score = float(cv2.absdiff(gray, reference).mean())
+        return self.last_score > self.threshold
+
+
+class AdaptiveScheduler:
+    """
+    Période entre deux analyses d'une voie :
+    - en activité (mouvement ou visage récent) : temps de traitement mesuré
+      (moyenne glissante) plus une marge, au moins min_interval ;
+    - en veille (rien depuis idle_after secondes) : idle_interval.
+    """
+
+    def __init__(self, config: Optional[SchedulingConfig] = None):
+        self.config = config or SchedulingConfig()
+        self._processing = 0.0  # moyenne glissante du temps de traitement (s)
+        self._last_activity = float("-inf")
+
+    @property
+    def processing_time(self) -> float:
+        return self._processing
+
+    def idle(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return now - self._last_activity > self.config.idle_after
+
+    def period(self, processing_seconds: float, active: bool, now: Optional[float] = None) -> float:
+        """Enregistre une analyse et retourne la période jusqu'à la suivante (s)."""
+        now = time.monotonic() if now is None else now
+        if self._processing == 0.0:
+            self._processing = processing_seconds
+        else:
+            self._processing += 0.2 * (processing_seconds - self._processing)
+        if active:
+            self._last_activity = now
+        if self.idle(now):
+            return self.config.idle_interval
+        return max(self.config.min_interval, self._processing * (1.0 + self.config.headroom))
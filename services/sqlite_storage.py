@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from models.student import Student
+from services.encoding_store import TEMPLATE_ENCODER, TEMPLATE_SIZE
+from utils.quantization import dequantize, quantize
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    student_id    TEXT PRIMARY KEY,
+    first_name    TEXT NOT NULL,
+    last_name     TEXT NOT NULL,
+    balance       REAL NOT NULL DEFAULT 0,
+    image_path    TEXT NOT NULL DEFAULT '',
+    face_encoding BLOB,
+    encoder       TEXT
+)
+"""
+
+_UPSERT = """
+INSERT INTO students (
+    student_id, first_name, last_name, balance, image_path, face_encoding, encoder
+)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(student_id) DO UPDATE SET
+    first_name = excluded.first_name,
+    last_name = excluded.last_name,
+    balance = excluded.balance,
+    image_path = excluded.image_path,
+    face_encoding = COALESCE(excluded.face_encoding, students.face_encoding),
+    encoder = COALESCE(excluded.encoder, students.encoder)
+"""
+
+# Numéro du dernier débit de la file appliqué, écrit dans la transaction des soldes
+_DEBIT_STATE = """
+CREATE TABLE IF NOT EXISTS debit_state (
+    id          INTEGER PRIMARY KEY CHECK (id = 0),
+    applied_seq INTEGER NOT NULL
+)
+"""
+
+_SET_DEBIT_SEQ = """
+INSERT INTO debit_state (id, applied_seq) VALUES (0, ?)
+ON CONFLICT(id) DO UPDATE SET applied_seq = max(applied_seq, excluded.applied_seq)
+"""
+
+_COLUMNS = "student_id, first_name, last_name, balance, image_path"
+
+
+class SqliteStorageService:
+    """
+    Même API publique que StorageService, adossée à SQLite (mode WAL) :
+    - un débit = un UPDATE atomique sur une ligne, sans réécrire la base ;
+    - encodages stockés en BLOB uint8 (comme le fichier binaire annexe), K
+      modèles concaténés pour un étudiant multi-modèles ;
+    - les étudiants chargés ont face_encoding vide, voir load_encodings().
+    """
+
+    def __init__(self, database_file: Path):
+        self.database_file = database_file
+        self.database_file.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._local_writes = 0
+        self._conn = sqlite3.connect(
+            str(database_file), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.execute(_DEBIT_STATE)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(students)")}
+        if "encoder" not in columns:  # base créée avant l'enregistrement de l'encodeur
+            self._conn.execute("ALTER TABLE students ADD COLUMN encoder TEXT")
+            self._conn.execute(
+                "UPDATE students SET encoder = ? WHERE face_encoding IS NOT NULL",
+                (TEMPLATE_ENCODER,),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @property
+    def separate_encodings(self) -> bool:
+        """Un étudiant écrit sans face_encoding garde son BLOB (COALESCE)."""
+        return True
+
+    def data_version(self) -> Tuple[int, int]:
+        """Change à chaque écriture, de ce processus ou d'un autre."""
+        with self._lock:
+            (external,) = self._conn.execute("PRAGMA data_version").fetchone()
+            return external, self._local_writes
+
+    def load_students(self) -> List[Student]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM students ORDER BY rowid"
+            ).fetchall()
+        return [Student(*row) for row in rows]
+
+    def load_encodings(self) -> Tuple[List[str], np.ndarray]:
+        """Retourne (ids, matrice float32) des modèles, une ligne par modèle (ids répétés)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT student_id, face_encoding FROM students "
+                "WHERE face_encoding IS NOT NULL AND encoder = ? ORDER BY rowid",
+                (TEMPLATE_ENCODER,),
+            ).fetchall()
+        if not rows:
+            return [], np.empty((0, 0), dtype=np.float32)
+        matrix = np.frombuffer(b"".join(r[1] for r in rows), dtype=np.uint8)
+        sizes = {len(r[1]) for r in rows}
+        if any(size % TEMPLATE_SIZE for size in sizes):
+            # Modèles d'une autre taille (ancienne base) : un par étudiant
+            return [r[0] for r in rows], dequantize(matrix.reshape(len(rows), -1))
+        ids = [r[0] for r in rows for _ in range(len(r[1]) // TEMPLATE_SIZE)]
+        return ids, dequantize(matrix.reshape(len(ids), TEMPLATE_SIZE))
+
+    def get_student(self, student_id: str) -> Optional[Student]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM students WHERE student_id = ?", (student_id,)
+            ).fetchone()
+        return Student(*row) if row else None
+
+    @staticmethod
+    def _row(student: Student) -> tuple:
+        blob = quantize(student.face_encoding).tobytes() if student.has_encoding else None
+        return (
+            student.student_id,
+            student.first_name,
+            student.last_name,
+            float(student.balance),
+            student.image_path,
+            blob,
+            TEMPLATE_ENCODER if blob is not None else None,
+        )
+
+    def save_students(self, students: List[Student]) -> None:
+        """Remplace la base par la liste fournie (encodages absents conservés)."""
+        ids = [(s.student_id,) for s in students]
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_ids (student_id TEXT)")
+            self._conn.execute("DELETE FROM keep_ids")
+            self._conn.executemany("INSERT INTO keep_ids VALUES (?)", ids)
+            self._conn.execute(
+                "DELETE FROM students WHERE student_id NOT IN (SELECT student_id FROM keep_ids)"
+            )
+            self._conn.executemany(_UPSERT, [self._row(s) for s in students])
+            self._local_writes += 1
+
+    def upsert_student(self, student: Student) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(_UPSERT, self._row(student))
+            self._local_writes += 1
+
+    def upsert_students(self, students: List[Student]) -> None:
+        """Ajoute/met à jour plusieurs étudiants en une seule transaction."""
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(_UPSERT, [self._row(s) for s in students])
+            self._local_writes += 1
+
+    def update_encodings(self, ids: List[str], templates: np.ndarray) -> None:
+        """
+        Remplace les modèles (matrice uint8 quantifiée, une ligne par modèle, ids
+        répétés pour plusieurs modèles) en une transaction.
+        """
+        rows: dict = {}
+        for i, student_id in enumerate(ids):
+            rows.setdefault(student_id, []).append(i)
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "UPDATE students SET face_encoding = ?, encoder = ? WHERE student_id = ?",
+                [
+                    (np.ascontiguousarray(templates[i]).tobytes(), TEMPLATE_ENCODER, student_id)
+                    for student_id, i in rows.items()
+                ],
+            )
+            self._local_writes += 1
+
+    def decrement_balance(self, student_id: str, amount: float) -> Optional[Student]:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            cursor = self._conn.execute(
+                "UPDATE students SET balance = max(0, balance - ?) WHERE student_id = ?",
+                (float(amount), student_id),
+            )
+            if cursor.rowcount == 0:
+                return None
+            self._local_writes += 1
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM students WHERE student_id = ?", (student_id,)
+            ).fetchone()
+        return Student(*row)
+
+    def applied_debit_seq(self) -> int:
+        """Numéro du dernier débit de la file appliqué (0 : aucun)."""
+        with self._lock:
+            row = self._conn.execute("SELECT applied_seq FROM debit_state").fetchone()
+        return int(row[0]) if row else 0
+
+    def decrement_balances(
+        self, debits: List[Tuple[str, float]], debit_seq: Optional[int] = None
+    ) -> List[Optional[Student]]:
+        """
+        Applique plusieurs débits (student_id, montant) en une seule transaction ;
+        debit_seq : numéro du dernier débit du lot, retenu dans la même transaction.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "UPDATE students SET balance = max(0, balance - ?) WHERE student_id = ?",
+                [(float(amount), student_id) for student_id, amount in debits],
+            )
+            if debit_seq is not None:
+                self._conn.execute(_SET_DEBIT_SEQ, (int(debit_seq),))
+            self._local_writes += 1
+            rows = {}
+            for student_id in {student_id for student_id, _ in debits}:
+                row = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM students WHERE student_id = ?", (student_id,)
+                ).fetchone()
+                if row:
+                    rows[student_id] = Student(*row)
+        return [rows.get(student_id) for student_id, _ in debits]
+
+    def import_from(self, source) -> int:
+        """Copie tous les étudiants (et encodages) d'un autre stockage, en une transaction."""
+        students = source.load_students()
+        ids, matrix = source.load_encodings()
+        encodings: dict = {}
+        for i, student_id in enumerate(ids):
+            encodings.setdefault(student_id, []).append(i)
+        encodings = {student_id: matrix[rows].ravel() for student_id, rows in encodings.items()}
+        rows = []
+        for student in students:
+            row = list(self._row(student))
+            if row[5] is None and student.student_id in encodings:
+                row[5] = quantize(encodings[student.student_id]).tobytes()
+                row[6] = TEMPLATE_ENCODER
+            rows.append(tuple(row))
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(_UPSERT, rows)
+            # Débits journalisés déjà appliqués à la source : pas rejoués ici
+            self._conn.execute(_SET_DEBIT_SEQ, (source.applied_debit_seq(),))
+            self._local_writes += 1
+        return len(rows)
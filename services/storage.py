@@ -1,46 +1,248 @@
 from __future__ import annotations
 
+import hashlib
+import itertools
 import json
+import os
+import threading
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+import numpy as np
 
 from models.student import Student
+from services.encoding_store import EncodingStore, split_templates
+from utils.paths import DATA_DIR, ENCODINGS_FILE, STUDENTS_FILE
+from utils.quantization import dequantize, quantize
 
 
 class StorageService:
-    def __init__(self, students_file: Path):
+    """
+    Persistance des étudiants dans students.json.
+
+    Si encodings_file est fourni, les encodages faciaux sont stockés à part en
+    binaire (EncodingStore) et students.json ne contient plus que l'identité et
+    le solde : les étudiants chargés ont alors face_encoding vide, les encodages
+    se lisent via load_encodings().
+
+    Les lectures/écritures sont sérialisées par un verrou : plusieurs voies d'un
+    même processus partagent une seule instance (un seul écrivain).
+
+    students.json reste une liste. Le numéro du dernier débit de la file
+    appliqué est dans un fichier annexe (students.debits.json), écrit juste
+    avant students.json avec le hash du contenu qui va le remplacer : un arrêt
+    entre les deux écritures laisse l'ancien students.json, dont le numéro est
+    alors celui d'avant (previous_seq).
+    """
+
+    def __init__(self, students_file: Path, encodings_file: Optional[Path] = None):
         self.students_file = students_file
+        self.debit_file = students_file.with_name(students_file.stem + ".debits.json")
         self.students_file.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._debit_seq = 0  # relu à chaque chargement, conservé à chaque écriture
         if not self.students_file.exists():
             self.students_file.write_text("[]", encoding="utf-8")
+        self.encodings = EncodingStore(encodings_file) if encodings_file else None
+        if self.encodings is not None:
+            self.migrate_to_binary()
+
+    @property
+    def separate_encodings(self) -> bool:
+        """Les étudiants chargés/écrits sans face_encoding gardent leurs modèles."""
+        return self.encodings is not None
+
+    def data_version(self) -> Tuple[int, ...]:
+        """Identifiant de version du fichier (mtime + taille) pour invalider les caches."""
+        stat = self.students_file.stat()
+        if self.encodings is None:
+            return stat.st_mtime_ns, stat.st_size
+        return (stat.st_mtime_ns, stat.st_size) + self.encodings.version()
 
     def load_students(self) -> List[Student]:
-        raw = json.loads(self.students_file.read_text(encoding="utf-8"))
-        return [Student(**student) for student in raw]
+        with self._lock:
+            raw = self._read()
+        return _students_from_json(raw)
+
+    def _read(self) -> List[dict]:
+        raw = self.students_file.read_bytes()
+        self._debit_seq = self._applied_seq(raw)
+        return json.loads(raw.decode("utf-8"))
+
+    def _applied_seq(self, raw: bytes) -> int:
+        """Numéro de débit valable pour ce contenu de students.json."""
+        try:
+            state = json.loads(self.debit_file.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return 0
+        if state.get("sha1") == hashlib.sha1(raw).hexdigest():
+            return int(state["debit_seq"])
+        return int(state.get("previous_seq", 0))
+
+    def applied_debit_seq(self) -> int:
+        """Numéro du dernier débit de la file appliqué (0 : aucun)."""
+        with self._lock:
+            self._read()
+            return self._debit_seq
+
+    def load_encodings(self) -> Tuple[List[str], np.ndarray]:
+        """
+        Retourne (ids, matrice float32) des modèles de tous les étudiants, une
+        ligne par modèle (un identifiant répété pour un étudiant multi-modèles).
+        """
+        if self.encodings is not None:
+            ids, matrix = self.encodings.load()
+            return ids, dequantize(matrix)
+        students = [s for s in self.load_students() if s.has_encoding]
+        if not students:
+            return [], np.empty((0, 0), dtype=np.float32)
+        templates = [split_templates(s.face_encoding) for s in students]
+        ids = [s.student_id for s, rows in zip(students, templates) for _ in range(len(rows))]
+        return ids, dequantize(np.concatenate(templates))
 
     def save_students(self, students: List[Student]) -> None:
-        payload = [student.__dict__ for student in students]
-        self.students_file.write_text(
-            json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8"
-        )
+        with self._lock:
+            self._save_students(students)
 
-    def upsert_student(self, student: Student) -> None:
+    def _save_students(self, students: List[Student], debit_seq: Optional[int] = None) -> None:
+        seq = max(self._debit_seq, debit_seq or 0)
+        if self.encodings is None:
+            payload = [student.to_dict() for student in students]
+        else:
+            payload = [student.to_dict(encoding=False) for student in students]
+            self.encodings.update(
+                {s.student_id: s.face_encoding for s in students if s.has_encoding},
+                keep_ids=[s.student_id for s in students],
+            )
+        raw = json.dumps(payload, indent=2, ensure_ascii=False).encode("utf-8")
+        if seq:
+            state = {
+                "debit_seq": seq,
+                "previous_seq": self._debit_seq,
+                "sha1": hashlib.sha1(raw).hexdigest(),
+            }
+            _replace_file(self.debit_file, json.dumps(state).encode("utf-8"))
+        _replace_file(self.students_file, raw)
+        self._debit_seq = seq
+
+    def migrate_to_binary(self) -> int:
+        """
+        Migration unique : déplace les encodages encore présents dans students.json
+        vers le fichier binaire. Retourne le nombre d'encodages migrés.
+        """
+        if self.encodings is None:
+            raise RuntimeError("Aucun fichier d'encodages binaire configuré.")
         students = self.load_students()
-        filtered = [s for s in students if s.student_id != student.student_id]
-        filtered.append(student)
-        self.save_students(filtered)
+        legacy = {s.student_id: s.face_encoding for s in students if s.has_encoding}
+        if not legacy and self.encodings.exists():
+            return 0
+        self.save_students(students)
+        return len(legacy)
+
+    def upsert_student(self, student: Student) -> None:
+        with self._lock:
+            students = self.load_students()
+            filtered = [s for s in students if s.student_id != student.student_id]
+            filtered.append(student)
+            self.save_students(filtered)
+
+    def upsert_students(self, new_students: List[Student]) -> None:
+        """
+        Ajoute/met à jour plusieurs étudiants en une seule écriture (import en masse,
+        dépôt) ; un étudiant mis à jour garde sa place dans le fichier.
+        """
+        updates = {s.student_id: s for s in new_students}
+        with self._lock:
+            students = [updates.pop(s.student_id, s) for s in self.load_students()]
+            self.save_students(students + list(updates.values()))
+
+    def update_encodings(self, ids: List[str], templates: np.ndarray) -> None:
+        """
+        Remplace les modèles (matrice uint8 quantifiée, une ligne par modèle, ids
+        répétés pour plusieurs modèles) sans toucher au reste.
+        """
+        with self._lock:
+            if self.encodings is not None:
+                self.encodings.replace_rows(ids, templates)
+                return
+            rows: dict = {}
+            for i, student_id in enumerate(ids):
+                rows.setdefault(student_id, []).append(i)
+            students = self.load_students()
+            for student in students:
+                if student.student_id in rows:
+                    encoding = templates[rows[student.student_id]].ravel()
+                    student.face_encoding = np.asarray(encoding, dtype=np.uint8)
+            self._save_students(students)
 
     def decrement_balance(self, student_id: str, amount: float) -> Optional[Student]:
-        students = self.load_students()
-        updated = None
-        for idx, student in enumerate(students):
-            if student.student_id == student_id:
-                student.balance = max(0.0, student.balance - amount)
-                students[idx] = student
-                updated = student
-                break
-        if updated:
-            self.save_students(students)
-        return updated
+        with self._lock:
+            students = self.load_students()
+            updated = None
+            for idx, student in enumerate(students):
+                if student.student_id == student_id:
+                    student.balance = max(0.0, student.balance - amount)
+                    students[idx] = student
+                    updated = student
+                    break
+            if updated:
+                self.save_students(students)
+            return updated
+
+    def decrement_balances(
+        self, debits: List[Tuple[str, float]], debit_seq: Optional[int] = None
+    ) -> List[Optional[Student]]:
+        """
+        Applique plusieurs débits (student_id, montant) en une seule réécriture ;
+        debit_seq : numéro du dernier débit du lot, écrit avec les soldes.
+        """
+        with self._lock:
+            students = self.load_students()
+            by_id = {s.student_id: s for s in students}
+            updated = []
+            for student_id, amount in debits:
+                student = by_id.get(student_id)
+                if student is not None:
+                    student.balance = max(0.0, student.balance - amount)
+                updated.append(student)
+            if debit_seq is not None or any(s is not None for s in updated):
+                self._save_students(students, debit_seq)
+            return updated
+
+
+def _replace_file(path: Path, data: bytes) -> None:
+    """Fichier temporaire puis remplacement : jamais de fichier à moitié écrit."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _students_from_json(raw: List[dict]) -> List[Student]:
+    """
+    Étudiants de students.json : les encodages encore au format JSON historique
+    sont quantifiés dans une seule matrice uint8, chaque étudiant en gardant une vue.
+    """
+    encodings = [entry.pop("face_encoding", None) or [] for entry in raw]
+    sizes = [len(encoding) for encoding in encodings]
+    if not any(sizes):
+        return [Student.from_dict(entry) for entry in raw]
+    values = itertools.chain.from_iterable(encodings)
+    shared = quantize(np.fromiter(values, dtype=np.float32, count=sum(sizes)))
+    ends = np.cumsum(sizes)
+    return [
+        Student.from_dict(entry, shared[end - size : end])
+        for entry, size, end in zip(raw, sizes, ends)
+    ]
+
 
+def create_storage(settings: dict):
+    """Instancie le stockage choisi dans settings.json ("json" ou "sqlite")."""
+    config = settings.get("storage", {})
+    backend = config.get("backend", "json")
+    if backend == "sqlite":
+        from services.sqlite_storage import SqliteStorageService
 
+        return SqliteStorageService(DATA_DIR / config.get("database", "students.db"))
+    if backend == "json":
+        return StorageService(STUDENTS_FILE, ENCODINGS_FILE)
+    raise RuntimeError(f"Stockage inconnu dans settings.json : {backend!r}")
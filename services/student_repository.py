@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+from models.student import NO_ENCODING, Student
+
+
+class StudentRepository:
+    """
+    Étudiants en mémoire, indexés par identifiant, au-dessus du stockage :
+    - chargés une fois, rechargés seulement si le stockage a été modifié par un
+      autre processus (version) et qu'aucune modification locale n'est en attente ;
+    - get() / put() en O(1) ; put() marque l'étudiant comme modifié ;
+    - flush() n'écrit que les étudiants modifiés, en une seule écriture
+      (une transaction SQLite, une réécriture de students.json) ;
+    - debit() garde l'écriture relative du stockage (solde - montant), sûre
+      si plusieurs processus débitent en même temps.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._lock = threading.RLock()
+        self._students: Dict[str, Student] = {}
+        self._dirty: Dict[str, None] = {}  # ids modifiés, dans l'ordre
+        self._local_writes = 0
+        self._version = None
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._students)
+
+    def __contains__(self, student_id: str) -> bool:
+        self.refresh()
+        return student_id in self._students
+
+    @property
+    def dirty(self) -> List[str]:
+        with self._lock:
+            return list(self._dirty)
+
+    def refresh(self) -> None:
+        """Recharge si le stockage a changé hors de ce dépôt (rien en attente localement)."""
+        if self._local_writes or self._dirty:
+            return
+        if self.storage.data_version() == self._version:
+            return
+        with self._lock:
+            if self._local_writes or self._dirty:
+                return
+            version = self.storage.data_version()
+            if version == self._version:
+                return
+            self._students = {s.student_id: s for s in self.storage.load_students()}
+            self._version = version
+
+    def get(self, student_id: str) -> Optional[Student]:
+        self.refresh()
+        return self._students.get(student_id)
+
+    def all(self) -> List[Student]:
+        self.refresh()
+        with self._lock:
+            return list(self._students.values())
+
+    def put(self, student: Student) -> None:
+        """Ajoute ou remplace un étudiant ; écrit au prochain flush()."""
+        self.refresh()
+        with self._lock:
+            self._students[student.student_id] = student
+            self._dirty[student.student_id] = None
+
+    def debit(self, student_id: str, amount: float, write: bool = True) -> Optional[Student]:
+        """
+        Débite un étudiant en mémoire ; write=False : pas d'écriture (la file de
+        débits s'en charge), sinon débit relatif écrit immédiatement.
+        """
+        self.refresh()
+        with self._lock:
+            student = self._students.get(student_id)
+            if student is None:
+                return None
+            if write:
+                with self.local_write():
+                    stored = self.storage.decrement_balance(student_id, amount)
+                if stored is None:
+                    return None
+                balance = stored.balance
+            else:
+                balance = max(0.0, student.balance - amount)
+            updated = replace(student, balance=balance)
+            self._students[student_id] = updated
+            return updated
+
+    def flush(self) -> int:
+        """Écrit les étudiants modifiés ; retourne leur nombre (0 : aucune écriture)."""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            students = [self._students[student_id] for student_id in self._dirty]
+            with self.local_write():
+                self.storage.upsert_students(students)
+                self._dirty.clear()
+                if self.storage.separate_encodings:
+                    # Modèles écrits à part : inutile de les garder (ni de les réécrire)
+                    for student in students:
+                        if student.has_encoding:
+                            self._students[student.student_id] = replace(
+                                student, face_encoding=NO_ENCODING
+                            )
+            return len(students)
+
+    @contextmanager
+    def local_write(self):
+        """
+        Écriture du stockage par ce processus (flush, file de débits) : pas de
+        rechargement pendant l'écriture, puis prise en compte de la nouvelle
+        version (sauf si le stockage avait déjà changé ailleurs : rechargement).
+        """
+        with self._lock:
+            current = self._version is not None and self.storage.data_version() == self._version
+            self._local_writes += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._local_writes -= 1
+                self._version = self.storage.data_version() if current else None
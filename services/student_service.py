@@ -3,17 +3,50 @@ from __future__ import annotations
 from pathlib import Path
 from typing import List, Optional
 
+import numpy as np
+
 from models.student import Student
+from services.crop_archive import CropArchive
+from services.debit_queue import DebitQueue
+from services.enrollment import BurstResult
 from services.storage import StorageService
 from services.face_store import FaceStore
+from services.gallery_index import GalleryIndex, GalleryMatch
+from services.student_repository import StudentRepository
+from services.telemetry import TELEMETRY
+from utils.paths import data_relative
 
 
 class StudentService:
-    """Service de gestion des étudiants (enregistrement, reconnaissance)"""
+    """
+    Service de gestion des étudiants (enregistrement, reconnaissance). Les
+    étudiants sont lus et modifiés via le dépôt en mémoire (StudentRepository) :
+    le stockage n'est touché que pour écrire ce qui a changé.
+    """
 
-    def __init__(self, storage: StorageService, face_store: FaceStore):
+    def __init__(
+        self,
+        storage: StorageService,
+        face_store: FaceStore,
+        gallery: Optional[GalleryIndex] = None,
+        debit_queue: Optional[DebitQueue] = None,
+        crop_archive: Optional[CropArchive] = None,
+        repository: Optional[StudentRepository] = None,
+    ):
         self.storage = storage
         self.face_store = face_store
+        self.gallery = gallery or GalleryIndex(storage, face_store.encoder)
+        self.debit_queue = debit_queue
+        self.crop_archive = crop_archive
+        self.repository = repository or StudentRepository(storage)
+
+    @property
+    def default_tolerance(self) -> float:
+        """Seuil de distance adapté à l'encodeur actif"""
+        return self.face_store.encoder.default_tolerance
+
+    def _tolerance(self, tolerance: Optional[float]) -> float:
+        return self.default_tolerance if tolerance is None else tolerance
 
     def register_student(
         self,
@@ -23,36 +56,114 @@ class StudentService:
         balance: float,
         image_path: Path,
     ) -> Student:
-        """Enregistre un nouvel étudiant avec son encoding facial"""
-        encoding = self.face_store.encode_image(image_path)
+        """Enregistre un nouvel étudiant avec son encoding facial (et son visage archivé)"""
+        encoding, crop = self.face_store.extract_face(image_path)
         student = Student(
             student_id=student_id,
             first_name=first_name,
             last_name=last_name,
             balance=balance,
-            image_path=str(image_path),
+            image_path=data_relative(image_path),
             face_encoding=encoding,
         )
-        self.storage.upsert_student(student)
+        self.repository.put(student)
+        self.repository.flush()
+        if self.crop_archive is not None:
+            self.crop_archive.add(student_id, crop, student.image_path)
+        self.gallery.add_student(student, encoding)
+        return student
+
+    def register_student_burst(
+        self,
+        student_id: str,
+        first_name: str,
+        last_name: str,
+        balance: float,
+        burst: BurstResult,
+        image_path: Path,
+    ) -> Student:
+        """
+        Enregistre un étudiant enrôlé en rafale : ses K meilleures images deviennent
+        K modèles (image_path : meilleure image, déjà sauvegardée).
+        """
+        template = burst.template
+        student = Student(
+            student_id=student_id,
+            first_name=first_name,
+            last_name=last_name,
+            balance=balance,
+            image_path=data_relative(image_path),
+            face_encoding=template,
+        )
+        self.repository.put(student)
+        self.repository.flush()
+        if self.crop_archive is not None:
+            self.crop_archive.add(student_id, burst.crops, student.image_path)
+        self.gallery.add_student(student, template)
         return student
 
-    def match_encoding(self, encoding: List[float], tolerance: float = 0.6) -> Optional[Student]:
-        """Compare un encoding facial à la base d'étudiants"""
-        students = self.storage.load_students()
-        for student in students:
-            if not student.face_encoding:
-                continue
-            distance = self.face_store.compute_distance(encoding, student.face_encoding)
-            if distance < tolerance:
-                return student
-        return None
+    def find_best_match(
+        self, encoding: List[float], tolerance: Optional[float] = None
+    ) -> Optional[GalleryMatch]:
+        """Meilleure correspondance (étudiant, distance, marge) sous la tolérance"""
+        match = self.gallery.best_match(encoding)
+        if match is None or match.distance >= self._tolerance(tolerance):
+            return None
+        return match
+
+    def match_encodings(
+        self, encodings: np.ndarray, tolerance: Optional[float] = None
+    ) -> List[Optional[GalleryMatch]]:
+        """Version batch : une correspondance (ou None) par ligne de la matrice (N, D)"""
+        tolerance = self._tolerance(tolerance)
+        with TELEMETRY.span("match"):
+            matches = self.gallery.best_matches(encodings)
+        return [
+            match if match is not None and match.distance < tolerance else None
+            for match in matches
+        ]
+
+    def match_encoding(
+        self, encoding: List[float], tolerance: Optional[float] = None
+    ) -> Optional[Student]:
+        """Compare un encoding facial à la base d'étudiants (étudiant le plus proche)"""
+        match = self.find_best_match(encoding, tolerance)
+        return match.student if match else None
 
     def decrement_balance(self, student_id: str, amount: float) -> Optional[Student]:
-        """Décrémente le solde d'un étudiant"""
-        return self.storage.decrement_balance(student_id, amount)
+        """
+        Décrémente le solde d'un étudiant. Avec une file de débits, le solde est
+        mis à jour en mémoire, le débit journalisé et l'écriture des soldes différée.
+        """
+        with TELEMETRY.span("debit"):
+            write_behind = self.debit_queue is not None
+            updated = self.repository.debit(student_id, amount, write=not write_behind)
+            if updated is None:
+                return None
+            # Solde affiché à la prochaine reconnaissance (étudiant de l'index)
+            self.gallery.update_student(updated, acknowledge=not write_behind)
+            if write_behind:
+                self.debit_queue.submit(student_id, amount)
+            return updated
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """Écrit les modifications et débits en attente (fermeture d'une vue, sortie)."""
+        self.repository.flush()
+        if self.debit_queue is None:
+            return True
+        return self.debit_queue.flush(timeout)
+
+    def close(self) -> None:
+        """Écrit ce qui reste et arrête le thread d'écriture des débits."""
+        self.repository.flush()
+        if self.debit_queue is not None:
+            self.debit_queue.close()
+
+    def get_student(self, student_id: str) -> Optional[Student]:
+        return self.repository.get(student_id)
 
     def get_all_students(self) -> List[Student]:
-        """Retourne la liste de tous les étudiants"""
-        return self.storage.load_students()
+        """Retourne la liste de tous les étudiants (dépôt en mémoire, sans lecture disque)"""
+        return self.repository.all()
 
 
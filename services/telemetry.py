@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional
+
+import numpy as np
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _NullSpan:
+    """Span inactif partagé : aucun coût hormis l'appel quand la télémétrie est coupée."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("_telemetry", "_stage", "_start")
+
+    def __init__(self, telemetry: "Telemetry", stage: str):
+        self._telemetry = telemetry
+        self._stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._telemetry.record(self._stage, time.perf_counter() - self._start)
+
+
+class Telemetry:
+    """
+    Mesures du chemin critique (capture, détection, encodage, recherche, débit,
+    affichage) :
+    - span(étape) chronomètre un bloc, fenêtre glissante des window dernières durées ;
+    - frame_done() compte les frames traitées (FPS effectif) et déclenche l'export
+      périodique (textfile Prometheus ou JSON lines) ;
+    - désactivée, span() renvoie un contexte vide partagé.
+    """
+
+    def __init__(self, enabled: bool = False, **options):
+        self._lock = threading.Lock()
+        self.reset(enabled, **options)
+
+    def reset(
+        self,
+        enabled: bool = False,
+        window: int = 300,
+        overlay: bool = False,
+        export_file: Optional[Path] = None,
+        export_format: str = "prometheus",
+        export_every: float = 10.0,
+    ) -> None:
+        """(Re)configure et vide les mesures."""
+        if export_format not in ("prometheus", "jsonl"):
+            raise RuntimeError(f"Format d'export inconnu : {export_format!r}")
+        with self._lock:
+            self.enabled = enabled
+            self.window = window
+            self.overlay = enabled and overlay
+            self.export_file = export_file
+            self.export_format = export_format
+            self.export_every = export_every
+            self._samples: Dict[str, Deque[float]] = {}
+            self._frames: Deque[float] = deque(maxlen=window)
+            self._last_export = time.monotonic()
+            self._snapshot: dict = {}
+            self._snapshot_time = 0.0
+
+    def span(self, stage: str):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage)
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def frame_done(self) -> None:
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._frames.append(now)
+        if self.export_file is not None and now - self._last_export >= self.export_every:
+            self._last_export = now
+            self.export()
+
+    def fps(self) -> float:
+        with self._lock:
+            if len(self._frames) < 2:
+                return 0.0
+            elapsed = self._frames[-1] - self._frames[0]
+            return (len(self._frames) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self, max_age: float = 0.0) -> dict:
+        """{"fps": ..., "stages": {étape: {"count", "p50_ms", "p95_ms", "p99_ms"}}}"""
+        now = time.monotonic()
+        if self._snapshot and now - self._snapshot_time < max_age:
+            return self._snapshot
+        with self._lock:
+            samples = {
+                stage: np.fromiter(values, dtype=np.float64)
+                for stage, values in self._samples.items()
+            }
+        stages = {}
+        for stage, values in samples.items():
+            if len(values) == 0:
+                continue
+            p50, p95, p99 = np.quantile(values, QUANTILES) * 1000
+            stages[stage] = {"count": len(values), "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+        self._snapshot = {"fps": self.fps(), "stages": stages}
+        self._snapshot_time = now
+        return self._snapshot
+
+    def overlay_lines(self) -> List[str]:
+        """Lignes de texte pour l'incrustation à l'écran (rafraîchies 2 fois par seconde)."""
+        snapshot = self.snapshot(max_age=0.5)
+        lines = [f"FPS {snapshot['fps']:.1f}"]
+        for stage, stats in snapshot["stages"].items():
+            lines.append(
+                f"{stage:<8} p50 {stats['p50_ms']:6.1f}  p95 {stats['p95_ms']:6.1f}  "
+                f"p99 {stats['p99_ms']:6.1f} ms"
+            )
+        return lines
+
+    def export(self) -> None:
+        """Écrit les métriques courantes dans export_file."""
+        if self.export_file is None:
+            return
+        snapshot = self.snapshot()
+        self.export_file.parent.mkdir(parents=True, exist_ok=True)
+        if self.export_format == "jsonl":
+            record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), **snapshot}
+            with self.export_file.open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps(record) + "\n")
+            return
+        # Textfile Prometheus (node_exporter) : remplacé atomiquement
+        lines = [
+            "# HELP access_control_fps Frames analysées par seconde.",
+            "# TYPE access_control_fps gauge",
+            f"access_control_fps {snapshot['fps']:.3f}",
+            "# HELP access_control_stage_seconds Durée par étape du chemin critique.",
+            "# TYPE access_control_stage_seconds summary",
+        ]
+        for stage, stats in snapshot["stages"].items():
+            for quantile, key in zip(QUANTILES, ("p50_ms", "p95_ms", "p99_ms")):
+                lines.append(
+                    f'access_control_stage_seconds{{stage="{stage}",quantile="{quantile}"}} '
+                    f"{stats[key] / 1000:.6f}"
+                )
+            lines.append(f'access_control_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        tmp = self.export_file.with_name(self.export_file.name + ".tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, self.export_file)
+
+
+# Instance partagée par les services et la vue (désactivée tant que configure()
+# n'est pas appelé)
+TELEMETRY = Telemetry()
+
+
+def configure(config: dict, data_dir: Path) -> Telemetry:
+    """Configure l'instance partagée depuis la section "telemetry" de settings.json."""
+    export_file = config.get("export_file") or None
+    TELEMETRY.reset(
+        enabled=bool(config.get("enabled", False)),
+        window=int(config.get("window", 300)),
+        overlay=bool(config.get("overlay", False)),
+        export_file=data_dir / export_file if export_file else None,
+        export_format=config.get("format", "prometheus"),
+        export_every=float(config.get("export_every", 10.0)),
+    )
+    return TELEMETRY
@@ -1,17 +1,161 @@
 from __future__ import annotations
 
 import datetime as dt
-import time
 import tkinter as tk
+from collections import deque
+from dataclasses import dataclass, field
 from tkinter import ttk, messagebox
-from typing import Callable, Optional
+from typing import Callable, Deque, List, Optional, Tuple
 
-import cv2
-from PIL import Image, ImageTk
+from PIL import ImageTk
 
-from services.camera import CameraService
+from services.access_engine import AccessEngine, AccessEvent, Overlay
+from services.lanes import Lane
+from services.passage_log import PassageLog
 from services.student_service import StudentService
-from services.face_store import FaceStore
+from services.pipeline import RecognitionPipeline
+from services.scheduling import AdaptiveScheduler, SchedulingConfig
+from services.telemetry import TELEMETRY
+from ui.preview import PREVIEW_SIZE, PreviewRenderer
+
+
+@dataclass
+class FrameAnalysis:
+    """Résultat du worker : statut + overlays à dessiner sur l'aperçu."""
+
+    status: Optional[str] = None
+    overlays: List[Overlay] = field(default_factory=list)
+    active: bool = True  # mouvement ou visage : cadence d'analyse rapide
+
+
+class LanePanel(ttk.Frame):
+    """
+    Aperçu, statut et dernier passage d'une voie ; capture + reconnaissance dans
+    ses threads. L'aperçu suit la caméra au rythme d'affichage, indépendamment
+    de la reconnaissance (overlays du dernier résultat disponible), qui ralentit
+    quand personne n'est devant la caméra.
+    """
+
+    def __init__(
+        self,
+        master: tk.Misc,
+        lane: Lane,
+        student_service: StudentService,
+        debit_amount: float,
+        debit_ttl_seconds: float,
+        preview_size: Tuple[int, int],
+        show_title: bool,
+        scheduling: SchedulingConfig,
+        passage_log: Optional[PassageLog] = None,
+    ):
+        super().__init__(master, padding=8)
+        self.lane = lane
+        self._renderer = PreviewRenderer(preview_size)
+        self._preview_image: Optional[ImageTk.PhotoImage] = None  # réutilisée via paste()
+        self._analysis = FrameAnalysis()
+        self._shown_seq = 0
+        self._pipeline: Optional[RecognitionPipeline[FrameAnalysis]] = None
+        self._scheduling = scheduling
+        # Décisions prises hors de Tk par le moteur, affichées par la boucle Tk
+        self.engine = AccessEngine(
+            student_service,
+            lane.face_store,
+            debit_amount,
+            debit_ttl_seconds,
+            lane=lane.name,
+            scheduling=scheduling,
+        )
+        self._events: Deque[AccessEvent] = deque()
+        self.engine.subscribe(self._on_access_event)
+        # Chaque décision (accès, solde épuisé, refus) est journalisée
+        self._passage_log = passage_log
+        if passage_log is not None:
+            self.engine.subscribe(passage_log.append)
+
+        if show_title:
+            ttk.Label(self, text=lane.name, font=("Segoe UI", 14, "bold")).pack()
+
+        # Canvas de prévisualisation caméra
+        self.preview_label = ttk.Label(self, text="Chargement de la caméra...")
+        self.preview_label.pack(pady=8)
+
+        # Statut
+        self.status_var = tk.StringVar(value="En attente - Positionnez-vous devant la caméra...")
+        ttk.Label(self, textvariable=self.status_var, font=("Segoe UI", 12, "bold")).pack(pady=8)
+
+        # Dernier événement
+        self.last_event_var = tk.StringVar(value="Aucun passage détecté.")
+        ttk.Label(self, textvariable=self.last_event_var, font=("Segoe UI", 10)).pack(pady=4)
+
+    def start(self) -> bool:
+        """Ouvre la caméra de la voie et lance ses threads ; False si indisponible"""
+        try:
+            self.lane.camera_service.get_video_capture()
+        except RuntimeError:
+            self.status_var.set(f"Caméra {self.lane.camera_service.camera_index} non disponible")
+            self.preview_label.config(text="")
+            return False
+        # Capture + reconnaissance hors du thread Tk, affichage du dernier résultat
+        self._pipeline = RecognitionPipeline(
+            read=self.lane.camera_service.read,
+            process=self._analyze_frame,
+            on_error=lambda exc: print(f"Erreur temporaire ({self.lane.name}) : {exc}"),
+            scheduler=AdaptiveScheduler(self._scheduling),
+            is_active=lambda analysis: analysis.active,
+        )
+        self._pipeline.start()
+        return True
+
+    def _analyze_frame(self, frame) -> FrameAnalysis:
+        """Reconnaissance par le moteur (thread worker, pas d'appel Tk ici)"""
+        result = self.engine.process(frame)
+        return FrameAnalysis(result.status, self.engine.overlays(result), result.active)
+
+    def _on_access_event(self, event: AccessEvent) -> None:
+        """Abonné du moteur (thread worker) : transmis à la boucle Tk via une file"""
+        if event.student is not None:
+            self._events.append(event)
+
+    def render(self) -> None:
+        """Appelé par la boucle Tk : affiche le résultat annoté le plus récent"""
+        if self._pipeline is None:
+            return
+        while self._events:
+            event = self._events.popleft()
+            self.last_event_var.set(
+                f"Dernier passage : {event.student.display_name} "
+                f"à {dt.datetime.fromtimestamp(event.timestamp):%H:%M:%S}"
+            )
+
+        analysis = self._pipeline.latest()
+        if analysis is not None:
+            self._analysis = analysis
+            if analysis.status is not None:
+                self.status_var.set(analysis.status)
+
+        # Afficher la dernière frame capturée (si nouvelle) avec les derniers overlays
+        seq, frame = self._pipeline.grabber.latest()
+        if frame is not None and seq != self._shown_seq:
+            self._shown_seq = seq
+            with TELEMETRY.span("render"):
+                text_lines = TELEMETRY.overlay_lines() if TELEMETRY.overlay else ()
+                img = self._renderer.render(frame, self._analysis.overlays, text_lines)
+                if self._preview_image is None:
+                    self._preview_image = ImageTk.PhotoImage(image=img)
+                    self.preview_label.config(image=self._preview_image, text="")
+                else:
+                    self._preview_image.paste(img)
+        elif self._pipeline.grabber.error:
+            self.status_var.set(self._pipeline.grabber.error)
+
+    def stop(self) -> None:
+        if self._pipeline is not None:
+            self._pipeline.stop()
+            self._pipeline = None
+        self.engine.unsubscribe(self._on_access_event)
+        if self._passage_log is not None:
+            self.engine.unsubscribe(self._passage_log.append)
+        self.lane.camera_service.release()
 
 
 class AccessControlView(ttk.Frame):
@@ -19,158 +163,89 @@ class AccessControlView(ttk.Frame):
         self,
         master: tk.Misc,
         student_service: StudentService,
-        camera_service: CameraService,
-        face_store: FaceStore,
+        lanes: List[Lane],
         on_back: Callable[[], None],
         debit_amount: float = 1.0,
+        debit_ttl_seconds: float = 30.0,
+        preview_size: Tuple[int, int] = PREVIEW_SIZE,
+        display_fps: float = 30.0,
+        scheduling: Optional[SchedulingConfig] = None,
+        passage_log: Optional[PassageLog] = None,
     ):
         super().__init__(master, padding=24)
         self.student_service = student_service
-        self.camera_service = camera_service
-        self.face_store = face_store
+        self.lanes = lanes
         self.on_back = on_back
         self.debit_amount = debit_amount
         self._after_id: Optional[str] = None
         self._running = True
-        self._preview_image = None
-        self._current_frame = None
-        self._last_detection_time = 0
-        self._cooldown_seconds = 3  # Évite de débiter plusieurs fois le même étudiant
-        
-        # Ouvrir la caméra une seule fois pour flux continu
-        self._cap = cv2.VideoCapture(0)
-        if not self._cap.isOpened():
-            messagebox.showerror("Erreur", "Impossible d'ouvrir la caméra")
-            raise RuntimeError("Caméra non disponible")
+        self._display_interval_ms = max(1, int(1000 / display_fps))
 
         # En-tête avec titre et bouton retour
         header_frame = ttk.Frame(self)
         header_frame.pack(fill="x", pady=(0, 12))
-        
+
         ttk.Label(header_frame, text="Contrôle d'accès - Reconnaissance en continu", font=("Segoe UI", 18)).pack(side="left")
         ttk.Button(header_frame, text="← Retour au menu", command=self._handle_back, width=20).pack(side="right")
 
-        # Canvas de prévisualisation caméra
-        self.preview_label = ttk.Label(self, text="Chargement de la caméra...")
-        self.preview_label.pack(pady=8)
+        # Une colonne par voie (3 max par ligne) ; aperçu réduit pour tenir dans 1200 px
+        lanes_frame = ttk.Frame(self)
+        lanes_frame.pack(fill="both", expand=True)
+        columns = min(len(lanes), 3)
+        width = min(preview_size[0], 1140 // columns)
+        preview_size = (width, width * preview_size[1] // preview_size[0])
+        self.panels: List[LanePanel] = []
+        for index, lane in enumerate(lanes):
+            panel = LanePanel(
+                lanes_frame,
+                lane,
+                student_service,
+                debit_amount,
+                debit_ttl_seconds,
+                preview_size,
+                show_title=len(lanes) > 1,
+                scheduling=scheduling or SchedulingConfig(),
+                passage_log=passage_log,
+            )
+            panel.grid(row=index // columns, column=index % columns, sticky="n")
+            self.panels.append(panel)
 
-        # Statut
-        self.status_var = tk.StringVar(value="En attente - Positionnez-vous devant la caméra...")
-        ttk.Label(self, textvariable=self.status_var, font=("Segoe UI", 12, "bold")).pack(pady=8)
-
-        # Dernier événement
-        self.last_event_var = tk.StringVar(value="Aucun passage détecté.")
-        ttk.Label(self, textvariable=self.last_event_var, font=("Segoe UI", 10)).pack(pady=4)
+        # Ouvrir chaque caméra une seule fois pour flux continu
+        started = [panel.start() for panel in self.panels]
+        if not any(started):
+            self.teardown()
+            messagebox.showerror("Erreur", "Impossible d'ouvrir la caméra")
+            raise RuntimeError("Caméra non disponible")
 
-        # Lancer la reconnaissance en continu
-        self._update_preview_with_recognition()
+        self._render_latest()
 
-    def _update_preview_with_recognition(self):
-        """Met à jour la prévisualisation avec reconnaissance automatique en temps réel"""
+    def _render_latest(self):
+        """Boucle Tk : une seule boucle pour toutes les voies"""
         if not self._running:
             return
-            
-        try:
-            # Lire la frame depuis la caméra ouverte (flux continu)
-            ret, frame = self._cap.read()
-            if not ret:
-                self.status_var.set("Erreur de lecture caméra")
-                return
-                
-            frame_display = frame.copy()
-            current_time = time.time()
-            
-            # Détecter et reconnaître les visages sur chaque frame
-            results = self.face_store.encode_faces_from_frame(frame, with_boxes=True)
-            
-            if results:
-                # Analyser chaque visage détecté
-                for encoding, (x, y, w, h) in results:
-                    student = self.student_service.match_encoding(encoding, tolerance=15)
-                    
-                    if student:
-                        # Visage reconnu - dessiner rectangle vert
-                        cv2.rectangle(frame_display, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                        cv2.putText(
-                            frame_display,
-                            student.display_name,
-                            (x, y - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX,
-                            0.6,
-                            (0, 255, 0),
-                            2,
-                        )
-                        
-                        # Débiter le solde (avec cooldown pour éviter les doublons)
-                        if current_time - self._last_detection_time > self._cooldown_seconds:
-                            self._last_detection_time = current_time
-                            updated = self.student_service.decrement_balance(
-                                student.student_id, self.debit_amount
-                            )
-                            balance = (updated or student).balance
-                            
-                            if balance > 0:
-                                self.status_var.set(
-                                    f"✓ Accès autorisé : {student.display_name} | Solde : {balance:.2f} €"
-                                )
-                            else:
-                                self.status_var.set(
-                                    f"⚠ Solde insuffisant : {student.display_name} (0.00 €)"
-                                )
-                            
-                            self.last_event_var.set(
-                                f"Dernier passage : {student.display_name} à {dt.datetime.now():%H:%M:%S}"
-                            )
-                        else:
-                            # Afficher l'état reconnu sans débiter
-                            balance = student.balance
-                            self.status_var.set(
-                                f"Reconnu : {student.display_name} | Solde : {balance:.2f} €"
-                            )
-                    else:
-                        # Visage non reconnu - dessiner rectangle rouge
-                        cv2.rectangle(frame_display, (x, y), (x + w, y + h), (0, 0, 255), 2)
-                        cv2.putText(
-                            frame_display,
-                            "INCONNU",
-                            (x, y - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX,
-                            0.6,
-                            (0, 0, 255),
-                            2,
-                        )
-                        if current_time - self._last_detection_time > self._cooldown_seconds:
-                            self.status_var.set("✗ Visage non reconnu - Accès refusé")
-            else:
-                # Aucun visage détecté
-                if current_time - self._last_detection_time > 2:
-                    self.status_var.set("En attente - Positionnez-vous devant la caméra...")
-            
-            # Convertir et afficher la frame avec les overlays
-            frame_rgb = cv2.cvtColor(frame_display, cv2.COLOR_BGR2RGB)
-            frame_resized = cv2.resize(frame_rgb, (800, 600))  # Taille optimisée pour laisser place aux boutons
-            img = Image.fromarray(frame_resized)
-            self._preview_image = ImageTk.PhotoImage(image=img)
-            self.preview_label.config(image=self._preview_image, text="")
-            
-        except Exception as exc:
-            # Ne pas arrêter le flux pour une erreur temporaire
-            print(f"Erreur temporaire : {exc}")
-            
-        # Rafraîchir toutes les 50ms (20 FPS) - flux continu
+
+        for panel in self.panels:
+            try:
+                panel.render()
+            except Exception as exc:
+                # Ne pas arrêter le flux pour une erreur temporaire
+                print(f"Erreur temporaire ({panel.lane.name}) : {exc}")
+
+        # Le thread Tk ne fait que l'affichage, à sa propre cadence
         if self._running:
-            self._after_id = self.after(50, self._update_preview_with_recognition)
+            self._after_id = self.after(self._display_interval_ms, self._render_latest)
 
     def _handle_back(self):
         self.teardown()
         self.on_back()
 
     def teardown(self):
-        """Arrête la prévisualisation et ferme la caméra"""
+        """Arrête la prévisualisation et ferme les caméras"""
         self._running = False
         if self._after_id:
             self.after_cancel(self._after_id)
             self._after_id = None
-        if hasattr(self, '_cap') and self._cap is not None:
-            self._cap.release()
-            self._cap = None
+        for panel in self.panels:
+            panel.stop()
+        # Les soldes affichés ailleurs (menu, autre processus) viennent du stockage
+        self.student_service.flush()
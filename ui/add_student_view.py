@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import shutil
+import threading
 import tkinter as tk
 from pathlib import Path
 from tkinter import filedialog, messagebox, ttk
@@ -11,6 +12,7 @@ import cv2
 from PIL import Image, ImageTk
 
 from services.camera import CameraService
+from services.enrollment import BurstConfig, BurstEnrollment, BurstResult
 from services.student_service import StudentService
 from utils.paths import IMAGES_DIR
 
@@ -24,12 +26,15 @@ class AddStudentView(ttk.Frame):
         student_service: StudentService,
         camera_service: CameraService,
         on_back: Callable[[], None],
+        burst_config: Optional[BurstConfig] = None,
     ):
         super().__init__(master, padding=24)
         self.student_service = student_service
         self.camera_service = camera_service
         self.on_back = on_back
+        self.burst_config = burst_config or BurstConfig()
         self.selected_image: Optional[Path] = None
+        self.selected_burst: Optional[BurstResult] = None  # plusieurs modèles
         self.preview_photo = None
         self.capture_delay_var = tk.IntVar(value=500)  # délai avant capture en ms
 
@@ -74,6 +79,10 @@ class AddStudentView(ttk.Frame):
 
         btn_frame = ttk.Frame(self)
         btn_frame.grid(row=7, column=0, columnspan=2, pady=(8, 0))
+        self.burst_button = ttk.Button(
+            btn_frame, text="Rafale (qualité contrôlée)", command=self._capture_burst
+        )
+        self.burst_button.pack(side="left", padx=4)
         ttk.Button(btn_frame, text="Capturer via webcam", command=self._capture_image).pack(
             side="left", padx=4
         )
@@ -114,6 +123,49 @@ class AddStudentView(ttk.Frame):
         except Exception as exc:  # pragma: no cover - dépend matériel
             messagebox.showerror("Caméra", str(exc))
 
+    def _capture_burst(self):
+        """Rafale dans un thread : notation des images, K meilleures conservées."""
+        try:
+            student_id = self._require_student_id()
+        except ValueError as exc:
+            messagebox.showwarning("Information", str(exc))
+            return
+        self.burst_button.state(["disabled"])
+        self.photo_status.set("Rafale en cours, regardez la caméra...")
+        burst = BurstEnrollment(self.student_service.face_store, self.burst_config)
+
+        def progress(done: int, quality) -> None:
+            detail = "" if quality is None or quality.accepted else f" ({quality.rejection})"
+            text = f"Rafale : image {done}/{self.burst_config.frames}{detail}"
+            self.after(0, lambda: self.photo_status.set(text))
+
+        def run():
+            try:
+                result = burst.capture(self.camera_service.capture_frame, progress)
+                destination = IMAGES_DIR / f"{student_id}.jpg"
+                self.camera_service.save_frame(result.best_frame, destination)
+            except Exception as exc:  # pragma: no cover - dépend matériel
+                message = str(exc)  # exc n'existe plus quand Tk exécute le rappel
+                self.after(0, lambda: self._burst_done(None, None, message))
+                return
+            self.after(0, lambda: self._burst_done(result, destination, None))
+
+        threading.Thread(target=run, name="burst", daemon=True).start()
+
+    def _burst_done(
+        self, result: Optional[BurstResult], destination: Optional[Path], error: Optional[str]
+    ):
+        if not self.winfo_exists():
+            return
+        self.burst_button.state(["!disabled"])
+        if error is not None:
+            self.photo_status.set("Aucune photo sélectionnée.")
+            messagebox.showerror("Rafale", error)
+            return
+        self.selected_image = destination
+        self.selected_burst = result
+        self.photo_status.set(result.describe())
+
     def _import_image(self):
         file_path = filedialog.askopenfilename(
             title="Sélectionner une image",
@@ -126,6 +178,7 @@ class AddStudentView(ttk.Frame):
         try:
             shutil.copy(Path(file_path), destination)
             self.selected_image = destination
+            self.selected_burst = None
             self.photo_status.set(f"Image importée : {destination.name}")
         except OSError as exc:
             messagebox.showerror("Fichier", f"Impossible de copier l'image : {exc}")
@@ -146,13 +199,23 @@ class AddStudentView(ttk.Frame):
             messagebox.showwarning("Solde invalide", "Le solde doit être un nombre.")
             return
         try:
-            student = self.student_service.register_student(
-                student_id=student_id,
-                first_name=first_name,
-                last_name=last_name,
-                balance=balance,
-                image_path=self.selected_image,
-            )
+            if self.selected_burst is not None:
+                student = self.student_service.register_student_burst(
+                    student_id=student_id,
+                    first_name=first_name,
+                    last_name=last_name,
+                    balance=balance,
+                    burst=self.selected_burst,
+                    image_path=self.selected_image,
+                )
+            else:
+                student = self.student_service.register_student(
+                    student_id=student_id,
+                    first_name=first_name,
+                    last_name=last_name,
+                    balance=balance,
+                    image_path=self.selected_image,
+                )
         except Exception as exc:
             messagebox.showerror("Erreur", str(exc))
             return
@@ -167,6 +230,7 @@ class AddStudentView(ttk.Frame):
         self.last_name_var.set("")
         self.balance_var.set("5.0")
         self.selected_image = None
+        self.selected_burst = None
         self.photo_status.set("Aucune photo sélectionnée.")
 
     def _show_preview(self, frame, student_id: str):
@@ -189,6 +253,7 @@ class AddStudentView(ttk.Frame):
             try:
                 self.camera_service.save_frame(frame, destination)
                 self.selected_image = destination
+                self.selected_burst = None
                 self.photo_status.set(f"Photo capturée : {destination.name}")
             except Exception as exc:  # pragma: no cover
                 messagebox.showerror("Erreur", f"Sauvegarde impossible : {exc}")
@@ -236,12 +301,11 @@ class AddStudentView(ttk.Frame):
                     0,
                     lambda: (
                         setattr(self, "selected_image", captured_path),
+                        setattr(self, "selected_burst", None),
                         self.photo_status.set(f"Photo capturée : {captured_path.name}"),
                     ),
                 )
 
         # Lancer dans un thread léger pour ne pas bloquer Tk
-        import threading
-
         threading.Thread(target=run, daemon=True).start()
 
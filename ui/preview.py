@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from typing import Iterable, Sequence, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Taille optimisée pour laisser place aux boutons
+PREVIEW_SIZE: Tuple[int, int] = (800, 600)
+
+
+class PreviewRenderer:
+    """
+    Rendu de l'aperçu à taille fixe avec tampons réutilisés :
+    réduction, overlays dessinés sur l'image réduite (pas de copie pleine
+    résolution), conversion BGR -> RGB, image PIL partageant le tampon.
+    """
+
+    def __init__(self, size: Tuple[int, int] = PREVIEW_SIZE):
+        self.size = size
+        width, height = size
+        self._small = np.empty((height, width, 3), dtype=np.uint8)
+        self._rgb = np.empty((height, width, 3), dtype=np.uint8)
+
+    def render(
+        self,
+        frame,
+        overlays: Iterable[Tuple[Sequence[int], str, Tuple[int, int, int]]] = (),
+        text_lines: Sequence[str] = (),
+    ) -> Image.Image:
+        """overlays : (x, y, w, h) en coordonnées de la frame, libellé, couleur BGR."""
+        cv2.resize(frame, self.size, dst=self._small)
+        sx = self.size[0] / frame.shape[1]
+        sy = self.size[1] / frame.shape[0]
+        for (x, y, w, h), label, color in overlays:
+            x0, y0 = int(x * sx), int(y * sy)
+            x1, y1 = int((x + w) * sx), int((y + h) * sy)
+            cv2.rectangle(self._small, (x0, y0), (x1, y1), color, 2)
+            cv2.putText(
+                self._small, label, (x0, y0 - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2
+            )
+        for i, line in enumerate(text_lines):
+            cv2.putText(
+                self._small, line, (10, 20 + 18 * i), cv2.FONT_HERSHEY_PLAIN, 1.0, (255, 255, 0), 1
+            )
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        return Image.frombuffer("RGB", self.size, self._rgb, "raw", "RGB", 0, 1)
@@ -6,7 +6,48 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 IMAGES_DIR = DATA_DIR / "images"
 STUDENTS_FILE = DATA_DIR / "students.json"
+ENCODINGS_FILE = DATA_DIR / "face_encodings.npy"
+CROPS_FILE = DATA_DIR / "face_crops.bin"
+MODELS_DIR = DATA_DIR / "models"
+PASSAGES_DIR = DATA_DIR / "passages"
+ANN_INDEX_FILE = DATA_DIR / "ann_index.npz"
 ADMINS_FILE = DATA_DIR / "admins.json"
+SETTINGS_FILE = DATA_DIR / "settings.json"
 
-__all__ = ["BASE_DIR", "DATA_DIR", "IMAGES_DIR", "STUDENTS_FILE", "ADMINS_FILE"]
+__all__ = [
+    "BASE_DIR",
+    "DATA_DIR",
+    "IMAGES_DIR",
+    "STUDENTS_FILE",
+    "ENCODINGS_FILE",
+    "CROPS_FILE",
+    "MODELS_DIR",
+    "PASSAGES_DIR",
+    "ANN_INDEX_FILE",
+    "ADMINS_FILE",
+    "SETTINGS_FILE",
+    "data_relative",
+    "resolve_data_path",
+]
+
+
+def data_relative(path: Path) -> str:
+    """Chemin stocké : relatif à data/ (format POSIX) si possible, sinon inchangé."""
+    try:
+        return Path(path).resolve().relative_to(DATA_DIR.resolve()).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def resolve_data_path(stored: str) -> Path:
+    """
+    Chemin absolu d'un fichier de data/. Les anciens chemins absolus (autre poste,
+    chemins Windows) sont cherchés par leur nom dans data/images.
+    """
+    path = Path(stored)
+    if not path.is_absolute() and "\\" not in stored and ":" not in stored:
+        return DATA_DIR / path
+    if path.exists():
+        return path
+    return IMAGES_DIR / stored.replace("\\", "/").rsplit("/", 1)[-1]
 
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+# Les encodages sont des pixels 8 bits divisés par 255 : stockage uint8 sans perte.
+PIXEL_SCALE = 255.0
+
+
+def quantize(encoding: Sequence[float]) -> np.ndarray:
+    """Convertit un encodage [0, 1] en uint8 (sans perte pour les pixels / 255)."""
+    values = np.asarray(encoding)
+    if values.dtype == np.uint8:
+        return values  # déjà quantifié (Student.face_encoding)
+    values = values.astype(np.float32) * PIXEL_SCALE
+    return np.clip(np.rint(values), 0, 255).astype(np.uint8)
+
+
+def dequantize(matrix: np.ndarray) -> np.ndarray:
+    """Reconstruit les encodages float32 exactement comme FaceStore les calcule."""
+    return matrix.astype(np.float32) / PIXEL_SCALE
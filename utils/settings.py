@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import copy
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+from utils.paths import SETTINGS_FILE
+
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    "storage": {
+        # "json" (students.json + encodages binaires) ou "sqlite"
+        "backend": "json",
+        "database": "students.db",
+    },
+    # Encodeur de comparaison : "raw" (pixels), "lbp" (histogrammes) ou "pca" (eigenfaces)
+    "encoder": {
+        "name": "raw",
+        "pca_components": 128,
+        "lbp_grid": 4,
+    },
+    # Index approché (IVF) pour les très grandes galeries (plusieurs écoles)
+    "ann": {
+        "enabled": False,
+        "min_gallery": 5000,
+        "n_lists": 0,
+        "n_probe": 8,
+    },
+    # Voir services.face_store.DetectionConfig (réglage des voies : visage à bout de bras)
+    "detection": {
+        "downscale": 0.5,
+        "scale_factor": 1.15,
+        "min_neighbors": 5,
+        "min_face_ratio": 0.15,
+        "max_face_ratio": 0.9,
+        "use_roi": True,
+        "roi_margin": 0.5,
+        "full_scan_every": 5,
+        # Voies : "lbp" (rapide) ; enrôlement : "haar" ; "dnn" = SSD OpenCV (plus précis).
+        # Fichiers LBP/DNN dans data/models, cascade Haar à défaut.
+        "detector": "lbp",
+        "enrollment_detector": "haar",
+        "lbp_cascade": "lbpcascade_frontalface_improved.xml",
+        "dnn_model": "res10_300x300_ssd_iter_140000.caffemodel",
+        "dnn_config": "deploy.prototxt",
+        "dnn_confidence": 0.6,
+    },
+    # Voies de passage : une caméra (et un worker) par voie, galerie partagée
+    "lanes": [
+        {"name": "Caisse 1", "camera_index": 0},
+    ],
+    # Préchauffage pendant la connexion : ouvrir aussi les caméras des voies
+    "startup": {
+        "open_cameras": True,
+    },
+    # Aperçu caméra : taille affichée et cadence d'affichage (indépendante de la reconnaissance)
+    "preview": {
+        "width": 800,
+        "height": 600,
+        "fps": 30,
+    },
+    # Cadence de reconnaissance : voir services.scheduling.SchedulingConfig
+    "scheduling": {
+        "motion_gate": True,
+        "motion_threshold": 4.0,
+        "recheck_seconds": 2.0,
+        "idle_after": 3.0,
+        "idle_interval": 0.5,
+        "min_interval": 0.0,
+        "headroom": 0.25,
+    },
+    # Enrôlement en rafale : voir services.enrollment.BurstConfig
+    "enrollment": {
+        "frames": 15,
+        "interval_ms": 80,
+        "templates": 3,
+        "min_face_ratio": 0.2,
+        "min_sharpness": 50.0,
+        "min_brightness": 50.0,
+        "max_brightness": 205.0,
+        "max_clipped": 0.1,
+        "min_spread": 2.0,
+    },
+    # Journal des passages (data/passages/AAAA-MM-JJ.pass), lu par manage.py passage-report
+    "passages": {
+        "enabled": True,
+    },
+    # Débits écrits en arrière-plan par lots (journal relatif à data/) ;
+    # write_behind=False : écriture synchrone à chaque passage
+    "debits": {
+        "write_behind": True,
+        "journal": "debits.journal",
+    },
+    # Mesures du chemin critique (services.telemetry) ; export relatif à data/
+    "telemetry": {
+        "enabled": False,
+        "overlay": False,
+        "window": 300,
+        "export_file": "",  # ex: "metrics.prom" ou "metrics.jsonl"
+        "format": "prometheus",  # ou "jsonl"
+        "export_every": 10.0,
+    },
+}
+
+
+def _merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_settings(settings_file: Path = SETTINGS_FILE) -> Dict[str, Any]:
+    """Charge data/settings.json complété par les valeurs par défaut."""
+    if not settings_file.exists():
+        return copy.deepcopy(DEFAULT_SETTINGS)
+    data = json.loads(settings_file.read_text(encoding="utf-8"))
+    return _merge(DEFAULT_SETTINGS, data)
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict
+
+# Jalons de démarrage (fenêtre de connexion, services prêts, premier visage
+# reconnu). Importé en premier par app.py : sert d'origine des mesures.
+_START = time.perf_counter()
+_lock = threading.Lock()
+_marks: Dict[str, float] = {}
+
+
+def mark(name: str) -> None:
+    """Enregistre (une seule fois) le temps écoulé depuis le lancement et l'affiche."""
+    with _lock:
+        if name in _marks:
+            return
+        _marks[name] = elapsed = time.perf_counter() - _START
+    print(f"[démarrage] {name} : {elapsed:.2f} s")
+
+
+def marks() -> Dict[str, float]:
+    with _lock:
+        return dict(_marks)